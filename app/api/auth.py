@@ -1,10 +1,9 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from werkzeug.security import generate_password_hash, check_password_hash
-import requests
 import json
 
-from app.extensions import db, redis_client
+from app.extensions import db, redis_client, http_client
 from app.models import User
 
 # 创建蓝图但不立即导入db和redis_client
@@ -87,7 +86,7 @@ def wechat_login():
     
     # 请求微信API获取openid和session_key
     url = f'https://api.weixin.qq.com/sns/jscode2session?appid={appid}&secret={secret}&js_code={data["code"]}&grant_type=authorization_code'
-    response = requests.get(url)
+    response = http_client.get(url)
     
     if response.status_code != 200:
         return jsonify({'message': '微信服务器请求失败'}), 500
@@ -1,13 +1,22 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
+from app.extensions import db
 from app.models import Fund, FundValue
-from app.services.fund_value_service import get_latest_fund_values, get_fund_values_by_date_range, fetch_fund_value
+from app.services.fund_value_service import get_fund_values_by_date_range, fetch_fund_value, get_fund_performance
+from app.services.nav_lookup import lookup_navs, lookup_purchase_navs
+from app.utils.cache import cached_response
+from app.utils.redis_utils import fund_values_tag
+
+# 批量净值查询每次最多的条数
+MAX_AS_OF_QUERIES = 1000
 
 fund_values_bp = Blueprint('fund_values', __name__)
 
 @fund_values_bp.route('', methods=['GET'])
 @jwt_required()
+# 未指定日期范围时默认查询最近30天，缓存键带上当天日期
+@cached_response(ttl=3600, tags=lambda: _fund_values_tags(), vary=lambda: [datetime.now().date().isoformat()])
 def get_values():
     """获取基金净值数据
     
@@ -114,6 +123,7 @@ def get_values():
 
 @fund_values_bp.route('/latest', methods=['GET'])
 @jwt_required()
+@cached_response(ttl=3600, tags=lambda: _fund_values_tags())
 def get_latest_values():
     """获取基金最新净值数据
     
@@ -141,14 +151,12 @@ def get_latest_values():
     if not fund:
         return jsonify({'error': f'未找到ID为{fund_id}的基金'}), 404
     
-    # 获取最新净值数据
-    latest_value = get_latest_fund_values(fund_id=fund_id, limit=1)
+    # 从业绩汇总表读取最新净值和收益率
+    summary = get_fund_performance(fund_id)
     
-    if not latest_value:
+    if not summary:
         return jsonify({'error': f'未找到基金{fund.code}的净值数据'}), 404
     
-    latest_value = latest_value[0]
-    
     # 构造响应
     response = {
         'fund': {
@@ -157,20 +165,86 @@ def get_latest_values():
             'name': fund.name
         },
         'value': {
-            'id': latest_value.id,
-            'date': latest_value.date.isoformat(),
-            'net_value': latest_value.net_value,
-            'accumulated_value': latest_value.accumulated_value,
-            'daily_change': latest_value.daily_change,
-            'last_week_change': latest_value.last_week_change,
-            'last_month_change': latest_value.last_month_change,
-            'last_year_change': latest_value.last_year_change,
-            'since_inception_change': latest_value.since_inception_change
+            'id': summary.latest_value_id,
+            'date': summary.latest_date.isoformat(),
+            'net_value': summary.net_value,
+            'accumulated_value': summary.accumulated_value,
+            'daily_change': summary.daily_change,
+            'last_week_change': summary.week_change,
+            'last_month_change': summary.month_change,
+            'last_year_change': summary.year_change,
+            'since_inception_change': summary.since_inception_change
         }
     }
     
     return jsonify(response)
 
+@fund_values_bp.route('/as-of', methods=['POST'])
+@jwt_required()
+def get_as_of_values():
+    """批量查询多个(基金, 日期)的净值
+    
+    请求体:
+    {
+        "queries": [
+            {"fund_code": "000001", "date": "2023-01-06"},  // 当日净值，没有时取之前最近的一条
+            {"fund_id": 2, "date": "2023-01-06", "before_cutoff": false}  // 提供before_cutoff时按申购T/T+1规则确定净值日期
+        ]
+    }
+    """
+    data = request.get_json() or {}
+    queries = data.get('queries')
+    
+    # 验证参数
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': '必须提供queries列表'}), 400
+    if len(queries) > MAX_AS_OF_QUERIES:
+        return jsonify({'error': f'每次最多查询{MAX_AS_OF_QUERIES}条'}), 400
+    
+    # 先校验每条查询的字段类型，再一次查询把基金代码转换为基金ID
+    for index, query in enumerate(queries):
+        if not isinstance(query, dict):
+            return jsonify({'error': f'第{index + 1}条查询格式错误'}), 400
+        fund_id = query.get('fund_id')
+        if fund_id is not None and (not isinstance(fund_id, int) or isinstance(fund_id, bool)):
+            return jsonify({'error': f'第{index + 1}条查询的fund_id必须为整数'}), 400
+        if query.get('fund_code') is not None and not isinstance(query['fund_code'], str):
+            return jsonify({'error': f'第{index + 1}条查询的fund_code必须为字符串'}), 400
+        if query.get('before_cutoff') is not None and not isinstance(query['before_cutoff'], bool):
+            return jsonify({'error': f'第{index + 1}条查询的before_cutoff必须为布尔值或null'}), 400
+        if not isinstance(query.get('date'), str):
+            return jsonify({'error': f'第{index + 1}条查询的日期格式错误，应为YYYY-MM-DD'}), 400
+    
+    codes = {query.get('fund_code') for query in queries if not query.get('fund_id')}
+    fund_ids_by_code = dict(db.session.query(Fund.code, Fund.id).filter(Fund.code.in_(codes)).all()) if codes else {}
+    
+    parsed = []
+    for index, query in enumerate(queries):
+        fund_id = query.get('fund_id') or fund_ids_by_code.get(query.get('fund_code'))
+        if not fund_id:
+            return jsonify({'error': f'第{index + 1}条查询的基金不存在'}), 404
+        try:
+            query_date = datetime.strptime(query['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': f'第{index + 1}条查询的日期格式错误，应为YYYY-MM-DD'}), 400
+        parsed.append((fund_id, query_date, query.get('before_cutoff')))
+    
+    # 提供before_cutoff的查询按申购规则处理，其余直接按日期查询
+    purchase_positions = [index for index, item in enumerate(parsed) if item[2] is not None]
+    date_positions = [index for index, item in enumerate(parsed) if item[2] is None]
+    results = [None] * len(parsed)
+    for index, result in zip(purchase_positions, lookup_purchase_navs([parsed[index] for index in purchase_positions])):
+        results[index] = result
+    for index, result in zip(date_positions, lookup_navs([parsed[index][:2] for index in date_positions])):
+        results[index] = result
+    
+    return jsonify({
+        'results': [
+            {key: value.isoformat() if hasattr(value, 'isoformat') else value for key, value in result.items()}
+            for result in results
+        ]
+    })
+
 @fund_values_bp.route('/refresh', methods=['POST'])
 @jwt_required()
 def refresh_fund_values():
@@ -201,4 +275,11 @@ def refresh_fund_values():
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500 
\ No newline at end of file
+        }), 500
+
+def _fund_values_tags():
+    """按查询参数中的基金ID或代码生成净值接口缓存的标签"""
+    fund_id = request.args.get('fund_id', type=int)
+    if not fund_id and request.args.get('fund_code'):
+        fund_id = db.session.query(Fund.id).filter_by(code=request.args.get('fund_code')).scalar()
+    return [fund_values_tag(fund_id)] if fund_id else []
@@ -1,16 +1,34 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import json
-import requests
 import time
 import re
+from datetime import datetime
+from sqlalchemy.orm import joinedload
 
-from app.extensions import db, redis_client
-from app.models import Fund, Note, FundValue
+from app.extensions import db, http_client
+from app.models import Fund, Note, FundValue, Purchase
+from app.services.chart_service import chart_data, DEFAULT_CHART_POINTS
+from app.services.comparison_service import (
+    compare_funds, DEFAULT_ROLLING_WINDOWS, DEFAULT_CORRELATION_WINDOW, MAX_COMPARE_FUNDS,
+    MAX_COMPARE_WINDOW, MAX_ROLLING_WINDOWS
+)
+from app.services.nav_lookup import pricing_date
+from app.services.nav_store import nav_store
+from app.services.risk_engine import parse_risk_windows
+from app.services.risk_service import get_fund_risk
+from app.services.screener import fund_screener, ScreenerQueryError
+from app.services.fund_service import invalidate_fund_caches
+from app.utils.cache import cached_response
+from app.utils.redis_utils import (
+    fund_detail_family, fund_notes_family, fund_tag, fund_values_tag,
+    FUND_LIST_FAMILY, FUND_SEARCH_FAMILY, FUND_DETAIL_FAMILY
+)
 
 funds_bp = Blueprint('funds', __name__)
 
 @funds_bp.route('', methods=['GET'])
+@cached_response(ttl=3600, families=FUND_LIST_FAMILY)
 def get_funds():
     """获取基金列表"""
     start_time = time.time()
@@ -22,20 +40,8 @@ def get_funds():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     
-    # 尝试从缓存获取
-    cache_key = f'funds:list:{keyword}:{fund_type}:{page}:{per_page}'
-    cached_data = redis_client.get(cache_key)
-    
-    if cached_data:
-        current_app.logger.info(f"缓存命中: {cache_key}")
-        response_time = time.time() - start_time
-        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
-        return jsonify(json.loads(cached_data)), 200
-    
-    current_app.logger.info(f"缓存未命中: {cache_key}")
-    
-    # 构建查询
-    query = Fund.query
+    # 构建查询，同时加载业绩汇总
+    query = Fund.query.options(joinedload(Fund.performance))
     
     # 如果有关键字，则搜索基金代码或名称
     if keyword:
@@ -58,7 +64,11 @@ def get_funds():
         pagination = query.paginate(page=page, per_page=per_page)
         
         # 构建响应
-        funds = [fund.to_dict() for fund in pagination.items]
+        funds = []
+        for fund in pagination.items:
+            fund_data = fund.to_dict()
+            fund_data['performance'] = fund.performance.to_dict() if fund.performance else None
+            funds.append(fund_data)
         
         response_data = {
             'funds': funds,
@@ -69,14 +79,6 @@ def get_funds():
         
         current_app.logger.info(f"查询结果: 共{pagination.total}条记录, 当前第{page}页")
         
-        # 缓存结果，设置过期时间为1小时
-        redis_client.setex(
-            cache_key,
-            3600,  # 1小时
-            json.dumps(response_data)
-        )
-        current_app.logger.info(f"缓存已设置: {cache_key}, 过期时间: 1小时")
-        
         response_time = time.time() - start_time
         current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
         return jsonify(response_data), 200
@@ -88,23 +90,12 @@ def get_funds():
 
 
 @funds_bp.route('/<string:code>', methods=['GET'])
+@cached_response(ttl=3600, families=lambda code: (fund_detail_family(code), FUND_DETAIL_FAMILY))
 def get_fund(code):
     """获取基金详情"""
     start_time = time.time()
     current_app.logger.info(f"API调用: 获取基金详情 - 基金代码: {code}")
     
-    # 尝试从缓存获取
-    cache_key = f'funds:detail:{code}'
-    cached_data = redis_client.get(cache_key)
-    
-    if cached_data:
-        current_app.logger.info(f"缓存命中: {cache_key}")
-        response_time = time.time() - start_time
-        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
-        return jsonify(json.loads(cached_data)), 200
-    
-    current_app.logger.info(f"缓存未命中: {cache_key}")
-    
     try:
         # 查询基金
         fund = Fund.query.filter_by(code=code).first()
@@ -125,14 +116,6 @@ def get_fund(code):
         
         current_app.logger.info(f"基金详情获取成功: {code}, 相关笔记数: {notes_count}")
         
-        # 缓存结果，设置过期时间为1小时
-        redis_client.setex(
-            cache_key,
-            3600,  # 1小时
-            json.dumps(fund_data)
-        )
-        current_app.logger.info(f"缓存已设置: {cache_key}, 过期时间: 1小时")
-        
         response_time = time.time() - start_time
         current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
         return jsonify(fund_data), 200
@@ -143,7 +126,208 @@ def get_fund(code):
         return jsonify({'message': '获取基金详情失败'}), 500
 
 
+@funds_bp.route('/<string:code>/chart', methods=['GET'])
+def get_fund_chart(code):
+    """获取降采样后的基金净值图表数据
+    
+    查询参数:
+    - period: 时间范围 1w/1m/3m/6m/1y/3y/5y/all（默认all），从最新净值日期往前计算
+    - start_date / end_date: 自定义日期范围 (YYYY-MM-DD)，提供时忽略period
+    - points: 最多返回的点数（默认500，最多5000）
+    """
+    start_time = time.time()
+    current_app.logger.info(f"API调用: 获取基金净值图表 - 基金代码: {code}, 参数: {request.args}")
+    
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        return jsonify({'message': '日期格式错误，应为YYYY-MM-DD'}), 400
+    
+    fund = Fund.query.filter_by(code=code).first()
+    if fund is None:
+        current_app.logger.warning(f"基金不存在: {code}")
+        return jsonify({'message': '基金不存在'}), 404
+    
+    try:
+        result = chart_data(
+            fund.id,
+            period=request.args.get('period', 'all'),
+            points=request.args.get('points', DEFAULT_CHART_POINTS, type=int),
+            start_date=start_date,
+            end_date=end_date
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    result['code'] = fund.code
+    response_time = time.time() - start_time
+    current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
+    return jsonify(result), 200
+
+
+@funds_bp.route('/<string:code>/risk', methods=['GET'])
+def get_fund_risk_metrics(code):
+    """获取基金风险指标，可通过windows参数指定统计窗口，如 windows=1y,3y,all"""
+    start_time = time.time()
+    windows_arg = request.args.get('windows', '')
+    current_app.logger.info(f"API调用: 获取基金风险指标 - 基金代码: {code}, 窗口: {windows_arg}")
+    
+    # 解析统计窗口，未指定时使用RISK_WINDOWS配置
+    try:
+        windows = parse_risk_windows(windows_arg) if windows_arg else None
+    except ValueError as e:
+        current_app.logger.warning(f"统计窗口格式错误: {windows_arg}")
+        return jsonify({'message': str(e)}), 400
+    
+    try:
+        # 查询基金
+        fund = Fund.query.filter_by(code=code).first()
+        
+        if fund is None:
+            current_app.logger.warning(f"基金不存在: {code}")
+            response_time = time.time() - start_time
+            current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
+            return jsonify({'message': '基金不存在'}), 404
+        
+        response_data = {
+            'code': fund.code,
+            'name': fund.name,
+            'risk_free_rate': current_app.config['RISK_FREE_RATE'],
+            'risk': get_fund_risk(fund.id, windows)
+        }
+        
+        response_time = time.time() - start_time
+        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
+        return jsonify(response_data), 200
+    except Exception as e:
+        current_app.logger.error(f"获取基金风险指标失败: {str(e)}")
+        response_time = time.time() - start_time
+        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
+        return jsonify({'message': '获取基金风险指标失败'}), 500
+
+
+@funds_bp.route('/screener', methods=['GET'])
+def screen_funds():
+    """按预先计算的收益和风险指标筛选、排序全部基金
+    
+    查询参数:
+    - sort: 排序字段，如year_change、max_drawdown、sharpe_ratio、size（默认year_change）
+    - order: desc或asc（默认desc）
+    - limit: 每页基金数（默认50，最多200）
+    - cursor: 上一页返回的next_cursor
+    - type / company: 基金类型、基金公司，多个用逗号分隔
+    - min_<字段> / max_<字段>: 数值字段的上下限，如 min_max_drawdown=-5 表示最大回撤不超过5%
+    """
+    start_time = time.time()
+    current_app.logger.info(f"API调用: 基金筛选 - 参数: {request.args}")
+    
+    # 解析数值范围
+    ranges = {}
+    for key in request.args:
+        if key.startswith('min_') or key.startswith('max_'):
+            field = key[4:]
+            value = request.args.get(key, type=float)
+            if value is None:
+                return jsonify({'message': f'参数{key}必须是数字'}), 400
+            lower, upper = ranges.get(field, (None, None))
+            ranges[field] = (value, upper) if key.startswith('min_') else (lower, value)
+    
+    types = [item for item in request.args.get('type', '').split(',') if item]
+    companies = [item for item in request.args.get('company', '').split(',') if item]
+    
+    try:
+        result = fund_screener.screen(
+            sort=request.args.get('sort', 'year_change'),
+            order=request.args.get('order', 'desc'),
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor'),
+            types=types,
+            companies=companies,
+            ranges=ranges
+        )
+    except ScreenerQueryError as e:
+        current_app.logger.warning(f"基金筛选参数错误: {str(e)}")
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"基金筛选失败: {str(e)}")
+        response_time = time.time() - start_time
+        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
+        return jsonify({'message': '基金筛选失败'}), 500
+    
+    current_app.logger.info(f"筛选结果: 共{result['total']}只基金, 本页{len(result['items'])}只")
+    response_time = time.time() - start_time
+    current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
+    return jsonify(result), 200
+
+
+@funds_bp.route('/compare', methods=['GET'])
+@jwt_required(optional=True)
+def compare_funds_api():
+    """对比多只基金的滚动收益率和相关系数
+    
+    查询参数:
+    - codes: 基金代码，逗号分隔；不提供时使用当前登录用户持有的基金
+    - windows: 滚动收益窗口（交易日数），逗号分隔（默认30,90,250），最多MAX_ROLLING_WINDOWS个，每个不超过MAX_COMPARE_WINDOW
+    - correlation_window: 计算相关系数的最近交易日数（默认250），不超过MAX_COMPARE_WINDOW
+    - start_date / end_date: 日期范围 (YYYY-MM-DD)，默认最近三年
+    """
+    start_time = time.time()
+    current_app.logger.info(f"API调用: 基金对比 - 参数: {request.args}")
+    
+    try:
+        windows = [int(item) for item in request.args.get('windows', '').split(',') if item] or DEFAULT_ROLLING_WINDOWS
+        correlation_window = request.args.get('correlation_window', DEFAULT_CORRELATION_WINDOW, type=int)
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        return jsonify({'message': '参数格式错误'}), 400
+    
+    if min(windows) <= 0 or correlation_window <= 1:
+        return jsonify({'message': '窗口必须为正整数'}), 400
+    if max(windows) > MAX_COMPARE_WINDOW or correlation_window > MAX_COMPARE_WINDOW:
+        return jsonify({'message': f'窗口不能超过{MAX_COMPARE_WINDOW}个交易日'}), 400
+    if len(set(windows)) > MAX_ROLLING_WINDOWS:
+        return jsonify({'message': f'最多指定{MAX_ROLLING_WINDOWS}个滚动收益窗口'}), 400
+    
+    codes = [code for code in request.args.get('codes', '').split(',') if code]
+    if codes:
+        funds = Fund.query.filter(Fund.code.in_(codes)).all()
+        missing = set(codes) - {fund.code for fund in funds}
+        if missing:
+            return jsonify({'message': f"基金不存在: {', '.join(sorted(missing))}"}), 404
+    else:
+        # 未指定基金时对比当前用户持有的基金
+        user_id = get_jwt_identity()
+        if user_id is None:
+            return jsonify({'message': '请提供基金代码或登录后对比持有的基金'}), 400
+        funds = Fund.query.join(Purchase, Purchase.fund_id == Fund.id)\
+            .filter(Purchase.user_id == user_id)\
+            .distinct().all()
+    
+    if not funds:
+        return jsonify({'message': '没有可对比的基金'}), 404
+    if len(funds) > MAX_COMPARE_FUNDS:
+        return jsonify({'message': f'最多同时对比{MAX_COMPARE_FUNDS}只基金'}), 400
+    
+    try:
+        result = compare_funds(funds, start_date, end_date, windows, correlation_window)
+        response_time = time.time() - start_time
+        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
+        return jsonify(result), 200
+    except Exception as e:
+        current_app.logger.error(f"基金对比失败: {str(e)}")
+        response_time = time.time() - start_time
+        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
+        return jsonify({'message': '基金对比失败'}), 500
+
+
 @funds_bp.route('/search', methods=['GET'])
+@cached_response(ttl=3600, families=FUND_SEARCH_FAMILY)
 def search_funds():
     """搜索基金"""
     start_time = time.time()
@@ -156,18 +340,6 @@ def search_funds():
         current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
         return jsonify({'message': '请提供搜索关键字'}), 400
     
-    # 尝试从缓存获取
-    cache_key = f'funds:search:{keyword}'
-    cached_data = redis_client.get(cache_key)
-    
-    if cached_data:
-        current_app.logger.info(f"缓存命中: {cache_key}")
-        response_time = time.time() - start_time
-        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
-        return jsonify(json.loads(cached_data)), 200
-    
-    current_app.logger.info(f"缓存未命中: {cache_key}")
-    
     try:
         # 搜索基金
         funds = Fund.query.filter(
@@ -180,14 +352,6 @@ def search_funds():
         
         current_app.logger.info(f"搜索结果: 找到{len(funds_data)}个基金")
         
-        # 缓存结果，设置过期时间为1小时
-        redis_client.setex(
-            cache_key,
-            3600,  # 1小时
-            json.dumps(funds_data)
-        )
-        current_app.logger.info(f"缓存已设置: {cache_key}, 过期时间: 1小时")
-        
         response_time = time.time() - start_time
         current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
         return jsonify(funds_data), 200
@@ -222,6 +386,7 @@ def sync_funds():
 
 
 @funds_bp.route('/<string:code>/notes', methods=['GET'])
+@cached_response(ttl=600, families=lambda code: fund_notes_family(code))
 def get_fund_notes(code):
     """获取基金相关笔记"""
     start_time = time.time()
@@ -241,18 +406,6 @@ def get_fund_notes(code):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        # 尝试从缓存获取
-        cache_key = f'fund_notes:{fund.id}:{page}:{per_page}'
-        cached_data = redis_client.get(cache_key)
-        
-        if cached_data:
-            current_app.logger.info(f"缓存命中: {cache_key}")
-            response_time = time.time() - start_time
-            current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
-            return jsonify(json.loads(cached_data)), 200
-        
-        current_app.logger.info(f"缓存未命中: {cache_key}")
-        
         # 查询笔记
         pagination = Note.query.filter_by(
             fund_id=fund.id,
@@ -284,14 +437,6 @@ def get_fund_notes(code):
         
         current_app.logger.info(f"基金笔记查询结果: 基金代码 {code}, 共{pagination.total}条笔记, 当前第{page}页")
         
-        # 缓存结果，设置过期时间为10分钟
-        redis_client.setex(
-            cache_key,
-            600,  # 10分钟
-            json.dumps(response_data)
-        )
-        current_app.logger.info(f"缓存已设置: {cache_key}, 过期时间: 10分钟")
-        
         response_time = time.time() - start_time
         current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
         return jsonify(response_data), 200
@@ -303,32 +448,19 @@ def get_fund_notes(code):
 
 
 @funds_bp.route('/query_external/<string:code>', methods=['GET'])
+@cached_response(ttl=600, tags=lambda code: [fund_tag(code)])
 def query_external_fund(code):
     """从天天基金网API查询基金信息"""
     start_time = time.time()
     current_app.logger.info(f"API调用: 从天天基金网查询基金信息 - 基金代码: {code}")
     
-    # 尝试从缓存获取
-    cache_key = f'funds:external:{code}'
-    cached_data = redis_client.get(cache_key)
-    
-    if cached_data:
-        current_app.logger.info(f"缓存命中: {cache_key}")
-        response_time = time.time() - start_time
-        current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
-        return jsonify(json.loads(cached_data)), 200
-    
-    current_app.logger.info(f"缓存未命中: {cache_key}")
-    
     try:
         # 查询天天基金网API获取基金实时信息
         # 接口1: 基金实时信息
         url = f'http://fundgz.1234567.com.cn/js/{code}.js?rt={int(time.time() * 1000)}'
         current_app.logger.info(f"请求天天基金网API: {url}")
         
-        response = requests.get(url, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        response = http_client.get(url)
         
         if response.status_code != 200:
             current_app.logger.error(f"天天基金网API请求失败: 状态码 {response.status_code}")
@@ -347,9 +479,7 @@ def query_external_fund(code):
             detail_url = f'http://fund.eastmoney.com/pingzhongdata/{code}.js?v={int(time.time() * 1000)}'
             current_app.logger.info(f"请求天天基金网详细信息API: {detail_url}")
             
-            detail_response = requests.get(detail_url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            })
+            detail_response = http_client.get(detail_url)
             
             fund_type = ""
             manager = ""
@@ -395,14 +525,6 @@ def query_external_fund(code):
                 'company': company
             }
             
-            # 缓存结果，设置过期时间为10分钟
-            redis_client.setex(
-                cache_key,
-                600,  # 10分钟
-                json.dumps(result)
-            )
-            current_app.logger.info(f"缓存已设置: {cache_key}, 过期时间: 10分钟")
-            
             response_time = time.time() - start_time
             current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
             return jsonify(result), 200
@@ -431,9 +553,7 @@ def sync_from_external(code):
         url = f'http://fundgz.1234567.com.cn/js/{code}.js?rt={int(time.time() * 1000)}'
         current_app.logger.info(f"请求天天基金网API: {url}")
         
-        response = requests.get(url, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        response = http_client.get(url)
         
         if response.status_code != 200:
             current_app.logger.error(f"天天基金网API请求失败: 状态码 {response.status_code}")
@@ -469,14 +589,9 @@ def sync_from_external(code):
             
             db.session.commit()
             
-            # 清除相关缓存
-            cache_keys = [
-                f'funds:detail:{code}',
-                f'funds:external:{code}'
-            ]
-            for key in cache_keys:
-                redis_client.delete(key)
-                current_app.logger.info(f"清除缓存: {key}")
+            # 清除相关缓存（基金详情、外部查询，以及包含该基金的列表和搜索结果）
+            invalidate_fund_caches([code])
+            current_app.logger.info(f"清除缓存: 基金 {code}")
             
             response_time = time.time() - start_time
             current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
@@ -506,9 +621,7 @@ def sync_all_from_external():
         url = 'http://fund.eastmoney.com/js/fundcode_search.js'
         current_app.logger.info(f"请求天天基金网基金列表API: {url}")
         
-        response = requests.get(url, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        response = http_client.get(url)
         
         if response.status_code != 200:
             current_app.logger.error(f"天天基金网API请求失败: 状态码 {response.status_code}")
@@ -567,8 +680,8 @@ def sync_all_from_external():
             db.session.commit()
             
             # 清除相关缓存
-            redis_client.delete('funds:list:*')
-            current_app.logger.info(f"清除基金列表缓存")
+            invalidate_fund_caches()
+            current_app.logger.info(f"清除基金列表、搜索和详情缓存")
             
             response_time = time.time() - start_time
             current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
@@ -617,7 +730,7 @@ def search_fund(code):
     try:
         # 从天天基金网获取基金信息
         url = f"http://fundgz.1234567.com.cn/js/{code}.js"
-        response = requests.get(url, timeout=5)
+        response = http_client.get(url, timeout=5)
         
         # 天天基金返回的是一个JavaScript回调，需要提取JSON部分
         if response.status_code == 200 and "jsonpgz" in response.text:
@@ -655,6 +768,7 @@ def search_fund(code):
 
 
 @funds_bp.route('/<string:code>/values', methods=['GET'])
+@cached_response(ttl=3600, tags=lambda code: _fund_values_tags(code))
 def get_fund_values(code):
     """获取基金净值，可通过date参数获取指定日期的净值"""
     start_time = time.time()
@@ -677,62 +791,42 @@ def get_fund_values(code):
         if date:
             try:
                 target_date = datetime.strptime(date, '%Y-%m-%d').date()
-                # 尝试从缓存获取
-                cache_key = f'fund_value:{fund.id}:{date}'
-                cached_data = redis_client.get(cache_key)
                 
-                if cached_data:
-                    current_app.logger.info(f"缓存命中: {cache_key}")
-                    response_time = time.time() - start_time
-                    current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
-                    return jsonify(json.loads(cached_data)), 200
+                # 提供before_cutoff时按申购规则取T日或T+1日的净值
+                before_cutoff = request.args.get('before_cutoff')
+                if before_cutoff is not None:
+                    target_date = pricing_date(target_date, before_cutoff.lower() in ('1', 'true', 'yes'))
+                    date = target_date.isoformat()
                 
-                # 查询指定日期的净值记录
-                fund_value = FundValue.query.filter_by(fund_id=fund.id, date=target_date).first()
+                # 从净值序列缓存查找不晚于指定日期的最后一条净值
+                fund_value = nav_store.get(fund.id).as_of(target_date)
                 
-                if fund_value:
+                if fund_value and fund_value['date'] == target_date:
                     result = {
                         'code': code,
                         'date': date,
-                        'value': fund_value.net_value,
-                        'accumulated_value': fund_value.accumulated_value,
-                        'daily_change': fund_value.daily_change
+                        'value': fund_value['net_value'],
+                        'accumulated_value': fund_value['accumulated_value'],
+                        'daily_change': fund_value['daily_change']
                     }
                     
-                    # 缓存结果，设置过期时间为1小时
-                    redis_client.setex(
-                        cache_key,
-                        3600,  # 1小时
-                        json.dumps(result)
-                    )
-                    
                     response_time = time.time() - start_time
                     current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
                     return jsonify(result), 200
                 else:
-                    # 如果没有找到指定日期的净值，尝试查找最近的净值记录
-                    closest_value = FundValue.query.filter(
-                        FundValue.fund_id == fund.id,
-                        FundValue.date <= target_date
-                    ).order_by(FundValue.date.desc()).first()
+                    # 如果没有找到指定日期的净值，使用最近的净值记录
+                    closest_value = fund_value
                     
                     if closest_value:
                         result = {
                             'code': code,
-                            'date': closest_value.date.isoformat(),
-                            'value': closest_value.net_value,
-                            'accumulated_value': closest_value.accumulated_value,
-                            'daily_change': closest_value.daily_change,
+                            'date': closest_value['date'].isoformat(),
+                            'value': closest_value['net_value'],
+                            'accumulated_value': closest_value['accumulated_value'],
+                            'daily_change': closest_value['daily_change'],
                             'is_exact_date': False
                         }
                         
-                        # 缓存结果，设置过期时间为1小时
-                        redis_client.setex(
-                            cache_key,
-                            3600,  # 1小时
-                            json.dumps(result)
-                        )
-                        
                         response_time = time.time() - start_time
                         current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
                         return jsonify(result), 200
@@ -744,16 +838,6 @@ def get_fund_values(code):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        # 尝试从缓存获取
-        cache_key = f'fund_values:{fund.id}:{page}:{per_page}'
-        cached_data = redis_client.get(cache_key)
-        
-        if cached_data:
-            current_app.logger.info(f"缓存命中: {cache_key}")
-            response_time = time.time() - start_time
-            current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
-            return jsonify(json.loads(cached_data)), 200
-        
         # 查询净值记录
         pagination = FundValue.query.filter_by(fund_id=fund.id)\
             .order_by(FundValue.date.desc())\
@@ -770,13 +854,6 @@ def get_fund_values(code):
             'current_page': page
         }
         
-        # 缓存结果，设置过期时间为1小时
-        redis_client.setex(
-            cache_key,
-            3600,  # 1小时
-            json.dumps(result)
-        )
-        
         response_time = time.time() - start_time
         current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
         return jsonify(result), 200
@@ -784,4 +861,10 @@ def get_fund_values(code):
         current_app.logger.error(f"获取基金净值失败: {str(e)}")
         response_time = time.time() - start_time
         current_app.logger.info(f"API响应时间: {response_time:.3f}秒")
-        return jsonify({'message': '获取基金净值失败'}), 500 
\ No newline at end of file
+        return jsonify({'message': '获取基金净值失败'}), 500
+
+
+def _fund_values_tags(code):
+    """净值接口缓存的标签，净值写入或业绩更新后按基金ID失效"""
+    fund_id = db.session.query(Fund.id).filter_by(code=code).scalar()
+    return [fund_values_tag(fund_id)] if fund_id else []
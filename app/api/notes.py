@@ -2,12 +2,16 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import json
 
-from app.extensions import db, redis_client
+from app.extensions import db
 from app.models import Note, User, Fund
+from app.services.note_service import invalidate_note_caches
+from app.utils.cache import cached_response
+from app.utils.redis_utils import NOTES_FAMILY
 
 notes_bp = Blueprint('notes', __name__)
 
 @notes_bp.route('', methods=['GET'])
+@cached_response(ttl=600, families=NOTES_FAMILY)
 def get_notes():
     """获取笔记列表"""
     # 获取查询参数
@@ -66,6 +70,8 @@ def get_notes():
 
 
 @notes_bp.route('/<int:note_id>', methods=['GET'])
+# 登录用户可能读取自己的非公开笔记，只缓存匿名请求
+@cached_response(ttl=600, families=NOTES_FAMILY, unless=lambda note_id: 'Authorization' in request.headers)
 def get_note(note_id):
     """获取单个笔记"""
     note = Note.query.get(note_id)
@@ -137,9 +143,7 @@ def create_note():
     db.session.commit()
     
     # 清除相关缓存
-    cache_key = f'fund_notes:{data["fund_id"]}'
-    if redis_client.exists(cache_key):
-        redis_client.delete(cache_key)
+    invalidate_note_caches(note.fund)
     
     return jsonify({
         'message': '笔记创建成功',
@@ -179,9 +183,7 @@ def update_note(note_id):
     db.session.commit()
     
     # 清除相关缓存
-    cache_key = f'fund_notes:{note.fund_id}'
-    if redis_client.exists(cache_key):
-        redis_client.delete(cache_key)
+    invalidate_note_caches(note.fund)
     
     return jsonify({
         'message': '笔记更新成功',
@@ -203,16 +205,14 @@ def delete_note(note_id):
     if note.user_id != user_id:
         return jsonify({'message': '无权删除此笔记'}), 403
     
-    # 保存基金ID用于清除缓存
-    fund_id = note.fund_id
+    # 保存基金用于清除缓存
+    fund = note.fund
     
     # 删除笔记
     db.session.delete(note)
     db.session.commit()
     
     # 清除相关缓存
-    cache_key = f'fund_notes:{fund_id}'
-    if redis_client.exists(cache_key):
-        redis_client.delete(cache_key)
+    invalidate_note_caches(fund)
     
     return jsonify({'message': '笔记删除成功'}), 200 
\ No newline at end of file
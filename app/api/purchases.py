@@ -4,6 +4,8 @@ from datetime import datetime
 
 from app.extensions import db
 from app.models import Purchase, Fund
+from app.services.portfolio_service import get_user_portfolio
+from app.services.returns_service import get_user_returns
 
 purchases_bp = Blueprint('purchases', __name__)
 
@@ -53,6 +55,29 @@ def get_purchases():
     }), 200
 
 
+@purchases_bp.route('/portfolio', methods=['GET'])
+@jwt_required()
+def get_portfolio():
+    """获取用户持仓：按基金汇总的份额、成本、市值、盈亏和权重
+    
+    查询参数:
+    - fund_id: 可选，只计算指定基金
+    """
+    user_id = get_jwt_identity()
+    fund_id = request.args.get('fund_id', type=int)
+    
+    return jsonify(get_user_portfolio(user_id, fund_id)), 200
+
+
+@purchases_bp.route('/returns', methods=['GET'])
+@jwt_required()
+def get_returns():
+    """获取用户持仓的年化资金加权收益率（XIRR）和时间加权收益率（TWR），按基金和整个组合分别计算"""
+    user_id = get_jwt_identity()
+    
+    return jsonify(get_user_returns(user_id)), 200
+
+
 @purchases_bp.route('/<int:purchase_id>', methods=['GET'])
 @jwt_required()
 def get_purchase(purchase_id):
@@ -107,6 +132,9 @@ def create_purchase():
     except ValueError:
         return jsonify({'message': '日期格式无效，应为YYYY-MM-DD'}), 400
     
+    if not _valid_before_cutoff(data.get('before_cutoff')):
+        return jsonify({'message': 'before_cutoff必须为布尔值'}), 400
+    
     # 创建购买记录
     purchase = Purchase(
         user_id=user_id,
@@ -117,7 +145,7 @@ def create_purchase():
         purchase_date=purchase_date,
         fee=data.get('fee', 0.0),
         notes=data.get('notes', ''),
-        before_cutoff=data.get('before_cutoff', True)
+        before_cutoff=True if data.get('before_cutoff') is None else data['before_cutoff']
     )
     
     db.session.add(purchase)
@@ -145,6 +173,9 @@ def update_purchase(purchase_id):
     
     data = request.get_json()
     
+    if not _valid_before_cutoff(data.get('before_cutoff')):
+        return jsonify({'message': 'before_cutoff必须为布尔值'}), 400
+    
     # 更新购买记录
     if 'amount' in data:
         purchase.amount = data['amount']
@@ -168,7 +199,7 @@ def update_purchase(purchase_id):
         purchase.notes = data['notes']
         
     if 'before_cutoff' in data:
-        purchase.before_cutoff = data['before_cutoff']
+        purchase.before_cutoff = True if data['before_cutoff'] is None else data['before_cutoff']
     
     db.session.commit()
     
@@ -195,4 +226,9 @@ def delete_purchase(purchase_id):
     db.session.delete(purchase)
     db.session.commit()
     
-    return jsonify({'message': '购买记录删除成功'}), 200 
\ No newline at end of file
+    return jsonify({'message': '购买记录删除成功'}), 200
+
+
+def _valid_before_cutoff(value):
+    """before_cutoff只接受布尔值，未提供或为null时按15:00前处理"""
+    return value is None or isinstance(value, bool)
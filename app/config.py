@@ -40,6 +40,53 @@ class Config:
     # 微信小程序配置
     WECHAT_APPID = os.environ.get('WECHAT_APPID', '')
     WECHAT_SECRET = os.environ.get('WECHAT_SECRET', '')
+    
+    # 上游HTTP请求配置
+    HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', '10'))  # 请求超时（秒）
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', '3'))  # 5xx/超时的最大重试次数
+    HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', '0.5'))  # 重试退避系数（秒）
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '32'))  # 每个主机的连接池大小
+    UPSTREAM_HOST_OVERRIDES = os.environ.get('UPSTREAM_HOST_OVERRIDES', '')  # 把上游主机重定向到其他地址，如 api.fund.eastmoney.com=http://127.0.0.1:8900
+    
+    # 上游限流与熔断配置
+    UPSTREAM_RATE_LIMIT = float(os.environ.get('UPSTREAM_RATE_LIMIT', '10'))  # 每个主机默认每秒请求数，<=0表示不限流
+    UPSTREAM_RATE_BURST = float(os.environ.get('UPSTREAM_RATE_BURST', '20'))  # 每个主机默认令牌桶容量
+    # 按主机覆盖默认限流，格式: host=rate:burst,host2=rate:burst
+    UPSTREAM_RATE_LIMITS = os.environ.get(
+        'UPSTREAM_RATE_LIMITS',
+        'api.fund.eastmoney.com=20:40,fundgz.1234567.com.cn=10:20,fund.eastmoney.com=10:20'
+    )
+    UPSTREAM_RATE_MAX_WAIT = float(os.environ.get('UPSTREAM_RATE_MAX_WAIT', '30'))  # 等待令牌的最长时间（秒）
+    CIRCUIT_BREAKER_FAILURES = int(os.environ.get('CIRCUIT_BREAKER_FAILURES', '5'))  # 连续失败多少次后熔断，<=0表示关闭熔断
+    CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_BREAKER_RESET_TIMEOUT', '30'))  # 熔断后多久进入半开状态（秒）
+    
+    # 基金净值抓取配置
+    FUND_FETCH_MAX_WORKERS = int(os.environ.get('FUND_FETCH_MAX_WORKERS', '16'))  # 同时抓取的基金数
+    FUND_FETCH_PAGE_WORKERS = int(os.environ.get('FUND_FETCH_PAGE_WORKERS', '16'))  # 同时抓取的分页数
+    FUND_FETCH_PER_HOST_LIMIT = int(os.environ.get('FUND_FETCH_PER_HOST_LIMIT', '8'))  # 单个上游主机的最大并发请求数
+    EASTMONEY_MAX_PAGE_SIZE = int(os.environ.get('EASTMONEY_MAX_PAGE_SIZE', '1000'))  # 净值接口探测页面大小的上限
+    FUND_VALUE_BATCH_SIZE = int(os.environ.get('FUND_VALUE_BATCH_SIZE', '500'))  # 净值批量写入的每批记录数
+    BACKFILL_WINDOW_DAYS = int(os.environ.get('BACKFILL_WINDOW_DAYS', '365'))  # 全量回填时每个检查点窗口的天数
+    BACKFILL_FLOOR_DATE = os.environ.get('BACKFILL_FLOOR_DATE', '1998-01-01')  # 全量回填最早回溯到的日期
+    TRADING_HOLIDAYS_FILE = os.environ.get('TRADING_HOLIDAYS_FILE', '')  # 交易所休市日JSON文件，为空时使用内置列表
+    RISK_WINDOWS = os.environ.get('RISK_WINDOWS', '1y,3y,5y,all')  # 风险指标统计窗口，Nm为N个月、Ny为N年、all为成立以来
+    RISK_FREE_RATE = float(os.environ.get('RISK_FREE_RATE', '0.015'))  # 计算夏普和索提诺比率的年化无风险利率
+    SCREENER_RISK_PERIOD = os.environ.get('SCREENER_RISK_PERIOD', '1y')  # 筛选器使用的风险指标窗口，需包含在RISK_WINDOWS中
+    SCREENER_SNAPSHOT_TTL = float(os.environ.get('SCREENER_SNAPSHOT_TTL', '300'))  # 筛选器快照在进程内的缓存时间（秒）
+    COMPARISON_CACHE_TTL = int(os.environ.get('COMPARISON_CACHE_TTL', '3600'))  # 基金对比结果的缓存时间（秒）
+    RETURNS_CACHE_TTL = int(os.environ.get('RETURNS_CACHE_TTL', '3600'))  # 用户持仓XIRR/TWR结果的缓存时间（秒）
+    NAV_STORE_MAX_BYTES = int(os.environ.get('NAV_STORE_MAX_BYTES', str(256 * 1024 * 1024)))  # 进程内净值序列缓存的内存上限（字节）
+    NAV_STORE_TTL = float(os.environ.get('NAV_STORE_TTL', '300'))  # 净值序列缓存的有效期（秒），其他进程写入的数据在此之后可见
+    CACHE_L1_ENABLED = os.environ.get('CACHE_L1_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # 是否在Redis前启用进程内缓存
+    CACHE_L1_MAX_ENTRIES = int(os.environ.get('CACHE_L1_MAX_ENTRIES', '10000'))  # 进程内缓存的最大条目数
+    CACHE_L1_MAX_BYTES = int(os.environ.get('CACHE_L1_MAX_BYTES', str(64 * 1024 * 1024)))  # 进程内缓存的内存上限（字节）
+    CACHE_L1_TTL = float(os.environ.get('CACHE_L1_TTL', '30'))  # 进程内缓存条目的最长有效期（秒），失效广播丢失时的最大延迟
+    CACHE_INVALIDATION_CHANNEL = os.environ.get('CACHE_INVALIDATION_CHANNEL', 'cache:invalidate')  # 广播缓存失效的Redis频道
+    CACHE_STALE_TTL = int(os.environ.get('CACHE_STALE_TTL', '300'))  # 接口缓存逻辑过期后仍可返回旧结果并后台刷新的时间（秒）
+    CACHE_EARLY_EXPIRATION_BETA = float(os.environ.get('CACHE_EARLY_EXPIRATION_BETA', '1.0'))  # 概率提前过期的系数，越大越早刷新，0表示关闭
+    CACHE_LOCK_TIMEOUT = int(os.environ.get('CACHE_LOCK_TIMEOUT', '30'))  # 重新计算缓存时持有Redis锁的最长时间（秒）
+    CACHE_LOCK_WAIT = float(os.environ.get('CACHE_LOCK_WAIT', '5'))  # 其他进程正在计算时等待结果的最长时间（秒）
+    CACHE_REFRESH_WORKERS = int(os.environ.get('CACHE_REFRESH_WORKERS', '4'))  # 每个进程后台刷新缓存的线程数
 
 
 class DevelopmentConfig(Config):
@@ -4,6 +4,11 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_login import LoginManager
 import redis
+from app.utils.concurrency import HostLimiter
+from app.utils.http_client import HttpClient
+from app.utils.local_cache import LocalCache
+from app.utils.rate_limiter import TokenBucketRateLimiter, CircuitBreaker
+from app.utils.trading_calendar import TradingCalendar
 
 # 初始化扩展
 db = SQLAlchemy()
@@ -11,6 +16,12 @@ migrate = Migrate()
 jwt = JWTManager()
 login_manager = LoginManager()
 redis_client = None
+host_limiter = HostLimiter()
+rate_limiter = TokenBucketRateLimiter()
+circuit_breaker = CircuitBreaker()
+http_client = HttpClient(limiter=host_limiter, rate_limiter=rate_limiter, circuit_breaker=circuit_breaker)
+trading_calendar = TradingCalendar()
+local_cache = LocalCache()
 
 def init_extensions(app):
     """初始化所有扩展"""
@@ -25,6 +36,22 @@ def init_extensions(app):
     login_manager.login_message = '请先登录再访问此页面'
     login_manager.login_message_category = 'info'
     
+    # 初始化上游主机并发限制
+    host_limiter.init_app(app)
+    
     # 初始化Redis
     global redis_client
-    redis_client = redis.from_url(app.config['REDIS_URL']) 
\ No newline at end of file
+    redis_client = redis.from_url(app.config['REDIS_URL'])
+    
+    # 初始化上游限流和熔断（通过Redis在所有进程间共享状态）
+    rate_limiter.init_app(app, redis_client)
+    circuit_breaker.init_app(app, redis_client)
+    
+    # 初始化Redis前的进程内缓存（通过Redis发布/订阅在所有进程间同步失效）
+    local_cache.init_app(app, redis_client)
+    
+    # 初始化共享HTTP客户端
+    http_client.init_app(app)
+    
+    # 初始化交易日历
+    trading_calendar.init_app(app) 
\ No newline at end of file
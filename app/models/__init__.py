@@ -3,5 +3,7 @@ from app.models.fund import Fund
 from app.models.note import Note
 from app.models.purchase import Purchase
 from app.models.fund_value import FundValue
+from app.models.fund_performance import FundPerformance
+from app.models.fund_risk import FundRisk
 
-__all__ = ['User', 'Fund', 'Note', 'Purchase', 'FundValue'] 
\ No newline at end of file
+__all__ = ['User', 'Fund', 'Note', 'Purchase', 'FundValue', 'FundPerformance', 'FundRisk'] 
\ No newline at end of file
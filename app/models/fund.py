@@ -21,6 +21,8 @@ class Fund(db.Model):
     notes = db.relationship('Note', backref='fund', lazy='dynamic')
     purchases = db.relationship('Purchase', backref='fund', lazy='dynamic')
     values = db.relationship('FundValue', backref='fund', lazy='dynamic', order_by='FundValue.date.desc()')
+    performance = db.relationship('FundPerformance', backref='fund', uselist=False)
+    risks = db.relationship('FundRisk', backref='fund', lazy='dynamic')
     
     def to_dict(self):
         return {
@@ -0,0 +1,71 @@
+from datetime import datetime
+from app.extensions import db
+
+class FundPerformance(db.Model):
+    """基金业绩汇总模型，每只基金一行，在新净值写入后增量重算"""
+    __tablename__ = 'fund_performance'
+    
+    fund_id = db.Column(db.Integer, db.ForeignKey('funds.id'), primary_key=True)
+    latest_value_id = db.Column(db.Integer)  # 最新净值记录ID
+    latest_date = db.Column(db.Date, nullable=False)  # 最新净值日期
+    net_value = db.Column(db.Float)  # 最新单位净值
+    accumulated_value = db.Column(db.Float)  # 最新累计净值
+    daily_change = db.Column(db.Float)  # 最新日涨跌幅（百分比）
+    week_change = db.Column(db.Float)  # 近一周涨跌幅（百分比）
+    month_change = db.Column(db.Float)  # 近一月涨跌幅（百分比）
+    three_month_change = db.Column(db.Float)  # 近三月涨跌幅（百分比）
+    six_month_change = db.Column(db.Float)  # 近六月涨跌幅（百分比）
+    year_change = db.Column(db.Float)  # 近一年涨跌幅（百分比）
+    three_year_change = db.Column(db.Float)  # 近三年涨跌幅（百分比）
+    five_year_change = db.Column(db.Float)  # 近五年涨跌幅（百分比）
+    since_inception_change = db.Column(db.Float)  # 成立以来涨跌幅（百分比）
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def update_from(self, latest_value, performance):
+        """用最新净值记录和各区间收益率刷新汇总"""
+        self.latest_value_id = latest_value.id
+        self.latest_date = latest_value.date
+        self.net_value = latest_value.net_value
+        self.accumulated_value = latest_value.accumulated_value
+        self.daily_change = latest_value.daily_change
+        self.week_change = performance['week']
+        self.month_change = performance['month']
+        self.three_month_change = performance['three_month']
+        self.six_month_change = performance['six_month']
+        self.year_change = performance['year']
+        self.three_year_change = performance['three_year']
+        self.five_year_change = performance['five_year']
+        self.since_inception_change = performance['since_inception']
+    
+    @property
+    def performance(self):
+        """与calculate_fund_performance相同结构的收益率字典"""
+        return {
+            'week': self.week_change,
+            'month': self.month_change,
+            'three_month': self.three_month_change,
+            'six_month': self.six_month_change,
+            'year': self.year_change,
+            'three_year': self.three_year_change,
+            'five_year': self.five_year_change,
+            'since_inception': self.since_inception_change
+        }
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'fund_id': self.fund_id,
+            'latest_date': self.latest_date.isoformat(),
+            'net_value': self.net_value,
+            'accumulated_value': self.accumulated_value,
+            'daily_change': self.daily_change,
+            'week_change': self.week_change,
+            'month_change': self.month_change,
+            'three_month_change': self.three_month_change,
+            'six_month_change': self.six_month_change,
+            'year_change': self.year_change,
+            'three_year_change': self.three_year_change,
+            'five_year_change': self.five_year_change,
+            'since_inception_change': self.since_inception_change,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
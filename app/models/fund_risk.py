@@ -0,0 +1,44 @@
+from datetime import datetime
+from app.extensions import db
+
+class FundRisk(db.Model):
+    """基金风险指标模型，每只基金每个统计窗口一行，由定时任务批量刷新"""
+    __tablename__ = 'fund_risk'
+    
+    fund_id = db.Column(db.Integer, db.ForeignKey('funds.id'), primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)  # 统计窗口，如1y、3y、all
+    start_date = db.Column(db.Date)  # 窗口内第一条净值日期
+    end_date = db.Column(db.Date)  # 窗口内最后一条净值日期
+    annualized_return = db.Column(db.Float)  # 年化收益率（百分比）
+    volatility = db.Column(db.Float)  # 年化波动率（百分比）
+    max_drawdown = db.Column(db.Float)  # 最大回撤（百分比，负数）
+    max_drawdown_peak_date = db.Column(db.Date)  # 最大回撤开始的最高点日期
+    max_drawdown_trough_date = db.Column(db.Date)  # 最大回撤的最低点日期
+    max_drawdown_recovery_date = db.Column(db.Date)  # 回到最高点的日期，尚未恢复时为空
+    sharpe_ratio = db.Column(db.Float)  # 夏普比率
+    sortino_ratio = db.Column(db.Float)  # 索提诺比率
+    calmar_ratio = db.Column(db.Float)  # 卡玛比率
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def update_from(self, risk):
+        """用compute_risk返回的单个窗口结果刷新指标"""
+        for key, value in risk.items():
+            setattr(self, key, value)
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'period': self.period,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'annualized_return': self.annualized_return,
+            'volatility': self.volatility,
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_peak_date': self.max_drawdown_peak_date.isoformat() if self.max_drawdown_peak_date else None,
+            'max_drawdown_trough_date': self.max_drawdown_trough_date.isoformat() if self.max_drawdown_trough_date else None,
+            'max_drawdown_recovery_date': self.max_drawdown_recovery_date.isoformat() if self.max_drawdown_recovery_date else None,
+            'sharpe_ratio': self.sharpe_ratio,
+            'sortino_ratio': self.sortino_ratio,
+            'calmar_ratio': self.calmar_ratio,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
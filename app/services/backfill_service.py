@@ -0,0 +1,212 @@
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from app import extensions
+from app.models import Fund
+from app.services.fund_value_ingest import ingest_fund_values
+from app.services.fund_value_service import update_performance_metrics_batch
+
+logger = logging.getLogger(__name__)
+
+def run_backfill(job_name='default', end_date=None, min_fund_id=None, max_fund_id=None, resume=True,
+                 window_days=None, max_workers=None, batch_size=None, max_failures=3):
+    """可断点续传的全量历史净值回填
+
+    每只基金从结束日期开始按window_days天的窗口向前回溯，直到窗口内没有数据、
+    早于成立日期或早于BACKFILL_FLOOR_DATE。每个窗口写入后立即把进度
+    （已完成的最早日期）记录到Redis哈希中，进程崩溃后重新运行同一任务即可从断点继续。
+    多个进程可以使用同一任务名、按不同的基金ID范围分片并行运行。
+
+    Args:
+        job_name: 任务名，用于区分不同的回填任务的检查点
+        end_date: 回填的结束日期 (YYYY-MM-DD)，默认今天；续传时沿用任务首次运行时的值
+        min_fund_id: 分片的最小基金ID（含）
+        max_fund_id: 分片的最大基金ID（含）
+        resume: 为False时清除检查点从头开始；指定了基金ID范围时只清除该范围内基金的检查点
+        window_days: 每个抓取窗口的天数，默认读取BACKFILL_WINDOW_DAYS配置
+        max_workers: 同时抓取的基金数
+        batch_size: 每批写入的记录数
+        max_failures: 单只基金连续失败多少次后放弃
+
+    Returns:
+        包含funds、done、failed、rows、elapsed、rows_per_second、funds_per_second的统计字典
+    """
+    redis_client = extensions.redis_client
+    meta_key = f'backfill:{job_name}:meta'
+    funds_key = f'backfill:{job_name}:funds'
+
+    if not resume:
+        if min_fund_id is None and max_fund_id is None:
+            redis_client.delete(meta_key, funds_key)
+        else:
+            # 只清除本分片范围内的检查点，同一任务其他分片的进度和结束日期保留
+            shard_fund_ids = [
+                fund_id for fund_id in redis_client.hkeys(funds_key)
+                if (min_fund_id is None or int(fund_id) >= min_fund_id)
+                and (max_fund_id is None or int(fund_id) <= max_fund_id)
+            ]
+            if shard_fund_ids:
+                redis_client.hdel(funds_key, *shard_fund_ids)
+
+    # 续传时沿用首次运行的结束日期，保证各分片和各次运行的窗口一致
+    stored_end_date = redis_client.hget(meta_key, 'end_date')
+    if stored_end_date:
+        end_date = stored_end_date.decode('utf-8')
+    else:
+        end_date = end_date or datetime.now().date().strftime('%Y-%m-%d')
+        redis_client.hset(meta_key, mapping={
+            'end_date': end_date,
+            'created_at': datetime.utcnow().isoformat()
+        })
+
+    if window_days is None:
+        window_days = current_app.config.get('BACKFILL_WINDOW_DAYS', 365)
+    floor_date = datetime.strptime(current_app.config.get('BACKFILL_FLOOR_DATE', '1998-01-01'), '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+
+    query = Fund.query
+    if min_fund_id is not None:
+        query = query.filter(Fund.id >= min_fund_id)
+    if max_fund_id is not None:
+        query = query.filter(Fund.id <= max_fund_id)
+    funds = query.order_by(Fund.id).all()
+
+    checkpoints = {
+        int(fund_id): json.loads(value)
+        for fund_id, value in redis_client.hgetall(funds_key).items()
+    }
+
+    # 初始化待处理基金的状态，已完成或已放弃的基金直接跳过
+    pending = {}
+    for fund in funds:
+        state = checkpoints.get(fund.id) or {'status': 'running', 'oldest_date': None, 'rows': 0, 'failures': 0}
+        if state['status'] in ('done', 'failed'):
+            continue
+        state['code'] = fund.code
+        state['inception_date'] = fund.inception_date
+        pending[fund.id] = state
+
+    fund_ids = {fund.id for fund in funds}
+    finished_before = [state['status'] for fund_id, state in checkpoints.items() if fund_id in fund_ids]
+    stats = {
+        'funds': len(funds),
+        'done': finished_before.count('done'),
+        'failed': finished_before.count('failed'),
+        'rows': 0,
+        'elapsed': 0.0,
+        'rows_per_second': 0.0,
+        'funds_per_second': 0.0
+    }
+    logger.info(f"Backfill job {job_name}: {len(funds)} funds in range, {len(pending)} pending, end date {end_date}")
+
+    started_at = time.time()
+    last_report = [started_at]
+    finished_this_run = [0]
+    finished_with_rows = []
+
+    def save_checkpoint(fund_id, state):
+        checkpoint = {key: state[key] for key in ('status', 'oldest_date', 'rows', 'failures')}
+        redis_client.hset(funds_key, fund_id, json.dumps(checkpoint))
+
+    def on_result(job, result):
+        state = pending[job['fund_id']]
+
+        # 抓取出错或有批次写入失败时不推进检查点，下一轮重试同一窗口
+        if result['error'] or result['failed']:
+            state['failures'] += 1
+            if state['failures'] >= max_failures:
+                state['status'] = 'failed'
+                stats['failed'] += 1
+                logger.error(f"Backfill gave up on fund {job['code']} after {state['failures']} failures: {result['error']}")
+        else:
+            state['failures'] = 0
+            state['rows'] += result['saved']
+            stats['rows'] += result['saved']
+            state['oldest_date'] = job['start_date']
+
+            # 窗口内没有数据、已到成立日期或下限日期时，该基金回填完成
+            window_start = datetime.strptime(job['start_date'], '%Y-%m-%d').date()
+            inception_date = state['inception_date']
+            if (result['fetched'] == 0 or window_start <= floor_date
+                    or (inception_date and window_start <= inception_date)):
+                state['status'] = 'done'
+                stats['done'] += 1
+                finished_this_run[0] += 1
+                if state['rows'] > 0:
+                    finished_with_rows.append(job['fund_id'])
+
+        save_checkpoint(job['fund_id'], state)
+
+        now = time.time()
+        if now - last_report[0] >= 10:
+            last_report[0] = now
+            _log_throughput(job_name, stats, now - started_at, finished_this_run[0])
+
+    while pending:
+        jobs = []
+        for fund_id, state in pending.items():
+            window_end = end
+            if state['oldest_date']:
+                window_end = datetime.strptime(state['oldest_date'], '%Y-%m-%d').date() - timedelta(days=1)
+            window_start = max(window_end - timedelta(days=window_days - 1), floor_date)
+            jobs.append({
+                'fund_id': fund_id,
+                'code': state['code'],
+                'start_date': window_start.strftime('%Y-%m-%d'),
+                'end_date': window_end.strftime('%Y-%m-%d'),
+            })
+
+        ingest_fund_values(
+            jobs,
+            max_workers=max_workers,
+            batch_size=batch_size,
+            update_metrics=False,
+            on_result=on_result,
+            strict=True
+        )
+
+        # 本轮回填完成的基金批量更新收益率指标
+        if finished_with_rows:
+            update_performance_metrics_batch(finished_with_rows)
+            del finished_with_rows[:]
+
+        pending = {
+            fund_id: state for fund_id, state in pending.items()
+            if state['status'] == 'running'
+        }
+
+    elapsed = time.time() - started_at
+    stats['elapsed'] = round(elapsed, 1)
+    stats['rows_per_second'] = round(stats['rows'] / elapsed, 1) if elapsed > 0 else 0.0
+    stats['funds_per_second'] = round(finished_this_run[0] / elapsed, 2) if elapsed > 0 else 0.0
+    _log_throughput(job_name, stats, elapsed, finished_this_run[0])
+    return stats
+
+def get_backfill_progress(job_name='default'):
+    """汇总回填任务的检查点状态
+
+    Returns:
+        包含end_date以及running、done、failed基金数和已写入行数的字典
+    """
+    redis_client = extensions.redis_client
+    end_date = redis_client.hget(f'backfill:{job_name}:meta', 'end_date')
+    progress = {
+        'end_date': end_date.decode('utf-8') if end_date else None,
+        'running': 0,
+        'done': 0,
+        'failed': 0,
+        'rows': 0
+    }
+    for value in redis_client.hvals(f'backfill:{job_name}:funds'):
+        checkpoint = json.loads(value)
+        progress[checkpoint['status']] += 1
+        progress['rows'] += checkpoint['rows']
+    return progress
+
+def _log_throughput(job_name, stats, elapsed, finished):
+    rows_per_second = stats['rows'] / elapsed if elapsed > 0 else 0.0
+    funds_per_second = finished / elapsed if elapsed > 0 else 0.0
+    logger.info(f"Backfill job {job_name}: {stats['done']}/{stats['funds']} funds done, {stats['failed']} failed, "
+                f"{stats['rows']} rows in {elapsed:.1f}s ({rows_per_second:.1f} rows/s, {funds_per_second:.2f} funds/s)")
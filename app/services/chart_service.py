@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+import numpy as np
+from app.services.nav_store import nav_store, from_day_number
+from app.services.performance_engine import shift_months
+
+# 默认和最大的图表点数
+DEFAULT_CHART_POINTS = 500
+MAX_CHART_POINTS = 5000
+
+# 图表时间范围：(回溯月数, 回溯天数)，从最新净值日期往前计算
+CHART_PERIODS = {
+    '1w': (0, 7),
+    '1m': (1, 0),
+    '3m': (3, 0),
+    '6m': (6, 0),
+    '1y': (12, 0),
+    '3y': (36, 0),
+    '5y': (60, 0),
+    'all': None,
+}
+
+# 进程内缓存的图表数据条数，以及所有条目的总点数上限（每个点约150字节）
+_CACHE_SIZE = 1024
+_CACHE_MAX_POINTS = 200000
+
+# 键为(基金, 范围, 点数)，值为(净值序列的版本号, 结果)；只保存版本号，不持有已被淘汰的序列
+_cache = OrderedDict()
+_cache_points = 0
+_cache_lock = threading.Lock()
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets降采样
+
+    首尾两点保留，其余数据均分为threshold-2个桶，每个桶选出与上一个选中点、下一个桶均值点
+    构成的三角形面积最大的点，能在点数大幅减少时保留走势的峰谷形状。
+
+    Args:
+        x: 升序的横坐标数组
+        y: 纵坐标数组
+        threshold: 目标点数
+
+    Returns:
+        选中点的下标数组（升序）
+    """
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    every = (count - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        if bucket == threshold - 3:
+            # 最后一个桶的下一个“桶”就是最后一个点
+            next_start, next_end = count - 1, count
+        else:
+            next_start = end
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def chart_data(fund_id, period='all', points=DEFAULT_CHART_POINTS, start_date=None, end_date=None):
+    """生成基金净值图表数据，点数不超过points，与历史长度无关
+
+    按单位净值曲线做LTTB降采样，累计净值和日涨跌幅取相同的点。结果按(基金, 范围, 点数)缓存在进程内，
+    条目数和总点数都有上限，净值序列重新加载后自动失效。
+
+    Args:
+        fund_id: 基金ID
+        period: CHART_PERIODS中的时间范围，从最新净值日期往前计算；提供start_date/end_date时忽略
+        points: 目标点数，不超过MAX_CHART_POINTS
+        start_date: 开始日期
+        end_date: 结束日期
+
+    Returns:
+        包含dates、net_values、accumulated_values、daily_changes及total（范围内原始点数）的字典
+
+    Raises:
+        ValueError: 时间范围无效
+    """
+    if period not in CHART_PERIODS:
+        raise ValueError(f"不支持的时间范围: {period}")
+    points = max(3, min(points, MAX_CHART_POINTS))
+
+    series = nav_store.get(fund_id)
+    key = (fund_id, period, points, start_date, end_date)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == series.version:
+            _cache.move_to_end(key)
+            return cached[1]
+
+    if start_date is None and end_date is None and CHART_PERIODS[period] and len(series):
+        months, days = CHART_PERIODS[period]
+        latest = from_day_number(series.days[-1])
+        start_date = shift_months(latest, -months) if months else latest - timedelta(days=days)
+    window = series.slice(start_date, end_date)
+
+    selected = lttb(window.days, window.net_values, points)
+    daily_changes = window.daily_changes[selected]
+    result = {
+        'total': len(window),
+        'points': len(selected),
+        'dates': [from_day_number(day).isoformat() for day in window.days[selected]],
+        'net_values': window.net_values[selected].tolist(),
+        'accumulated_values': window.accumulated_values[selected].tolist(),
+        'daily_changes': [None if np.isnan(value) else value for value in daily_changes.tolist()]
+    }
+
+    global _cache_points
+    with _cache_lock:
+        previous = _cache.pop(key, None)
+        if previous is not None:
+            _cache_points -= previous[1]['points']
+        _cache[key] = (series.version, result)
+        _cache_points += result['points']
+        while len(_cache) > _CACHE_SIZE or _cache_points > _CACHE_MAX_POINTS:
+            _, (_, evicted) = _cache.popitem(last=False)
+            _cache_points -= evicted['points']
+    return result
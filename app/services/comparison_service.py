@@ -0,0 +1,176 @@
+import json
+import logging
+from datetime import date, timedelta
+import numpy as np
+from flask import current_app
+from redis.exceptions import RedisError
+from app import extensions
+from app.extensions import db
+from app.models import FundValue, FundPerformance
+from app.services.performance_engine import shift_months
+
+logger = logging.getLogger(__name__)
+
+# 默认的滚动收益窗口（交易日数）
+DEFAULT_ROLLING_WINDOWS = (30, 90, 250)
+
+# 默认计算相关系数使用的最近交易日数
+DEFAULT_CORRELATION_WINDOW = 250
+
+# 未指定开始日期时默认比较最近的月数
+DEFAULT_COMPARE_MONTHS = 36
+
+# 单次比较的最大基金数
+MAX_COMPARE_FUNDS = 20
+
+# 滚动收益和相关系数窗口的上限（交易日数，约十年），以及单次最多的滚动收益窗口数
+MAX_COMPARE_WINDOW = 2500
+MAX_ROLLING_WINDOWS = 10
+
+def load_aligned_series(fund_ids, start_date, end_date):
+    """一次查询加载多只基金的累计净值，并对齐到共同的交易日索引
+
+    日期索引为所有基金净值日期的并集。某只基金在某日没有净值时沿用前一个净值（停牌、节假日错位等），
+    该基金首个净值之前保持为NaN。
+
+    Returns:
+        (dates, values, observed) 元组：dates为datetime64[D]数组，values为(日期数, 基金数)的累计净值矩阵，
+        observed为同形状的布尔矩阵，标记当天是否有真实净值
+    """
+    rows = db.session.query(FundValue.fund_id, FundValue.date, FundValue.accumulated_value)\
+        .filter(FundValue.fund_id.in_(fund_ids), FundValue.date >= start_date, FundValue.date <= end_date)\
+        .all()
+
+    column_of = {fund_id: column for column, fund_id in enumerate(fund_ids)}
+    row_dates = np.array([row[1] for row in rows], dtype='datetime64[D]')
+    dates, row_index = np.unique(row_dates, return_inverse=True)
+
+    values = np.full((len(dates), len(fund_ids)), np.nan)
+    columns = np.fromiter((column_of[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+    raw = np.array([np.nan if row[2] is None or row[2] <= 0 else row[2] for row in rows], dtype=np.float64)
+    values[row_index, columns] = raw
+    observed = ~np.isnan(values)
+
+    # 向前填充：每个位置取不晚于它的最后一个有效值的行号
+    last_valid = np.where(observed, np.arange(len(dates))[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    values = values[last_valid, np.arange(len(fund_ids))]
+    return dates, values, observed
+
+def rolling_returns(values, window):
+    """计算每个日期相对window个交易日前的收益率（百分比），前window行及数据缺失处为NaN"""
+    result = np.full(values.shape, np.nan)
+    if len(values) > window:
+        result[window:] = (values[window:] / values[:-window] - 1) * 100
+    return result
+
+def correlation_matrix(values, observed):
+    """基于日收益率计算两两相关系数矩阵
+
+    只使用当天有真实净值的收益率；每对基金按两者都有收益率的日期计算（成对完整观测），
+    全部通过矩阵乘法一次完成。
+
+    Returns:
+        (相关系数矩阵, 每对基金的共同观测数矩阵)，观测不足或波动为零时相关系数为NaN
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[1:] / values[:-1] - 1
+    valid = observed[1:] & np.isfinite(returns)
+    x = np.where(valid, returns, 0.0)
+    mask = valid.astype(np.float64)
+
+    # n[i, j]为基金i和j共同的观测数，sum_x[i, j]为这些日期上基金i收益率之和，依此类推
+    n = mask.T @ mask
+    sum_x = x.T @ mask
+    sum_xx = (x * x).T @ mask
+    sum_xy = x.T @ x
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = sum_xy - sum_x * sum_x.T / n
+        variance_x = sum_xx - sum_x ** 2 / n
+        variance_y = variance_x.T
+        correlation = covariance / np.sqrt(variance_x * variance_y)
+    correlation[(n < 3) | ~np.isfinite(correlation)] = np.nan
+    np.clip(correlation, -1, 1, out=correlation)
+    return correlation, n.astype(np.int64)
+
+def compare_funds(funds, start_date=None, end_date=None, windows=DEFAULT_ROLLING_WINDOWS,
+                  correlation_window=DEFAULT_CORRELATION_WINDOW):
+    """计算多只基金的滚动收益率和相关系数矩阵，结果按(基金集合, 窗口, 日期范围, 最新净值日期)缓存
+
+    Args:
+        funds: Fund对象列表
+        start_date: 输出的开始日期，默认DEFAULT_COMPARE_MONTHS个月前
+        end_date: 输出的结束日期，默认今天
+        windows: 滚动收益窗口（交易日数）
+        correlation_window: 计算相关系数使用的最近交易日数
+
+    Returns:
+        可直接序列化为JSON的字典
+    """
+    end_date = end_date or date.today()
+    start_date = start_date or shift_months(end_date, -DEFAULT_COMPARE_MONTHS)
+    funds = sorted(funds, key=lambda fund: fund.id)
+    fund_ids = [fund.id for fund in funds]
+    windows = sorted(set(windows))
+
+    # 最新净值日期纳入缓存键，新净值写入后自动使用新的缓存
+    latest_date = db.session.query(db.func.max(FundPerformance.latest_date))\
+        .filter(FundPerformance.fund_id.in_(fund_ids)).scalar()
+    cache_key = (
+        f"compare:{','.join(map(str, fund_ids))}:{','.join(map(str, windows))}:{correlation_window}:"
+        f"{start_date.isoformat()}:{end_date.isoformat()}:{latest_date.isoformat() if latest_date else ''}"
+    )
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    # 多加载足够的历史，使开始日期当天就能算出最长窗口的滚动收益（按每年约250个交易日估算）
+    lookback = max(windows + [correlation_window])
+    load_start = start_date - timedelta(days=lookback * 366 // 250 + 30)
+    dates, values, observed = load_aligned_series(fund_ids, load_start, end_date)
+    output = dates >= np.datetime64(start_date, 'D')
+
+    result = {
+        'funds': [{'id': fund.id, 'code': fund.code, 'name': fund.name} for fund in funds],
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'dates': [day.isoformat() for day in dates[output].astype(object)],
+        'rolling_returns': {},
+        'correlation': None
+    }
+    for window in windows:
+        returns = np.round(rolling_returns(values, window)[output], 2)
+        result['rolling_returns'][str(window)] = {
+            fund.code: _to_list(returns[:, column]) for column, fund in enumerate(funds)
+        }
+
+    window_values = values[output][-(correlation_window + 1):]
+    window_observed = observed[output][-(correlation_window + 1):]
+    correlation, observations = correlation_matrix(window_values, window_observed)
+    result['correlation'] = {
+        'window': correlation_window,
+        'codes': [fund.code for fund in funds],
+        'matrix': [_to_list(np.round(row, 4)) for row in correlation],
+        'observations': observations.tolist()
+    }
+
+    _cache_set(cache_key, result)
+    return result
+
+def _to_list(array):
+    return [None if np.isnan(value) else float(value) for value in array]
+
+def _cache_get(key):
+    try:
+        data = extensions.redis_client.get(key)
+    except RedisError as e:
+        logger.warning(f"Comparison cache unavailable: {str(e)}")
+        return None
+    return json.loads(data) if data else None
+
+def _cache_set(key, data):
+    try:
+        extensions.redis_client.setex(key, current_app.config['COMPARISON_CACHE_TTL'], json.dumps(data))
+    except RedisError as e:
+        logger.warning(f"Comparison cache unavailable: {str(e)}")
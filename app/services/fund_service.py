@@ -1,12 +1,27 @@
-import requests
-from app.extensions import db
+from app.extensions import db, http_client
 from app.models import Fund
-from app.utils.redis_utils import cache_clear_pattern
+from app.utils.redis_utils import (
+    bump_generations, cache_invalidate_tags, fund_detail_family, fund_tag,
+    FUND_LIST_FAMILY, FUND_SEARCH_FAMILY, FUND_DETAIL_FAMILY
+)
+from app.utils.http_client import EASTMONEY_HEADERS
 import logging
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+def invalidate_fund_caches(fund_codes=None):
+    """基金信息变化后失效基金列表、搜索和详情缓存
+
+    Args:
+        fund_codes: 变化的基金代码列表，为None时失效全部基金的详情
+    """
+    if fund_codes is None:
+        bump_generations(FUND_LIST_FAMILY, FUND_SEARCH_FAMILY, FUND_DETAIL_FAMILY)
+        return
+    bump_generations(FUND_LIST_FAMILY, FUND_SEARCH_FAMILY, *[fund_detail_family(code) for code in fund_codes])
+    cache_invalidate_tags(*[fund_tag(code) for code in fund_codes])
+
 def fetch_fund_details(fund_code):
     """从天天基金网获取基金详细信息并更新数据库
     
@@ -21,17 +36,13 @@ def fetch_fund_details(fund_code):
         
         # 使用基金净值API获取基金基本信息
         url = f"https://api.fund.eastmoney.com/f10/lsjz"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Referer": "http://fund.eastmoney.com/"
-        }
         params = {
             "fundCode": fund_code,
             "pageIndex": 1,
             "pageSize": 1
         }
         
-        response = requests.get(url, headers=headers, params=params)
+        response = http_client.get(url, headers=EASTMONEY_HEADERS, params=params)
         if response.status_code != 200:
             logger.error(f"Failed to fetch fund details for {fund_code}: {response.status_code}")
             return None
@@ -72,7 +83,7 @@ def fetch_fund_details(fund_code):
             logger.info(f"Trying alternative API to get fund name for {fund_code}")
             alt_url = f"http://fund.eastmoney.com/pingzhongdata/{fund_code}.js"
             try:
-                alt_response = requests.get(alt_url, headers=headers)
+                alt_response = http_client.get(alt_url, headers=EASTMONEY_HEADERS)
                 if alt_response.status_code == 200:
                     text = alt_response.text
                     # 提取基金名称
@@ -98,7 +109,7 @@ def fetch_fund_details(fund_code):
                     "deviceid": "123",
                     "FCODE": fund_code
                 }
-                mobile_response = requests.get(mobile_url, headers=headers, params=mobile_params)
+                mobile_response = http_client.get(mobile_url, headers=EASTMONEY_HEADERS, params=mobile_params)
                 if mobile_response.status_code == 200:
                     mobile_data = mobile_response.json()
                     if mobile_data.get("ErrCode") == 0:
@@ -127,7 +138,7 @@ def fetch_fund_details(fund_code):
         # 尝试从JS中提取更多信息
         try:
             fund_js_url = f"http://fund.eastmoney.com/pingzhongdata/{fund_code}.js"
-            fund_js_response = requests.get(fund_js_url, headers=headers)
+            fund_js_response = http_client.get(fund_js_url, headers=EASTMONEY_HEADERS)
             if fund_js_response.status_code == 200:
                 js_text = fund_js_response.text
                 
@@ -187,7 +198,7 @@ def fetch_fund_details(fund_code):
         logger.info(f"Successfully updated details for fund {fund_code}")
         
         # 清除相关缓存
-        cache_clear_pattern(f'funds:{fund_code}*')
+        invalidate_fund_caches([fund_code])
         
         return fund
         
@@ -239,6 +250,7 @@ def sync_fund_data(fund_codes=None):
     ]
     
     count = 0
+    synced_codes = []
     
     for fund_data in sample_funds:
         if fund_codes and fund_data['code'] not in fund_codes:
@@ -259,12 +271,13 @@ def sync_fund_data(fund_codes=None):
         fund.size = fund_data['size']
         fund.description = fund_data['description']
         
+        synced_codes.append(fund.code)
         count += 1
     
     db.session.commit()
     
     # 清除相关缓存
-    cache_clear_pattern('funds:*')
+    invalidate_fund_caches(synced_codes)
     
     return count
 
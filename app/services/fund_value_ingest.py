@@ -0,0 +1,167 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from flask import current_app
+from app.services.fund_value_service import (
+    bulk_upsert_fund_values,
+    iter_batches,
+    iter_eastmoney_fund_data,
+    iter_parsed_fund_values,
+    update_performance_metrics_batch
+)
+
+logger = logging.getLogger(__name__)
+
+class _IngestCancelled(Exception):
+    """调用线程已退出，工作线程停止产出批次"""
+
+def ingest_fund_values(jobs, max_workers=None, page_workers=None, batch_size=None,
+                       update_metrics=True, on_result=None, strict=False):
+    """并发抓取并保存多只基金的净值数据
+
+    以流水线方式处理：工作线程逐页抓取、解析校验并切分为固定大小的批次，
+    通过有界队列交给调用线程（持有应用上下文）写入数据库。队列满时抓取线程阻塞，
+    因此无论历史多长，内存中只有少量页面和批次。
+
+    Args:
+        jobs: 抓取任务列表，每项包含fund_id、code、start_date、end_date
+        max_workers: 同时抓取的基金数，默认读取FUND_FETCH_MAX_WORKERS配置
+        page_workers: 所有基金共享的分页抓取线程数，默认读取FUND_FETCH_PAGE_WORKERS配置
+        batch_size: 每批写入的记录数，默认读取FUND_VALUE_BATCH_SIZE配置
+        update_metrics: 全部写入后是否批量更新有新数据的基金的收益率指标
+        on_result: 可选回调on_result(job, result)，每只基金写入完成后在调用线程中执行
+        strict: 为True时任何分页抓取失败都记为该基金出错（此前已写入的批次保留，重复写入是幂等的）
+
+    Returns:
+        以基金代码为键的结果字典，每项包含fund_id、fetched、inserted、updated、saved、failed、elapsed、error，
+        有批次写入失败时error也会被设置
+    """
+    if not jobs:
+        return {}
+
+    if max_workers is None:
+        max_workers = current_app.config.get('FUND_FETCH_MAX_WORKERS', 16)
+    if page_workers is None:
+        page_workers = current_app.config.get('FUND_FETCH_PAGE_WORKERS', 16)
+    if batch_size is None:
+        batch_size = current_app.config.get('FUND_VALUE_BATCH_SIZE', 500)
+    max_workers = max(1, min(max_workers, len(jobs)))
+    page_workers = max(1, page_workers)
+
+    logger.info(f"Ingesting fund values for {len(jobs)} funds with {max_workers} fund workers and {page_workers} page workers")
+    started_at = time.time()
+    results = {}
+    batches = queue.Queue(maxsize=max_workers * 2)
+    cancelled = threading.Event()
+    app = current_app._get_current_object()
+
+    # 分页使用独立线程池，避免基金线程等待分页结果时占满同一个线程池导致死锁
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fund-fetch') as fund_pool, \
+            ThreadPoolExecutor(max_workers=page_workers, thread_name_prefix='fund-page') as page_pool:
+        for job in jobs:
+            results[job['code']] = {
+                'fund_id': job['fund_id'],
+                'fetched': 0,
+                'inserted': 0,
+                'updated': 0,
+                'saved': 0,
+                'failed': 0,
+                'elapsed': 0.0,
+                'error': None
+            }
+            fund_pool.submit(_stream_job, app, job, page_pool, batches, batch_size, strict, cancelled)
+
+        try:
+            remaining = len(jobs)
+            while remaining:
+                kind, job, payload = batches.get()
+                result = results[job['code']]
+
+                if kind == 'batch':
+                    result['fetched'] += len(payload)
+                    try:
+                        stats = bulk_upsert_fund_values(payload, batch_size=batch_size)
+                    except Exception as e:
+                        result['error'] = str(e)
+                        logger.error(f"Error saving fund values for {job['code']}: {str(e)}")
+                        continue
+                    result['inserted'] += stats['inserted']
+                    result['updated'] += stats['updated']
+                    result['saved'] += stats['inserted'] + stats['updated']
+                    # bulk_upsert_fund_values自行捕获写入错误并计入failed，不会抛出异常
+                    if stats['failed']:
+                        result['failed'] += stats['failed']
+                        result['error'] = f"{result['failed']}条净值写入失败"
+                    continue
+
+                remaining -= 1
+                elapsed, error = payload
+                result['elapsed'] = round(elapsed, 3)
+                if error is not None:
+                    result['error'] = str(error)
+                    logger.error(f"Error fetching fund value for {job['code']}: {str(error)}")
+                elif result['fetched'] == 0:
+                    logger.warning(f"No data returned for fund {job['code']}")
+
+                if on_result is not None:
+                    on_result(job, result)
+        except BaseException:
+            # 调用线程出错时通知工作线程停止，避免它们阻塞在已满的队列上
+            cancelled.set()
+            raise
+
+    # 在所有值都保存后，批量计算并更新各时间段的收益率
+    if update_metrics:
+        updated_fund_ids = [result['fund_id'] for result in results.values() if result['saved'] > 0]
+        if updated_fund_ids:
+            update_performance_metrics_batch(updated_fund_ids)
+
+    total_inserted = sum(result['inserted'] for result in results.values())
+    total_updated = sum(result['updated'] for result in results.values())
+    logger.info(f"Ingested fund values for {len(results)} funds in {time.time() - started_at:.1f}s: "
+                f"{total_inserted} inserted, {total_updated} updated")
+    return results
+
+def _stream_job(app, job, page_pool, batches, batch_size, strict, cancelled):
+    """在工作线程中逐页抓取并解析单只基金的净值数据，按批次放入队列，结束时放入完成消息"""
+    with app.app_context():
+        _stream_job_in_context(job, page_pool, batches, batch_size, strict, cancelled)
+
+def _stream_job_in_context(job, page_pool, batches, batch_size, strict, cancelled):
+    started_at = time.time()
+    error = None
+    try:
+        logger.info(f"Fetching fund value data for {job['code']} from {job['start_date']} to {job['end_date']}")
+        pages = iter_eastmoney_fund_data(
+            job['code'],
+            job['start_date'],
+            job['end_date'],
+            page_executor=page_pool,
+            strict=strict
+        )
+        rows = iter_parsed_fund_values(job['fund_id'], job['code'], chain.from_iterable(pages))
+        for batch in iter_batches(rows, batch_size):
+            _put(batches, ('batch', job, batch), cancelled)
+    except _IngestCancelled:
+        return
+    except Exception as e:
+        error = e
+
+    try:
+        _put(batches, ('done', job, (time.time() - started_at, error)), cancelled)
+    except _IngestCancelled:
+        pass
+
+def _put(batches, message, cancelled):
+    """放入队列，队列已满时等待，调用线程退出后放弃"""
+    while True:
+        if cancelled.is_set():
+            raise _IngestCancelled()
+        try:
+            batches.put(message, timeout=0.5)
+            return
+        except queue.Full:
+            continue
@@ -1,24 +1,56 @@
-import requests
 import logging
-import json
-from datetime import datetime, date, timedelta
+from collections import deque
+from datetime import datetime, date
+from itertools import islice
+from flask import current_app
 from sqlalchemy.exc import IntegrityError
-from app.extensions import db
-from app.models import Fund, FundValue
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.extensions import db, http_client
+from app.models import Fund, FundValue, FundPerformance
+from app.services.nav_store import nav_store
+from app.services.performance_engine import calculate_performance, calculate_performance_batch
+from app.services.screener import fund_screener
+from app.services.sync_planner import plan_incremental_sync
+from app.utils.http_client import EASTMONEY_HEADERS
+from app.utils.redis_utils import bump_generations, cache_invalidate_tags, fund_values_tag, FUND_LIST_FAMILY
 
 logger = logging.getLogger(__name__)
 
-def fetch_fund_value(fund_code=None, start_date=None, end_date=None):
+# 天天基金网历史净值接口
+EASTMONEY_NAV_URL = "https://api.fund.eastmoney.com/f10/lsjz"
+
+# 探测页面大小时依次尝试的候选值（EASTMONEY_MAX_PAGE_SIZE之下）
+PAGE_SIZE_CANDIDATES = (200, 100, 50, 20)
+
+# 各接口探测到的可用页面大小，进程内共享
+_page_size_cache = {}
+
+# 单只基金最多同时抓取的分页数，限制未消费页面占用的内存
+PAGE_PREFETCH = 8
+
+# 重算业绩汇总时每条IN查询包含的基金数
+PERFORMANCE_QUERY_CHUNK = 500
+
+class FundDataFetchError(Exception):
+    """从天天基金网抓取净值数据失败"""
+
+def fetch_fund_value(fund_code=None, start_date=None, end_date=None, max_workers=None, batch_size=None):
     """获取指定基金的净值数据
     
     Args:
         fund_code: 基金代码，如果为None则获取所有基金
         start_date: 开始日期，格式为YYYY-MM-DD
         end_date: 结束日期，格式为YYYY-MM-DD
+        max_workers: 同时抓取的基金数，默认读取FUND_FETCH_MAX_WORKERS配置
+        batch_size: 每批写入的记录数，默认读取FUND_VALUE_BATCH_SIZE配置
     
     Returns:
         更新的基金净值数量
     """
+    from app.services.fund_value_ingest import ingest_fund_values
+    
     funds_to_update = []
     if fund_code:
         fund = Fund.query.filter_by(code=fund_code).first()
@@ -31,185 +63,266 @@ def fetch_fund_value(fund_code=None, start_date=None, end_date=None):
         logger.warning("No funds found to update values")
         return 0
     
-    updated_count = 0
-    for fund in funds_to_update:
-        try:
-            logger.info(f"Fetching fund value data for {fund.code} - {fund.name}")
-            
-            # 如果没有提供日期范围，默认获取从基金成立至今的所有数据
-            if not end_date:
-                end_date = datetime.now().date().strftime('%Y-%m-%d')
-            
-            if not start_date:
-                # 首先检查数据库中是否已有该基金的净值信息
-                latest_value = FundValue.query.filter_by(fund_id=fund.id).order_by(FundValue.date.desc()).first()
-                logger.info(f"Latest value: {latest_value}")
-                if latest_value:
-                    # 如果数据库中有净值信息，从最近一次净值的日期开始获取
-                    # 加1天是为了避免重复获取最后一天的数据
-                    start_date = (latest_value.date + timedelta(days=1)).strftime('%Y-%m-%d')
-                    logger.info(f"Using latest value date from database: {start_date}")
-                elif hasattr(fund, 'inception_date') and fund.inception_date:
-                    # 如果数据库中没有净值但有成立日期，则从成立日期开始获取
-                    start_date = fund.inception_date.strftime('%Y-%m-%d')
-                    logger.info(f"Using inception date from database: {start_date}")
-                else:
-                    logger.info(f"No latest value or inception date found for fund {fund.code}")
-                    # 如果既没有净值记录也没有成立日期信息，默认获取近2000天的数据
-                    # 天天基金API通常最多返回约2000条记录
-                    end = datetime.strptime(end_date, '%Y-%m-%d').date()
-                    start = end - timedelta(days=2000)
-                    start_date = start.strftime('%Y-%m-%d')
-            
-            logger.info(f"Fetching data from {start_date} to {end_date}")
-            
-            # 调用天天基金网API获取数据
-            values = fetch_eastmoney_fund_data(fund.code, start_date, end_date)
-            
-            if values:
-                # 保存获取到的净值数据
-                for value_data in values:
-                    try:
-                        value_date = datetime.strptime(value_data['date'], '%Y-%m-%d').date()
-                        net_value = float(value_data['net_value'])
-                        accumulated_value = float(value_data['accumulated_value'])
-                        daily_change = float(value_data['daily_change']) if value_data['daily_change'] not in [None, '--', ''] else None
-                        
-                        # 保存到数据库
-                        save_fund_value(
-                            fund.id, 
-                            value_date,
-                            net_value,
-                            accumulated_value,
-                            daily_change
-                        )
-                        updated_count += 1
-                    except (ValueError, TypeError) as e:
-                        logger.error(f"Error processing value data for {fund.code}: {str(e)}, data: {value_data}")
-                        continue
-                
-                # 在所有值都保存后，计算并更新各时间段的收益率
-                if updated_count > 0:
-                    update_performance_metrics(fund.id)
-            else:
-                logger.warning(f"No data returned for fund {fund.code}")
-                
-        except Exception as e:
-            logger.error(f"Error fetching fund value for {fund.code}: {str(e)}")
+    # 一次查询规划所有基金的抓取区间，已是最新的基金不发起请求
+    jobs, skipped = plan_incremental_sync(funds_to_update, start_date, end_date)
+    if not jobs:
+        logger.info(f"All {skipped} funds are up to date, nothing to fetch")
+        return 0
+    
+    results = ingest_fund_values(jobs, max_workers=max_workers, batch_size=batch_size)
+    return sum(result['saved'] for result in results.values())
+
+def save_fetched_values(fund_id, fund_code, values, batch_size=None):
+    """解析抓取到的原始净值数据并按固定大小分批写入数据库
+    
+    values可以是生成器，解析、校验和写入逐批进行，内存占用与历史长度无关。
+    
+    Args:
+        fund_id: 基金ID
+        fund_code: 基金代码，仅用于日志
+        values: 原始净值数据的可迭代对象（列表或iter_eastmoney_fund_data展开后的生成器）
+        batch_size: 每批写入的记录数，默认读取FUND_VALUE_BATCH_SIZE配置
+    
+    Returns:
+        包含inserted、updated、failed数量的统计字典
+    """
+    if batch_size is None:
+        batch_size = current_app.config.get('FUND_VALUE_BATCH_SIZE', 500)
+    
+    stats = {'inserted': 0, 'updated': 0, 'failed': 0}
+    for batch in iter_batches(iter_parsed_fund_values(fund_id, fund_code, values), batch_size):
+        batch_stats = bulk_upsert_fund_values(batch, batch_size=batch_size)
+        for key in stats:
+            stats[key] += batch_stats[key]
+    return stats
+
+def iter_parsed_fund_values(fund_id, fund_code, values):
+    """逐条解析并校验原始净值数据，跳过无效记录和重复日期
+    
+    Args:
+        fund_id: 基金ID
+        fund_code: 基金代码，仅用于日志
+        values: 原始净值数据的可迭代对象
+    
+    Yields:
+        可直接写入fund_values表的字典
+    """
+    seen_dates = set()
+    for value_data in values:
+        row = parse_fund_value(fund_id, value_data)
+        if row is None:
+            logger.error(f"Error processing value data for {fund_code}, data: {value_data}")
+            continue
+        # 抓取期间发布新净值会导致分页错位，同一日期只保留先出现（较新页面）的记录
+        if row['date'] in seen_dates:
+            continue
+        seen_dates.add(row['date'])
+        yield row
+
+def iter_batches(iterable, batch_size):
+    """把可迭代对象切分为固定大小的列表，最后一批可能不足batch_size"""
+    iterator = iter(iterable)
+    batch_size = max(1, batch_size)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def parse_fund_value(fund_id, value_data):
+    """将天天基金网返回的单条净值数据解析为数据库行
+    
+    Args:
+        fund_id: 基金ID
+        value_data: 包含date、net_value、accumulated_value、daily_change的字典
     
-    return updated_count
+    Returns:
+        可直接写入fund_values表的字典，数据无效时返回None
+    """
+    try:
+        daily_change = value_data['daily_change']
+        return {
+            'fund_id': fund_id,
+            'date': date.fromisoformat(value_data['date']),
+            'net_value': float(value_data['net_value']),
+            'accumulated_value': float(value_data['accumulated_value']),
+            'daily_change': float(daily_change) if daily_change not in [None, '--', ''] else None,
+        }
+    except (KeyError, ValueError, TypeError):
+        return None
 
-def fetch_eastmoney_fund_data(fund_code, start_date=None, end_date=None):
+def fetch_eastmoney_fund_data(fund_code, start_date=None, end_date=None, page_executor=None, strict=False):
     """从天天基金网获取基金净值数据
     
+    一次性返回全部记录，合并时按净值日期去重。历史较长时应直接使用
+    iter_eastmoney_fund_data逐页处理，避免把完整历史放在内存中。
+    
     Args:
         fund_code: 基金代码
         start_date: 开始日期 (YYYY-MM-DD)
         end_date: 结束日期 (YYYY-MM-DD)
+        page_executor: 可选的线程池，提供时第2页之后的分页并发抓取
+        strict: 为True时任何一页抓取失败都抛出FundDataFetchError，而不是返回空列表或部分数据
     
     Returns:
         包含净值数据的列表
     """
+    result = []
+    seen_dates = set()
+    for page_values in iter_eastmoney_fund_data(fund_code, start_date, end_date, page_executor, strict):
+        for value_data in page_values:
+            if value_data['date'] in seen_dates:
+                continue
+            seen_dates.add(value_data['date'])
+            result.append(value_data)
+    
+    logger.info(f"Successfully retrieved {len(result)} records for fund {fund_code}")
+    return result
+
+def iter_eastmoney_fund_data(fund_code, start_date=None, end_date=None, page_executor=None, strict=False):
+    """逐页获取天天基金网的基金净值数据
+    
+    第一页使用接口接受的最大页面大小，读取TotalCount后其余分页并发抓取，
+    但同一基金最多预取PAGE_PREFETCH页，按页序产出，内存中只保留少量页面。
+    
+    Args:
+        fund_code: 基金代码
+        start_date: 开始日期 (YYYY-MM-DD)
+        end_date: 结束日期 (YYYY-MM-DD)
+        page_executor: 可选的线程池，提供时第2页之后的分页并发抓取
+        strict: 为True时任何一页抓取失败都抛出FundDataFetchError，否则记录日志后跳过该页（第一页失败时不产出数据）
+    
+    Yields:
+        每页的净值数据列表
+    """
     try:
-        # 构建API URL
-        api_url = "https://api.fund.eastmoney.com/f10/lsjz"
-        
-        # 设置较大的页面大小，减少请求次数
-        page_size = 50  # 天天基金API单页最大记录数
-        
-        # 设置请求头以模拟浏览器行为
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'http://fund.eastmoney.com/',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Connection': 'keep-alive',
-        }
-        
-        # 首先获取第一页，了解总页数和记录数
-        params = {
-            'fundCode': fund_code,
-            'pageIndex': 1,
-            'pageSize': page_size,
-        }
-        
+        api_url = EASTMONEY_NAV_URL
+        params = {'fundCode': fund_code}
         if start_date:
             params['startDate'] = start_date
         if end_date:
             params['endDate'] = end_date
         
+        # 首先获取第一页，了解总记录数和接口实际使用的页面大小
         logger.info(f"Making initial request to EastMoney API for fund {fund_code}")
-        response = requests.get(api_url, params=params, headers=headers)
+        data, page_size = _fetch_eastmoney_first_page(api_url, params, fund_code)
+        params['pageSize'] = page_size
         
+        first_page = _parse_eastmoney_items(data['Data']['LSJZList'])
+        total_count = data.get('TotalCount') or len(first_page)
+        total_pages = (total_count + page_size - 1) // page_size
+        logger.info(f"Fund {fund_code} has {total_count} records across {total_pages} pages of {page_size}")
+        yield first_page
+        del data, first_page
+        
+        # 继续获取其他页的数据
+        pages = iter(range(2, total_pages + 1))
+        if page_executor is None:
+            for page in pages:
+                yield _fetch_eastmoney_page(api_url, params, fund_code, page, total_pages, strict)
+            return
+        
+        in_flight = deque(
+            page_executor.submit(_fetch_eastmoney_page, api_url, params, fund_code, page, total_pages, strict)
+            for page in islice(pages, PAGE_PREFETCH)
+        )
+        while in_flight:
+            page_values = in_flight.popleft().result()
+            next_page = next(pages, None)
+            if next_page is not None:
+                in_flight.append(page_executor.submit(
+                    _fetch_eastmoney_page, api_url, params, fund_code, next_page, total_pages, strict
+                ))
+            yield page_values
+    
+    except Exception as e:
+        logger.error(f"Exception in iter_eastmoney_fund_data for {fund_code}: {str(e)}")
+        if strict:
+            if isinstance(e, FundDataFetchError):
+                raise
+            raise FundDataFetchError(str(e)) from e
+
+def _fetch_eastmoney_first_page(api_url, params, fund_code):
+    """获取第一页并确定接口接受的页面大小
+    
+    按从大到小的候选页面大小探测：接口拒绝（返回结构异常）时换下一个候选；
+    接口返回的记录数少于请求的页面大小且少于总数时，说明接口截断了页面大小，
+    以实际返回的记录数为准。探测结果按接口缓存，后续请求直接使用。
+    
+    Returns:
+        (第一页响应数据, 页面大小) 元组
+    """
+    cached_size = _page_size_cache.get(api_url)
+    candidates = _page_size_candidates()
+    if cached_size:
+        candidates = [cached_size] + [size for size in candidates if size < cached_size]
+    
+    for index, size in enumerate(candidates):
+        response = http_client.get(api_url, params=dict(params, pageIndex=1, pageSize=size), headers=EASTMONEY_HEADERS)
         if response.status_code != 200:
-            logger.error(f"Failed to fetch data from EastMoney API: {response.status_code}")
-            return []
+            raise FundDataFetchError(f"Failed to fetch data from EastMoney API: {response.status_code}")
         
         try:
             data = response.json()
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON response from EastMoney API: {response.text[:200]}")
-            return []
+        except ValueError:
+            data = None
         
-        if 'Data' not in data or 'LSJZList' not in data['Data']:
-            logger.error(f"Unexpected API response structure: {data}")
-            return []
+        if not isinstance(data, dict) or not isinstance(data.get('Data'), dict) or 'LSJZList' not in data['Data']:
+            if index + 1 < len(candidates):
+                logger.info(f"EastMoney API rejected page size {size}, retrying with {candidates[index + 1]}")
+                continue
+            raise FundDataFetchError(f"Unexpected API response structure: {response.text[:200]}")
         
-        # 初始化结果列表
-        result = []
+        items = data['Data']['LSJZList']
+        total_count = data.get('TotalCount') or 0
+        page_size = size
+        if 0 < len(items) < size and len(items) < total_count:
+            page_size = len(items)
         
-        # 处理第一页数据
-        for item in data['Data']['LSJZList']:
-            value_data = {
-                'date': item['FSRQ'],  # 净值日期
-                'net_value': item['DWJZ'],  # 单位净值
-                'accumulated_value': item['LJJZ'],  # 累计净值
-                'daily_change': item['JZZZL'],  # 日增长率
-            }
-            result.append(value_data)
-        
-        # 计算总页数和总记录数
-        total_count = data.get('TotalCount', len(result))
-        # 如果数据中没有TotalPages，则根据TotalCount和PageSize计算总页数
-        if 'TotalPages' in data:
-            total_pages = data['TotalPages']
-        else:
-            # 确保计算总页数时不会除以零
-            total_pages = (total_count + page_size - 1) // page_size if page_size > 0 else 1
+        if page_size != cached_size:
+            _page_size_cache[api_url] = page_size
+            logger.info(f"Using page size {page_size} for {api_url}")
+        return data, page_size
 
-        logger.info(f"Response data structure: {data.keys()}")
-        logger.info(f"Fund {fund_code} has {total_count} records across {total_pages} pages")
+def _page_size_candidates():
+    """返回不超过EASTMONEY_MAX_PAGE_SIZE的候选页面大小，从大到小排列"""
+    max_size = current_app.config.get('EASTMONEY_MAX_PAGE_SIZE', 1000)
+    candidates = [size for size in PAGE_SIZE_CANDIDATES if size < max_size]
+    return [max_size] + candidates
+
+def _parse_eastmoney_items(items):
+    """提取天天基金网净值列表中需要的字段"""
+    return [
+        {
+            'date': item['FSRQ'],  # 净值日期
+            'net_value': item['DWJZ'],  # 单位净值
+            'accumulated_value': item['LJJZ'],  # 累计净值
+            'daily_change': item['JZZZL'],  # 日增长率
+        }
+        for item in items
+    ]
+
+def _fetch_eastmoney_page(api_url, params, fund_code, page, total_pages, strict=False):
+    """获取天天基金网净值接口的单页数据，失败时返回空列表（strict模式下抛出异常）"""
+    try:
+        logger.info(f"Fetching page {page}/{total_pages} for fund {fund_code}")
+        page_params = dict(params, pageIndex=page)
+        page_response = http_client.get(api_url, params=page_params, headers=EASTMONEY_HEADERS)
         
-        # 继续获取其他页的数据
-        if total_pages > 1:
-            for page in range(2, total_pages + 1):
-                try:
-                    logger.info(f"Fetching page {page}/{total_pages} for fund {fund_code}")
-                    params['pageIndex'] = page
-                    page_response = requests.get(api_url, params=params, headers=headers)
-                    
-                    if page_response.status_code == 200:
-                        page_data = page_response.json()
-                        if 'Data' in page_data and 'LSJZList' in page_data['Data']:
-                            for item in page_data['Data']['LSJZList']:
-                                value_data = {
-                                    'date': item['FSRQ'],
-                                    'net_value': item['DWJZ'],
-                                    'accumulated_value': item['LJJZ'],
-                                    'daily_change': item['JZZZL'],
-                                }
-                                result.append(value_data)
-                    else:
-                        logger.warning(f"Failed to fetch page {page} for fund {fund_code}: {page_response.status_code}")
-                    
-                except Exception as e:
-                    logger.error(f"Error fetching page {page} for fund {fund_code}: {str(e)}")
+        if page_response.status_code != 200:
+            raise FundDataFetchError(f"Failed to fetch page {page} for fund {fund_code}: {page_response.status_code}")
         
-        logger.info(f"Successfully retrieved {len(result)} records for fund {fund_code}")
-        return result
-    
+        page_data = page_response.json()
+        if 'Data' not in page_data or 'LSJZList' not in page_data['Data']:
+            raise FundDataFetchError(f"Unexpected page {page} structure for fund {fund_code}")
+        
+        return _parse_eastmoney_items(page_data['Data']['LSJZList'])
     except Exception as e:
-        logger.error(f"Exception in fetch_eastmoney_fund_data: {str(e)}")
+        logger.error(f"Error fetching page {page} for fund {fund_code}: {str(e)}")
+        if strict:
+            if isinstance(e, FundDataFetchError):
+                raise
+            raise FundDataFetchError(str(e)) from e
         return []
 
 def save_fund_value(fund_id, value_date, net_value, accumulated_value, daily_change=None):
@@ -239,6 +352,7 @@ def save_fund_value(fund_id, value_date, net_value, accumulated_value, daily_cha
             existing_value.daily_change = daily_change
             existing_value.updated_at = datetime.utcnow()
             db.session.commit()
+            _invalidate_fund_values([fund_id])
             return existing_value
         else:
             # 创建新记录
@@ -251,6 +365,7 @@ def save_fund_value(fund_id, value_date, net_value, accumulated_value, daily_cha
             )
             db.session.add(fund_value)
             db.session.commit()
+            _invalidate_fund_values([fund_id])
             return fund_value
     
     except IntegrityError:
@@ -262,6 +377,118 @@ def save_fund_value(fund_id, value_date, net_value, accumulated_value, daily_cha
         logger.error(f"Error saving fund value: {str(e)}")
         return None
 
+def bulk_upsert_fund_values(rows, batch_size=None):
+    """批量写入基金净值数据，已存在的(fund_id, date)记录会被更新
+    
+    MySQL使用多行INSERT ... ON DUPLICATE KEY UPDATE，SQLite/PostgreSQL使用
+    INSERT ... ON CONFLICT DO UPDATE，每批只需一次统计查询和一次写入。
+    
+    Args:
+        rows: parse_fund_value返回的字典列表，可包含多只基金
+        batch_size: 每批写入的记录数，默认读取FUND_VALUE_BATCH_SIZE配置
+    
+    Returns:
+        包含inserted、updated、failed数量的字典
+    """
+    stats = {'inserted': 0, 'updated': 0, 'failed': 0}
+    if not rows:
+        return stats
+    
+    if batch_size is None:
+        batch_size = current_app.config.get('FUND_VALUE_BATCH_SIZE', 500)
+    batch_size = max(1, batch_size)
+    
+    # 同一批次内(fund_id, date)重复时以最后一条为准，否则ON CONFLICT会报错
+    unique_rows = {}
+    for row in rows:
+        unique_rows[(row['fund_id'], row['date'])] = row
+    rows = list(unique_rows.values())
+    
+    dialect = db.engine.dialect.name
+    for offset in range(0, len(rows), batch_size):
+        chunk = rows[offset:offset + batch_size]
+        try:
+            existing_count = _count_existing_fund_values(chunk)
+            
+            if dialect in _UPSERT_BUILDERS:
+                db.session.execute(_UPSERT_BUILDERS[dialect](chunk))
+                db.session.commit()
+            else:
+                # 不支持原生upsert的数据库退回逐条保存
+                for row in chunk:
+                    save_fund_value(
+                        row['fund_id'],
+                        row['date'],
+                        row['net_value'],
+                        row['accumulated_value'],
+                        row['daily_change']
+                    )
+            
+            stats['inserted'] += len(chunk) - existing_count
+            stats['updated'] += existing_count
+        except Exception as e:
+            db.session.rollback()
+            stats['failed'] += len(chunk)
+            logger.error(f"Error bulk saving {len(chunk)} fund values: {str(e)}")
+    
+    _invalidate_fund_values({row['fund_id'] for row in rows})
+    logger.info(f"Bulk saved fund values: {stats['inserted']} inserted, {stats['updated']} updated, {stats['failed']} failed")
+    return stats
+
+def _invalidate_fund_values(fund_ids):
+    """净值写入后失效进程内净值序列和这些基金的净值接口缓存"""
+    nav_store.invalidate(fund_ids)
+    cache_invalidate_tags(*[fund_values_tag(fund_id) for fund_id in fund_ids])
+
+def _count_existing_fund_values(chunk):
+    """一次查询统计批次中已存在于数据库的(fund_id, date)数量"""
+    keys = {(row['fund_id'], row['date']) for row in chunk}
+    fund_ids = {fund_id for fund_id, _ in keys}
+    dates = {value_date for _, value_date in keys}
+    
+    existing = db.session.query(FundValue.fund_id, FundValue.date)\
+        .filter(FundValue.fund_id.in_(fund_ids))\
+        .filter(FundValue.date.in_(dates))\
+        .all()
+    
+    return sum(1 for fund_id, value_date in existing if (fund_id, value_date) in keys)
+
+def _fund_value_insert_rows(chunk):
+    """补齐时间戳字段，生成多行INSERT使用的字典列表"""
+    now = datetime.utcnow()
+    return [dict(row, created_at=now, updated_at=now) for row in chunk]
+
+def _build_mysql_upsert(chunk):
+    """构建MySQL的INSERT ... ON DUPLICATE KEY UPDATE语句"""
+    stmt = mysql_insert(FundValue.__table__).values(_fund_value_insert_rows(chunk))
+    return stmt.on_duplicate_key_update(
+        net_value=stmt.inserted.net_value,
+        accumulated_value=stmt.inserted.accumulated_value,
+        daily_change=stmt.inserted.daily_change,
+        updated_at=stmt.inserted.updated_at
+    )
+
+def _build_on_conflict_upsert(insert):
+    """构建INSERT ... ON CONFLICT DO UPDATE语句（SQLite、PostgreSQL）"""
+    def build(chunk):
+        stmt = insert(FundValue.__table__).values(_fund_value_insert_rows(chunk))
+        return stmt.on_conflict_do_update(
+            index_elements=['fund_id', 'date'],
+            set_={
+                'net_value': stmt.excluded.net_value,
+                'accumulated_value': stmt.excluded.accumulated_value,
+                'daily_change': stmt.excluded.daily_change,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+    return build
+
+_UPSERT_BUILDERS = {
+    'mysql': _build_mysql_upsert,
+    'sqlite': _build_on_conflict_upsert(sqlite_insert),
+    'postgresql': _build_on_conflict_upsert(postgresql_insert),
+}
+
 def get_latest_fund_values(fund_id=None, limit=1):
     """获取最新的基金净值数据
     
@@ -299,62 +526,15 @@ def get_fund_values_by_date_range(fund_id, start_date, end_date):
 def calculate_fund_performance(fund_id):
     """计算基金收益表现
     
+    一次查询加载累计净值序列，由performance_engine向量化计算所有区间。
+    
     Args:
         fund_id: 基金ID
     
     Returns:
         包含各时间段收益率的字典
     """
-    today = date.today()
-    latest_value = get_latest_fund_values(fund_id=fund_id, limit=1)
-    
-    if not latest_value:
-        return {
-            'week': None,
-            'month': None,
-            'three_month': None,
-            'six_month': None,
-            'year': None,
-            'three_year': None,
-            'five_year': None,
-            'since_inception': None
-        }
-    
-    latest_value = latest_value[0]
-    latest_date = latest_value.date
-    
-    # 计算各个时间范围的日期
-    week_ago = latest_date - timedelta(days=7)
-    month_ago = latest_date.replace(month=latest_date.month-1) if latest_date.month > 1 else latest_date.replace(year=latest_date.year-1, month=12)
-    three_month_ago = latest_date.replace(month=latest_date.month-3) if latest_date.month > 3 else latest_date.replace(year=latest_date.year-1, month=latest_date.month+9)
-    six_month_ago = latest_date.replace(month=latest_date.month-6) if latest_date.month > 6 else latest_date.replace(year=latest_date.year-1, month=latest_date.month+6)
-    year_ago = latest_date.replace(year=latest_date.year-1)
-    three_year_ago = latest_date.replace(year=latest_date.year-3)
-    five_year_ago = latest_date.replace(year=latest_date.year-5)
-    
-    # 查找对应日期的净值数据
-    week_value = find_closest_value(fund_id, week_ago)
-    month_value = find_closest_value(fund_id, month_ago)
-    three_month_value = find_closest_value(fund_id, three_month_ago)
-    six_month_value = find_closest_value(fund_id, six_month_ago)
-    year_value = find_closest_value(fund_id, year_ago)
-    three_year_value = find_closest_value(fund_id, three_year_ago)
-    five_year_value = find_closest_value(fund_id, five_year_ago)
-    
-    # 查找最早的净值数据作为成立以来基准
-    inception_value = FundValue.query.filter_by(fund_id=fund_id).order_by(FundValue.date.asc()).first()
-    
-    # 计算收益率
-    return {
-        'week': calculate_return(latest_value, week_value),
-        'month': calculate_return(latest_value, month_value),
-        'three_month': calculate_return(latest_value, three_month_value),
-        'six_month': calculate_return(latest_value, six_month_value),
-        'year': calculate_return(latest_value, year_value),
-        'three_year': calculate_return(latest_value, three_year_value),
-        'five_year': calculate_return(latest_value, five_year_value),
-        'since_inception': calculate_return(latest_value, inception_value)
-    }
+    return calculate_performance(fund_id)
 
 def find_closest_value(fund_id, target_date):
     """查找最接近目标日期的净值记录
@@ -366,18 +546,13 @@ def find_closest_value(fund_id, target_date):
     Returns:
         FundValue对象或None
     """
-    # 先查找刚好等于目标日期的记录
-    value = FundValue.query.filter_by(fund_id=fund_id, date=target_date).first()
-    if value:
-        return value
-    
-    # 如果没有找到，尝试查找最接近的记录（目标日期之前的最近一条）
-    value = FundValue.query.filter_by(fund_id=fund_id).filter(FundValue.date <= target_date).order_by(FundValue.date.desc()).first()
-    if value:
-        return value
-    
-    # 如果还没找到，则查找最早的记录
-    return FundValue.query.filter_by(fund_id=fund_id).order_by(FundValue.date.asc()).first()
+    # 在净值序列缓存中定位当日或之前最近的净值，目标日期早于全部历史时使用最早的记录
+    series = nav_store.get(fund_id)
+    if not len(series):
+        return None
+    index = series.as_of_index(target_date)
+    value_date = series.point(index if index is not None else 0)['date']
+    return FundValue.query.filter_by(fund_id=fund_id, date=value_date).first()
 
 def calculate_return(current_value, base_value):
     """计算收益率
@@ -407,47 +582,101 @@ def update_performance_metrics(fund_id):
     Returns:
         是否成功更新
     """
+    return update_performance_metrics_batch([fund_id]) == 1
+
+def update_performance_metrics_batch(fund_ids):
+    """批量重算多只基金的业绩汇总（fund_performance表）及最新净值记录上的收益率字段
+    
+    所有基金的净值序列按批一次性加载并向量化计算，在新净值写入后调用即可增量维护汇总表。
+    
+    Args:
+        fund_ids: 基金ID列表
+    
+    Returns:
+        成功更新的基金数
+    """
     try:
-        # 获取最新的净值数据
-        latest_value = get_latest_fund_values(fund_id=fund_id, limit=1)
-        if not latest_value:
-            logger.warning(f"No fund value found for fund_id={fund_id}")
-            return False
-            
-        latest_value = latest_value[0]
-        latest_date = latest_value.date
-        
-        # 计算各个时间范围的日期
-        week_ago = latest_date - timedelta(days=7)
-        month_ago = latest_date.replace(month=latest_date.month-1) if latest_date.month > 1 else latest_date.replace(year=latest_date.year-1, month=12)
-        year_ago = latest_date.replace(year=latest_date.year-1)
+        fund_ids = list(fund_ids)
+        latest_values = get_latest_value_rows(fund_ids)
+        performances = calculate_performance_batch(list(latest_values))
         
-        # 查找对应日期的净值数据
-        week_value = find_closest_value(fund_id, week_ago)
-        month_value = find_closest_value(fund_id, month_ago)
-        year_value = find_closest_value(fund_id, year_ago)
+        for fund_id in fund_ids:
+            if fund_id not in latest_values:
+                logger.warning(f"No fund value found for fund_id={fund_id}")
         
-        # 查找最早的净值数据作为成立以来基准
-        inception_value = FundValue.query.filter_by(fund_id=fund_id).order_by(FundValue.date.asc()).first()
-        
-        # 计算各时间段收益率
-        week_change = calculate_return(latest_value, week_value)
-        month_change = calculate_return(latest_value, month_value)
-        year_change = calculate_return(latest_value, year_value)
-        since_inception_change = calculate_return(latest_value, inception_value)
+        summaries = {
+            summary.fund_id: summary
+            for offset in range(0, len(performances), PERFORMANCE_QUERY_CHUNK)
+            for summary in FundPerformance.query.filter(
+                FundPerformance.fund_id.in_(list(performances)[offset:offset + PERFORMANCE_QUERY_CHUNK])
+            ).all()
+        }
         
-        # 更新最新净值记录的收益率字段
-        latest_value.last_week_change = week_change
-        latest_value.last_month_change = month_change
-        latest_value.last_year_change = year_change
-        latest_value.since_inception_change = since_inception_change
+        for fund_id, performance in performances.items():
+            latest_value = latest_values[fund_id]
+            
+            # 更新最新净值记录的收益率字段
+            latest_value.last_week_change = performance['week']
+            latest_value.last_month_change = performance['month']
+            latest_value.last_year_change = performance['year']
+            latest_value.since_inception_change = performance['since_inception']
+            
+            # 更新业绩汇总
+            summary = summaries.get(fund_id)
+            if summary is None:
+                summary = FundPerformance(fund_id=fund_id)
+                db.session.add(summary)
+            summary.update_from(latest_value, performance)
         
         # 提交更新
         db.session.commit()
-        logger.info(f"Updated performance metrics for fund_id={fund_id}, latest_date={latest_date}")
-        return True
+        fund_screener.invalidate()
+        # 基金列表接口包含业绩汇总，净值接口包含最新净值记录上的收益率
+        bump_generations(FUND_LIST_FAMILY)
+        cache_invalidate_tags(*[fund_values_tag(fund_id) for fund_id in performances])
+        logger.info(f"Updated performance metrics for {len(performances)} funds")
+        return len(performances)
         
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error updating performance metrics: {str(e)}")
-        return False 
\ No newline at end of file
+        return 0
+
+def get_latest_value_rows(fund_ids):
+    """分批查询多只基金的最新净值记录
+    
+    Args:
+        fund_ids: 基金ID列表
+    
+    Returns:
+        以基金ID为键、最新FundValue为值的字典，没有净值数据的基金不在其中
+    """
+    latest_values = {}
+    fund_ids = list(fund_ids)
+    for offset in range(0, len(fund_ids), PERFORMANCE_QUERY_CHUNK):
+        chunk = fund_ids[offset:offset + PERFORMANCE_QUERY_CHUNK]
+        latest_dates = db.session.query(
+            FundValue.fund_id.label('fund_id'),
+            db.func.max(FundValue.date).label('latest_date')
+        ).filter(FundValue.fund_id.in_(chunk)).group_by(FundValue.fund_id).subquery()
+        
+        rows = FundValue.query.join(
+            latest_dates,
+            db.and_(FundValue.fund_id == latest_dates.c.fund_id, FundValue.date == latest_dates.c.latest_date)
+        ).all()
+        latest_values.update((row.fund_id, row) for row in rows)
+    return latest_values
+
+def get_fund_performance(fund_id):
+    """读取基金的业绩汇总，汇总缺失但已有净值数据时即时重算一次
+    
+    Args:
+        fund_id: 基金ID
+    
+    Returns:
+        FundPerformance实例，没有净值数据时返回None
+    """
+    summary = db.session.get(FundPerformance, fund_id)
+    if summary is None and update_performance_metrics(fund_id):
+        summary = db.session.get(FundPerformance, fund_id)
+    return summary
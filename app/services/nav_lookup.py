@@ -0,0 +1,91 @@
+import logging
+from collections import defaultdict
+import numpy as np
+from app.extensions import trading_calendar
+from app.services.nav_store import nav_store, day_number
+
+logger = logging.getLogger(__name__)
+
+def pricing_date(purchase_date, before_cutoff=True):
+    """按15:00截止规则确定申购使用哪一天的净值
+
+    15:00前在交易日申购按当日（T日）净值确认，15:00后或在休市日申购按下一个交易日（T+1）净值确认。
+    before_cutoff为None（未记录）时与Purchase模型的默认值一致，按15:00前处理。
+    """
+    before_cutoff = True if before_cutoff is None else before_cutoff
+    return trading_calendar.next_trading_day(purchase_date, inclusive=bool(before_cutoff))
+
+def lookup_navs(queries):
+    """批量查询多个(基金ID, 日期)的净值：有当日净值时取当日，否则取之前最近的一条
+
+    同一基金的所有日期在内存中的有序日期数组上用一次二分查找完成定位。
+
+    Args:
+        queries: (fund_id, date) 元组的列表
+
+    Returns:
+        与queries顺序一致的字典列表，包含nav_date、net_value、accumulated_value、daily_change和is_exact_date，
+        日期早于基金的第一条净值时净值字段为None
+    """
+    results = [None] * len(queries)
+    positions = defaultdict(list)
+    for position, (fund_id, day) in enumerate(queries):
+        positions[fund_id].append(position)
+
+    for fund_id, fund_positions in positions.items():
+        series = nav_store.get(fund_id)
+        days = np.array([day_number(queries[position][1]) for position in fund_positions], dtype=np.int32)
+        indexes = np.searchsorted(series.days, days, side='right') - 1
+        for position, index, day in zip(fund_positions, indexes.tolist(), days.tolist()):
+            if index < 0:
+                results[position] = _empty_result(fund_id, queries[position][1])
+                continue
+            point = series.point(index)
+            results[position] = {
+                'fund_id': fund_id,
+                'date': queries[position][1],
+                'nav_date': point['date'],
+                'net_value': point['net_value'],
+                'accumulated_value': point['accumulated_value'],
+                'daily_change': point['daily_change'],
+                'is_exact_date': int(series.days[index]) == day
+            }
+    return results
+
+def lookup_purchase_navs(purchases):
+    """批量查询申购确认净值，遵循before_cutoff的T/T+1规则
+
+    Args:
+        purchases: (fund_id, purchase_date, before_cutoff) 元组的列表，也可以直接传入Purchase对象列表
+
+    Returns:
+        与purchases顺序一致的字典列表，在lookup_navs结果基础上增加pricing_date和pending；
+        确认日的净值尚未公布时pending为True，净值字段为None
+    """
+    items = [
+        (item.fund_id, item.purchase_date, item.before_cutoff)
+        if hasattr(item, 'purchase_date') else item
+        for item in purchases
+    ]
+    pricing_dates = [pricing_date(purchase_date, before_cutoff) for _, purchase_date, before_cutoff in items]
+    results = lookup_navs([(fund_id, day) for (fund_id, _, _), day in zip(items, pricing_dates)])
+
+    for (fund_id, purchase_date, _), day, result in zip(items, pricing_dates, results):
+        latest = nav_store.get(fund_id).latest()
+        result['date'] = purchase_date
+        result['pricing_date'] = day
+        result['pending'] = latest is None or latest['date'] < day
+        if result['pending']:
+            result.update(_empty_result(fund_id, purchase_date))
+    return results
+
+def _empty_result(fund_id, day):
+    return {
+        'fund_id': fund_id,
+        'date': day,
+        'nav_date': None,
+        'net_value': None,
+        'accumulated_value': None,
+        'daily_change': None,
+        'is_exact_date': False
+    }
@@ -0,0 +1,191 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+import numpy as np
+from flask import current_app
+from app.extensions import db
+from app.models import FundValue
+
+logger = logging.getLogger(__name__)
+
+# 日期编号的起点，日期以距1970-01-01的天数存为int32
+_EPOCH = date(1970, 1, 1)
+
+# 每个序列除数组外的固定内存开销估算（字节）
+_SERIES_OVERHEAD = 256
+
+# 序列的加载版本号，每次从数据库加载递增，子序列沿用原序列的版本号
+_versions = itertools.count(1)
+
+def day_number(day):
+    """把日期转换为距1970-01-01的天数"""
+    return (day - _EPOCH).days
+
+def from_day_number(number):
+    """把天数转换回日期"""
+    return _EPOCH + timedelta(days=int(number))
+
+class NavSeries:
+    """单只基金按日期升序排列的净值序列，所有列都是紧凑的类型化数组
+
+    Attributes:
+        days: int32数组，距1970-01-01的天数
+        net_values: float64数组，单位净值
+        accumulated_values: float64数组，累计净值
+        daily_changes: float64数组，日涨跌幅（百分比），缺失为NaN
+        version: 加载版本号，可以代替序列本身作为派生结果的缓存标识
+    """
+
+    __slots__ = ('fund_id', 'days', 'net_values', 'accumulated_values', 'daily_changes', 'loaded_at', 'version')
+
+    def __init__(self, fund_id, days, net_values, accumulated_values, daily_changes, loaded_at=None, version=None):
+        self.fund_id = fund_id
+        self.days = days
+        self.net_values = net_values
+        self.accumulated_values = accumulated_values
+        self.daily_changes = daily_changes
+        self.loaded_at = loaded_at if loaded_at is not None else time.time()
+        self.version = version if version is not None else next(_versions)
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def nbytes(self):
+        return (self.days.nbytes + self.net_values.nbytes + self.accumulated_values.nbytes
+                + self.daily_changes.nbytes + _SERIES_OVERHEAD)
+
+    @property
+    def dates(self):
+        """datetime64[D]形式的日期数组"""
+        return self.days.astype('datetime64[D]')
+
+    def slice(self, start_date=None, end_date=None):
+        """返回日期在[start_date, end_date]之间的子序列，数组为原序列的视图，不复制数据"""
+        start = 0 if start_date is None else int(np.searchsorted(self.days, day_number(start_date), side='left'))
+        end = len(self.days) if end_date is None else int(np.searchsorted(self.days, day_number(end_date), side='right'))
+        return NavSeries(self.fund_id, self.days[start:end], self.net_values[start:end],
+                         self.accumulated_values[start:end], self.daily_changes[start:end], self.loaded_at, self.version)
+
+    def as_of_index(self, day):
+        """不晚于指定日期的最后一条净值的位置，没有时返回None"""
+        index = int(np.searchsorted(self.days, day_number(day), side='right')) - 1
+        return index if index >= 0 else None
+
+    def as_of(self, day):
+        """不晚于指定日期的最后一条净值，没有时返回None"""
+        index = self.as_of_index(day)
+        return self.point(index) if index is not None else None
+
+    def latest(self):
+        """最新一条净值，序列为空时返回None"""
+        return self.point(len(self.days) - 1) if len(self.days) else None
+
+    def point(self, index):
+        """把指定位置转换为字典"""
+        daily_change = self.daily_changes[index]
+        return {
+            'date': from_day_number(self.days[index]),
+            'net_value': float(self.net_values[index]),
+            'accumulated_value': float(self.accumulated_values[index]),
+            'daily_change': None if np.isnan(daily_change) else float(daily_change)
+        }
+
+    def points(self):
+        """按日期升序逐条生成字典"""
+        for index in range(len(self.days)):
+            yield self.point(index)
+
+class NavStore:
+    """进程内只读净值序列缓存
+
+    每只基金的净值在首次访问时用一次查询加载为NavSeries，按最近最少使用淘汰，
+    所有序列占用的总内存不超过NAV_STORE_MAX_BYTES。本进程写入净值后会立即失效对应基金，
+    其他进程写入的数据在NAV_STORE_TTL秒后重新加载。
+    """
+
+    def __init__(self):
+        self._series = OrderedDict()
+        self._nbytes = 0
+        # 失效计数：全部清空的次数，以及每只基金被失效的次数，加载期间计数变化时丢弃加载结果
+        self._clears = 0
+        self._invalidations = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._series)
+
+    def get(self, fund_id):
+        """获取基金的完整净值序列，未缓存或已过期时从数据库加载"""
+        ttl = current_app.config['NAV_STORE_TTL']
+        with self._lock:
+            series = self._series.get(fund_id)
+            if series is not None and time.time() - series.loaded_at < ttl:
+                self._series.move_to_end(fund_id)
+                return series
+            generation = self._generation_of(fund_id)
+
+        series = load_nav_series(fund_id)
+        self._put(series, current_app.config['NAV_STORE_MAX_BYTES'], generation)
+        return series
+
+    def invalidate(self, fund_ids):
+        """丢弃指定基金的缓存序列，下次访问时重新加载"""
+        with self._lock:
+            for fund_id in fund_ids:
+                self._invalidations[fund_id] = self._invalidations.get(fund_id, 0) + 1
+                series = self._series.pop(fund_id, None)
+                if series is not None:
+                    self._nbytes -= series.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._clears += 1
+            self._invalidations.clear()
+            self._series.clear()
+            self._nbytes = 0
+
+    def _put(self, series, max_bytes, generation):
+        with self._lock:
+            # 加载期间该基金有写入时不缓存，避免把旧数据保留到过期；其他基金的写入不影响
+            if generation != self._generation_of(series.fund_id):
+                return
+            previous = self._series.pop(series.fund_id, None)
+            if previous is not None:
+                self._nbytes -= previous.nbytes
+            # 单个序列超过上限时不缓存
+            if series.nbytes > max_bytes:
+                return
+            self._series[series.fund_id] = series
+            self._nbytes += series.nbytes
+            while self._nbytes > max_bytes:
+                _, evicted = self._series.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+
+    def _generation_of(self, fund_id):
+        return self._clears, self._invalidations.get(fund_id, 0)
+
+def load_nav_series(fund_id):
+    """一次查询把基金的全部净值加载为NavSeries，只读取四个列，不构造ORM对象"""
+    rows = db.session.query(FundValue.date, FundValue.net_value, FundValue.accumulated_value, FundValue.daily_change)\
+        .filter(FundValue.fund_id == fund_id)\
+        .order_by(FundValue.date.asc())\
+        .all()
+    count = len(rows)
+    return NavSeries(
+        fund_id,
+        np.fromiter((day_number(row[0]) for row in rows), dtype=np.int32, count=count),
+        np.fromiter((row[1] for row in rows), dtype=np.float64, count=count),
+        np.fromiter((np.nan if row[2] is None else row[2] for row in rows), dtype=np.float64, count=count),
+        np.fromiter((np.nan if row[3] is None else row[3] for row in rows), dtype=np.float64, count=count)
+    )
+
+# 进程内共享的净值序列缓存
+nav_store = NavStore()
@@ -1,6 +1,14 @@
 from app.extensions import db
 from app.models import Note, Fund, User
-from app.utils.redis_utils import cache_delete, cache_clear_pattern
+from app.utils.redis_utils import bump_generations, fund_notes_family, fund_detail_family, NOTES_FAMILY
+
+def invalidate_note_caches(fund):
+    """笔记变化后失效笔记接口缓存，以及该基金的笔记列表缓存和详情缓存（详情包含笔记数）"""
+    if fund is None:
+        bump_generations(NOTES_FAMILY)
+    else:
+        bump_generations(NOTES_FAMILY, fund_notes_family(fund.code), fund_detail_family(fund.code))
+
 
 def get_note_by_id(note_id):
     """通过ID获取笔记"""
@@ -53,7 +61,7 @@ def create_note(user_id, fund_id, title, content, rating=None, is_public=True):
     db.session.commit()
     
     # 清除相关缓存
-    cache_clear_pattern(f'fund_notes:{fund_id}:*')
+    invalidate_note_caches(fund)
     
     return note, '笔记创建成功'
 
@@ -75,20 +83,20 @@ def update_note(note, title=None, content=None, rating=None, is_public=None):
     db.session.commit()
     
     # 清除相关缓存
-    cache_clear_pattern(f'fund_notes:{note.fund_id}:*')
+    invalidate_note_caches(note.fund)
     
     return note
 
 
 def delete_note(note):
     """删除笔记"""
-    fund_id = note.fund_id
+    fund = note.fund
     
     db.session.delete(note)
     db.session.commit()
     
     # 清除相关缓存
-    cache_clear_pattern(f'fund_notes:{fund_id}:*')
+    invalidate_note_caches(fund)
     
     return True
 
@@ -0,0 +1,149 @@
+import logging
+from calendar import monthrange
+from datetime import timedelta
+import numpy as np
+from app.extensions import db
+from app.models import FundValue
+from app.services.nav_store import nav_store
+
+logger = logging.getLogger(__name__)
+
+# 收益率统计区间：(名称, 回溯月数, 回溯天数)
+HORIZONS = (
+    ('week', 0, 7),
+    ('month', 1, 0),
+    ('three_month', 3, 0),
+    ('six_month', 6, 0),
+    ('year', 12, 0),
+    ('three_year', 36, 0),
+    ('five_year', 60, 0),
+)
+
+HORIZON_NAMES = tuple(name for name, _, _ in HORIZONS) + ('since_inception',)
+
+# 批量计算时组合键中每只基金占用的天数跨度，远大于datetime64[D]的实际取值范围
+_GROUP_STRIDE = 10 ** 7
+
+def empty_performance():
+    """没有净值数据时的收益率结果"""
+    return {name: None for name in HORIZON_NAMES}
+
+def horizon_start_dates(latest_date):
+    """计算各统计区间的基准日期，月末日期按目标月份的天数截断"""
+    targets = []
+    for _, months, days in HORIZONS:
+        if months:
+            targets.append(shift_months(latest_date, -months))
+        else:
+            targets.append(latest_date - timedelta(days=days))
+    return targets
+
+def load_value_series(fund_id):
+    """从净值序列缓存读取基金按日期升序排列的累计净值序列
+
+    Returns:
+        (dates, values) 元组，dates为datetime64[D]数组，values为float64数组
+    """
+    series = nav_store.get(fund_id)
+    return series.dates, series.accumulated_values
+
+def compute_performance(dates, values):
+    """根据升序的日期和累计净值数组计算各区间收益率
+
+    每个区间的基准为不晚于基准日期的最后一条净值（与find_closest_value一致），
+    基准日期早于全部历史时使用最早的净值。所有区间通过一次searchsorted完成定位。
+
+    Returns:
+        包含各时间段收益率（百分比，保留两位小数）的字典
+    """
+    if len(dates) == 0:
+        return empty_performance()
+
+    latest_date = dates[-1].astype(object)
+    targets = np.array(horizon_start_dates(latest_date), dtype='datetime64[D]')
+    indexes = np.searchsorted(dates, targets, side='right') - 1
+    indexes = np.maximum(indexes, 0)
+    indexes = np.append(indexes, 0)
+
+    returns = _returns(values[-1], values[indexes])
+    return dict(zip(HORIZON_NAMES, returns.tolist()))
+
+def calculate_performance(fund_id):
+    """计算单只基金的各区间收益率，只需一次查询"""
+    dates, values = load_value_series(fund_id)
+    return compute_performance(dates, values)
+
+def calculate_performance_batch(fund_ids, chunk_size=200):
+    """批量计算多只基金的各区间收益率
+
+    每批基金用一次查询加载全部净值，把(基金序号, 日期)编码为单调递增的组合键后，
+    所有基金、所有区间的基准位置通过一次searchsorted得到。
+
+    Args:
+        fund_ids: 基金ID列表
+        chunk_size: 每次查询加载的基金数，限制内存占用
+
+    Returns:
+        以基金ID为键的收益率字典，没有净值数据的基金返回全为None的结果
+    """
+    results = {}
+    fund_ids = list(fund_ids)
+    for offset in range(0, len(fund_ids), chunk_size):
+        chunk = fund_ids[offset:offset + chunk_size]
+        rows = db.session.query(FundValue.fund_id, FundValue.date, FundValue.accumulated_value)\
+            .filter(FundValue.fund_id.in_(chunk))\
+            .order_by(FundValue.fund_id.asc(), FundValue.date.asc())\
+            .all()
+        results.update(_compute_performance_grouped(rows))
+        for fund_id in chunk:
+            results.setdefault(fund_id, empty_performance())
+    return results
+
+def _compute_performance_grouped(rows):
+    """对按(fund_id, date)升序排列的多基金净值行计算收益率"""
+    if not rows:
+        return {}
+
+    row_fund_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    dates, values = _to_arrays([(row[1], row[2]) for row in rows])
+
+    # 每只基金在数组中的起止位置
+    starts = np.flatnonzero(np.r_[True, row_fund_ids[1:] != row_fund_ids[:-1]])
+    ends = np.r_[starts[1:], len(rows)]
+    group_of_row = np.repeat(np.arange(len(starts)), ends - starts)
+
+    day_numbers = dates.astype(np.int64)
+    keys = group_of_row * _GROUP_STRIDE + day_numbers
+
+    latest_dates = dates[ends - 1].astype(object)
+    targets = np.array([horizon_start_dates(day) for day in latest_dates], dtype='datetime64[D]')
+    target_keys = np.arange(len(starts))[:, None] * _GROUP_STRIDE + targets.astype(np.int64)
+
+    indexes = np.searchsorted(keys, target_keys, side='right') - 1
+    indexes = np.maximum(indexes, starts[:, None])
+    indexes = np.hstack([indexes, starts[:, None]])
+
+    returns = _returns(values[ends - 1][:, None], values[indexes])
+    return {
+        int(row_fund_ids[start]): dict(zip(HORIZON_NAMES, fund_returns))
+        for start, fund_returns in zip(starts, returns.tolist())
+    }
+
+def _returns(latest_values, base_values):
+    """计算收益率百分比，基准无效时为None"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.round((latest_values / base_values - 1) * 100, 2)
+    valid = np.isfinite(returns) & (base_values != 0)
+    return np.where(valid, returns, None)
+
+def _to_arrays(rows):
+    dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    values = np.array([np.nan if row[1] is None else row[1] for row in rows], dtype=np.float64)
+    return dates, values
+
+def shift_months(day, months):
+    """把日期移动若干个月，目标月份没有对应日期时取月末"""
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return day.replace(year=year, month=month, day=min(day.day, monthrange(year, month)[1]))
@@ -0,0 +1,140 @@
+import logging
+import numpy as np
+from app.models import Fund, FundPerformance, Purchase
+from app.services.nav_lookup import lookup_purchase_navs
+from app.services.nav_store import nav_store
+
+logger = logging.getLogger(__name__)
+
+def resolve_purchases(purchases):
+    """补全购买记录缺失的份额和单价
+
+    缺少单价和份额中的一个时用另一个换算（份额 = (金额 - 手续费) / 单价）；两者都缺时按15:00截止规则
+    取确认日净值作为单价，所有需要净值的记录一次批量查询。确认日净值尚未公布的记录份额为None。
+
+    Returns:
+        与purchases顺序一致的(份额, 单价, 是否待确认)元组列表
+    """
+    resolved = []
+    missing = []
+    for index, purchase in enumerate(purchases):
+        net_amount = (purchase.amount or 0) - (purchase.fee or 0)
+        share, price = purchase.share, purchase.price
+        if share is None and price:
+            share = net_amount / price
+        elif price is None and share:
+            price = net_amount / share
+        elif share is None:
+            missing.append(index)
+        resolved.append((share, price, False))
+
+    if missing:
+        navs = lookup_purchase_navs([purchases[index] for index in missing])
+        for index, nav in zip(missing, navs):
+            purchase = purchases[index]
+            if nav['pending'] or not nav['net_value']:
+                resolved[index] = (None, None, True)
+                continue
+            price = nav['net_value']
+            resolved[index] = (((purchase.amount or 0) - (purchase.fee or 0)) / price, price, False)
+    return resolved
+
+def build_portfolio(purchases):
+    """按基金汇总购买记录，计算持仓成本、市值、盈亏和权重
+
+    份额补全和最新净值各只需一次批量查询，汇总通过按基金分组的向量运算完成，
+    计算量与购买记录数成线性关系。待确认的申购按申购金额计入市值，不计盈亏。
+
+    Args:
+        purchases: Purchase对象列表
+
+    Returns:
+        包含holdings（按市值降序）和summary的字典
+    """
+    purchases = list(purchases)
+    resolved = resolve_purchases(purchases)
+
+    fund_ids = sorted({purchase.fund_id for purchase in purchases})
+    column_of = {fund_id: column for column, fund_id in enumerate(fund_ids)}
+    groups = np.array([column_of[purchase.fund_id] for purchase in purchases], dtype=np.int64)
+    amounts = np.array([purchase.amount or 0 for purchase in purchases], dtype=np.float64)
+    shares = np.array([share or 0 for share, _, _ in resolved], dtype=np.float64)
+    pending = np.array([is_pending for _, _, is_pending in resolved], dtype=bool)
+
+    size = len(fund_ids)
+    cost = np.bincount(groups, weights=amounts, minlength=size)
+    total_shares = np.bincount(groups, weights=shares, minlength=size)
+    pending_amount = np.bincount(groups, weights=np.where(pending, amounts, 0), minlength=size)
+    counts = np.bincount(groups, minlength=size)
+
+    # 一次查询读取所有持有基金的最新净值
+    funds = {fund.id: fund for fund in Fund.query.filter(Fund.id.in_(fund_ids)).all()} if fund_ids else {}
+    latest = {
+        summary.fund_id: (summary.net_value, summary.latest_date)
+        for summary in FundPerformance.query.filter(FundPerformance.fund_id.in_(fund_ids)).all()
+    } if fund_ids else {}
+    for fund_id in fund_ids:
+        if fund_id not in latest:
+            point = nav_store.get(fund_id).latest()
+            latest[fund_id] = (point['net_value'], point['date']) if point else (None, None)
+
+    latest_navs = np.array([latest[fund_id][0] or np.nan for fund_id in fund_ids], dtype=np.float64)
+    confirmed_cost = cost - pending_amount
+    market_value = np.where(np.isnan(latest_navs), confirmed_cost, total_shares * latest_navs) + pending_amount
+    profit = market_value - cost
+    total_value = market_value.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average_cost = confirmed_cost / total_shares
+        profit_rate = profit / confirmed_cost * 100
+        weight = market_value / total_value * 100
+
+    holdings = []
+    for column, fund_id in enumerate(fund_ids):
+        fund = funds.get(fund_id)
+        latest_date = latest[fund_id][1]
+        holdings.append({
+            'fund': {
+                'id': fund_id,
+                'code': fund.code if fund else None,
+                'name': fund.name if fund else None
+            },
+            'purchase_count': int(counts[column]),
+            'shares': _round(total_shares[column], 2),
+            'cost': _round(cost[column], 2),
+            'average_cost': _round(average_cost[column], 4),
+            'latest_nav': _round(latest_navs[column], 4),
+            'latest_nav_date': latest_date.isoformat() if latest_date else None,
+            'market_value': _round(market_value[column], 2),
+            'profit': _round(profit[column], 2),
+            'profit_rate': _round(profit_rate[column], 2),
+            'weight': _round(weight[column], 2),
+            'pending_amount': _round(pending_amount[column], 2)
+        })
+    holdings.sort(key=lambda holding: holding['market_value'] or 0, reverse=True)
+
+    total_cost = cost.sum()
+    total_confirmed = confirmed_cost.sum()
+    return {
+        'holdings': holdings,
+        'summary': {
+            'fund_count': size,
+            'purchase_count': len(purchases),
+            'cost': _round(total_cost, 2),
+            'market_value': _round(total_value, 2),
+            'profit': _round(total_value - total_cost, 2),
+            'profit_rate': _round((total_value - total_cost) / total_confirmed * 100, 2) if total_confirmed else None,
+            'pending_amount': _round(pending_amount.sum(), 2)
+        }
+    }
+
+def get_user_portfolio(user_id, fund_id=None):
+    """计算用户的持仓，可只计算单只基金"""
+    query = Purchase.query.filter_by(user_id=user_id)
+    if fund_id:
+        query = query.filter_by(fund_id=fund_id)
+    return build_portfolio(query.all())
+
+def _round(value, digits):
+    value = float(value)
+    return None if not np.isfinite(value) else round(value, digits)
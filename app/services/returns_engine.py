@@ -0,0 +1,128 @@
+import numpy as np
+
+# 年化使用的每年天数
+DAYS_PER_YEAR = 365.0
+
+# 收益率求解范围（年化），下限接近-100%，上限足以覆盖持有几天的极端年化值
+_MIN_RATE = -0.9999
+_MAX_RATE = 1e9
+
+_NEWTON_ITERATIONS = 50
+_BISECTION_ITERATIONS = 100
+
+# 收敛判定：净现值绝对值小于现金流规模的该比例
+_TOLERANCE = 1e-10
+
+def xirr_batch(days, flows):
+    """同时求解多组现金流的年化内部收益率（XIRR）
+
+    每组现金流为一行，长度不足的行用金额为0的现金流补齐。先对所有行同时做牛顿迭代，
+    未收敛或越界的行再在log(1 + r)空间上同时二分求解。
+
+    Args:
+        days: (组数, 现金流数)的数组，现金流发生日期（天数，可为任意起点）
+        flows: 同形状的现金流金额，投入为负、取回或期末市值为正
+
+    Returns:
+        年化收益率数组（小数），现金流不同时包含正负金额时为NaN
+    """
+    days = np.asarray(days, dtype=np.float64)
+    flows = np.asarray(flows, dtype=np.float64)
+    if flows.ndim != 2 or flows.shape[0] == 0:
+        return np.zeros(0)
+
+    # 以每组最早的现金流为时间起点，避免(1 + r)的幂次过大
+    has_flow = flows != 0
+    first_day = np.where(has_flow, days, np.inf).min(axis=1, keepdims=True)
+    years = np.where(has_flow, days - np.where(np.isfinite(first_day), first_day, 0), 0) / DAYS_PER_YEAR
+    scale = np.abs(flows).sum(axis=1)
+    solvable = (flows > 0).any(axis=1) & (flows < 0).any(axis=1)
+
+    rates = np.full(len(flows), 0.1)
+    converged = ~solvable
+    with np.errstate(all='ignore'):
+        for _ in range(_NEWTON_ITERATIONS):
+            npv, derivative = _npv(rates, years, flows, with_derivative=True)
+            converged |= np.abs(npv) <= _TOLERANCE * scale
+            if converged.all():
+                break
+            step = np.where(converged, 0, npv / derivative)
+            rates = rates - np.where(np.isfinite(step), step, 0)
+            invalid = ~np.isfinite(rates) | (rates <= _MIN_RATE) | (rates > _MAX_RATE)
+            # 越界的行不再迭代，交给二分法
+            converged |= invalid & solvable
+            rates = np.where(invalid, np.nan, rates)
+
+        npv, _ = _npv(rates, years, flows)
+        pending = solvable & ~(np.abs(npv) <= _TOLERANCE * scale)
+        if pending.any():
+            rates[pending] = _bisect(years[pending], flows[pending])
+
+    rates[~solvable] = np.nan
+    return rates
+
+def _npv(rates, years, flows, with_derivative=False):
+    """计算各行在给定收益率下的净现值及其导数"""
+    growth = (1 + rates)[:, None]
+    discounted = flows * growth ** -years
+    npv = discounted.sum(axis=1)
+    if not with_derivative:
+        return npv, None
+    derivative = (-years * discounted / growth).sum(axis=1)
+    return npv, derivative
+
+def _bisect(years, flows):
+    """在log(1 + r)空间上同时二分求解各行的内部收益率"""
+    low = np.full(len(flows), np.log1p(_MIN_RATE))
+    high = np.full(len(flows), np.log1p(_MAX_RATE))
+    low_npv = _log_npv(low, years, flows)
+    high_npv = _log_npv(high, years, flows)
+    # 区间两端同号时无解
+    bracketed = np.sign(low_npv) != np.sign(high_npv)
+
+    for _ in range(_BISECTION_ITERATIONS):
+        middle = (low + high) / 2
+        middle_npv = _log_npv(middle, years, flows)
+        same_side = np.sign(middle_npv) == np.sign(low_npv)
+        low = np.where(same_side, middle, low)
+        low_npv = np.where(same_side, middle_npv, low_npv)
+        high = np.where(same_side, high, middle)
+
+    return np.where(bracketed, np.expm1((low + high) / 2), np.nan)
+
+def _log_npv(log_growth, years, flows):
+    return (flows * np.exp(-years * log_growth[:, None])).sum(axis=1)
+
+def time_weighted_returns(values, flows):
+    """根据每日市值和当日投入计算时间加权收益率（TWR）
+
+    申购按当日净值成交，投入视为在当日收盘时发生，当日收益率为 (市值 - 当日投入) / 前一日市值 - 1；
+    此前没有持仓的日期为 市值 / 当日投入 - 1（即手续费的损耗）。把各日收益率连乘，
+    剔除投入时点和金额对收益率的影响。
+
+    Args:
+        values: (日期数, 组数)的每日市值矩阵
+        flows: 同形状的当日投入金额
+
+    Returns:
+        每组的累计时间加权收益率（小数），从未持有的组为NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    flows = np.asarray(flows, dtype=np.float64)
+    previous = np.vstack([np.zeros((1, values.shape[1])), values[:-1]])
+    held = previous > 0
+    entered = ~held & (flows > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(held, (values - flows) / previous, np.where(entered, values / flows, 1.0))
+    growth = np.where(np.isfinite(growth), growth, 1.0)
+    result = np.prod(growth, axis=0) - 1
+    result[~(held | entered).any(axis=0)] = np.nan
+    return result
+
+def annualize(total_returns, days):
+    """把累计收益率（小数）按持有天数年化，不足一天时为NaN"""
+    total_returns = np.asarray(total_returns, dtype=np.float64)
+    days = np.asarray(days, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = (1 + total_returns) ** (DAYS_PER_YEAR / days) - 1
+    return np.where(days >= 1, result, np.nan)
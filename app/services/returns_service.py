@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import numpy as np
+from flask import current_app
+from redis.exceptions import RedisError
+from app import extensions
+from app.extensions import db
+from app.models import Fund, FundPerformance, Purchase
+from app.services.nav_lookup import pricing_date
+from app.services.nav_store import nav_store, day_number, from_day_number
+from app.services.portfolio_service import resolve_purchases
+from app.services.returns_engine import xirr_batch, time_weighted_returns, annualize
+
+logger = logging.getLogger(__name__)
+
+def calculate_returns(purchases):
+    """计算每只基金和整个组合的资金加权收益率（XIRR）和时间加权收益率（TWR）
+
+    现金流为每笔申购的金额（含手续费，发生在申购日）和估值日的期末市值；每日市值为确认日起的持有份额
+    乘以当日单位净值（节假日沿用前一个净值）。所有基金和组合一起放进矩阵计算，XIRR一次批量求解。
+    确认日净值尚未公布的申购不参与计算，只统计待确认金额。
+
+    Args:
+        purchases: Purchase对象列表
+
+    Returns:
+        包含funds（按基金）和portfolio（整个组合）的字典
+    """
+    purchases = list(purchases)
+    resolved = resolve_purchases(purchases)
+    confirmed = [(purchase, share) for purchase, (share, _, pending) in zip(purchases, resolved) if not pending]
+    pending_amount = sum(purchase.amount or 0 for purchase, (_, _, pending) in zip(purchases, resolved) if pending)
+
+    fund_ids = sorted({purchase.fund_id for purchase, _ in confirmed})
+    if not fund_ids:
+        return {'funds': [], 'portfolio': _empty_returns(pending_amount)}
+    column_of = {fund_id: column for column, fund_id in enumerate(fund_ids)}
+    series = [nav_store.get(fund_id) for fund_id in fund_ids]
+
+    # 日期索引：从最早的确认日到最新净值日，所有持有基金净值日期的并集
+    entry_days = np.array([
+        day_number(pricing_date(purchase.purchase_date, purchase.before_cutoff)) for purchase, _ in confirmed
+    ], dtype=np.int64)
+    all_days = np.unique(np.concatenate([nav.days for nav in series] + [entry_days]))
+    days = all_days[all_days >= entry_days.min()]
+
+    # 每只基金在每个日期的单位净值（不晚于该日的最后一个净值），首个净值之前为NaN
+    navs = np.full((len(days), len(fund_ids)), np.nan)
+    for column, nav in enumerate(series):
+        if len(nav):
+            index = np.searchsorted(nav.days, days, side='right') - 1
+            navs[:, column] = np.where(index >= 0, nav.net_values[np.maximum(index, 0)], np.nan)
+
+    columns = np.array([column_of[purchase.fund_id] for purchase, _ in confirmed], dtype=np.int64)
+    rows = np.searchsorted(days, entry_days)
+    amounts = np.array([purchase.amount or 0 for purchase, _ in confirmed], dtype=np.float64)
+    shares = np.array([share or 0 for _, share in confirmed], dtype=np.float64)
+
+    added_shares = np.zeros(navs.shape)
+    flows = np.zeros(navs.shape)
+    np.add.at(added_shares, (rows, columns), shares)
+    np.add.at(flows, (rows, columns), amounts)
+    values = np.nan_to_num(np.cumsum(added_shares, axis=0) * navs)
+
+    # 最后一列为整个组合
+    values = np.hstack([values, values.sum(axis=1, keepdims=True)])
+    flows = np.hstack([flows, flows.sum(axis=1, keepdims=True)])
+    twr = time_weighted_returns(values, flows)
+
+    # 估值日：各基金为自己的最新净值日，组合为全部基金中最新的净值日
+    valuation_days = np.array([nav.days[-1] if len(nav) else days[-1] for nav in series] + [days[-1]], dtype=np.int64)
+    end_values = values[-1]
+    xirr_days, xirr_flows = _cash_flow_matrix(
+        purchase_days=np.array([day_number(purchase.purchase_date) for purchase, _ in confirmed], dtype=np.int64),
+        amounts=amounts,
+        columns=columns,
+        valuation_days=valuation_days,
+        end_values=end_values
+    )
+    xirr = xirr_batch(xirr_days, xirr_flows)
+
+    start_days = np.array([
+        entry_days[columns == column].min() for column in range(len(fund_ids))
+    ] + [entry_days.min()], dtype=np.int64)
+    holding_days = valuation_days - start_days
+    twr_annualized = annualize(twr, holding_days)
+    invested = np.append(np.bincount(columns, weights=amounts, minlength=len(fund_ids)), amounts.sum())
+
+    results = [
+        {
+            'start_date': from_day_number(start_days[column]).isoformat(),
+            'valuation_date': from_day_number(valuation_days[column]).isoformat(),
+            'holding_days': int(holding_days[column]),
+            'invested': _round(invested[column], 2),
+            'market_value': _round(end_values[column], 2),
+            'xirr': _percent(xirr[column]),
+            'twr': _percent(twr[column]),
+            'twr_annualized': _percent(twr_annualized[column])
+        }
+        for column in range(len(fund_ids) + 1)
+    ]
+
+    funds = {fund.id: fund for fund in Fund.query.filter(Fund.id.in_(fund_ids)).all()}
+    fund_results = []
+    for column, fund_id in enumerate(fund_ids):
+        fund = funds.get(fund_id)
+        fund_results.append(dict(
+            results[column],
+            fund={'id': fund_id, 'code': fund.code if fund else None, 'name': fund.name if fund else None}
+        ))
+
+    portfolio = dict(results[-1], pending_amount=_round(pending_amount, 2))
+    return {'funds': fund_results, 'portfolio': portfolio}
+
+def get_user_returns(user_id):
+    """获取用户持仓的XIRR和TWR，结果按用户缓存
+
+    缓存键包含用户购买记录的版本（记录数和最后更新时间）和所持基金业绩汇总的版本（最新净值日期和更新时间），
+    购买记录增删改或净值写入后自动使用新的缓存，旧缓存等待过期。
+    """
+    cache_key = f"returns:user:{user_id}:{_data_version(user_id)}"
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = calculate_returns(Purchase.query.filter_by(user_id=user_id).all())
+    _cache_set(cache_key, result)
+    return result
+
+def _data_version(user_id):
+    """用一次聚合查询得到用户购买记录和所持基金业绩汇总的版本摘要
+
+    净值写入后会重算业绩汇总表，用其最新净值日期和更新时间代表净值版本，不扫描净值历史。
+    """
+    purchase_count, purchase_updated, latest_date, performance_updated = db.session.query(
+        db.func.count(Purchase.id), db.func.max(Purchase.updated_at),
+        db.func.max(FundPerformance.latest_date), db.func.max(FundPerformance.updated_at)
+    ).outerjoin(
+        FundPerformance, FundPerformance.fund_id == Purchase.fund_id
+    ).filter(Purchase.user_id == user_id).one()
+
+    version = f"{purchase_count}:{purchase_updated}:{latest_date}:{performance_updated}"
+    return hashlib.md5(version.encode()).hexdigest()
+
+def _cash_flow_matrix(purchase_days, amounts, columns, valuation_days, end_values):
+    """构建XIRR的现金流矩阵：每只基金一行、组合一行，投入为负，估值日市值为正
+
+    Returns:
+        (days, flows) 两个(基金数 + 1, 最大现金流数)的矩阵，不足的位置金额为0
+    """
+    group_count = len(valuation_days)
+    row_of_flow = np.concatenate([columns, np.full(len(columns), group_count - 1)])
+    flow_days = np.concatenate([purchase_days, purchase_days])
+    flow_amounts = -np.concatenate([amounts, amounts])
+
+    counts = np.bincount(row_of_flow, minlength=group_count)
+    width = counts.max() + 1
+    order = np.argsort(row_of_flow, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    positions = np.arange(len(order)) - np.repeat(starts, counts)
+
+    days = np.zeros((group_count, width))
+    flows = np.zeros((group_count, width))
+    days[row_of_flow[order], positions] = flow_days[order]
+    flows[row_of_flow[order], positions] = flow_amounts[order]
+    # 每行最后一列放期末市值
+    days[:, -1] = valuation_days
+    flows[:, -1] = end_values
+    return days, flows
+
+def _empty_returns(pending_amount=0):
+    return {
+        'start_date': None,
+        'valuation_date': None,
+        'holding_days': 0,
+        'invested': 0,
+        'market_value': 0,
+        'xirr': None,
+        'twr': None,
+        'twr_annualized': None,
+        'pending_amount': _round(pending_amount, 2)
+    }
+
+def _percent(value):
+    """小数收益率转换为保留两位小数的百分比"""
+    return _round(value * 100, 2)
+
+def _round(value, digits):
+    value = float(value)
+    return None if not np.isfinite(value) else round(value, digits)
+
+def _cache_get(key):
+    try:
+        data = extensions.redis_client.get(key)
+    except RedisError as e:
+        logger.warning(f"Returns cache unavailable: {str(e)}")
+        return None
+    return json.loads(data) if data else None
+
+def _cache_set(key, data):
+    try:
+        extensions.redis_client.setex(key, current_app.config['RETURNS_CACHE_TTL'], json.dumps(data))
+    except RedisError as e:
+        logger.warning(f"Returns cache unavailable: {str(e)}")
@@ -0,0 +1,199 @@
+import logging
+import re
+import numpy as np
+from flask import current_app
+from app.extensions import db
+from app.models import FundValue
+from app.services.performance_engine import load_value_series, shift_months, _to_arrays
+
+logger = logging.getLogger(__name__)
+
+# 每年的交易日数，用于把日收益率年化
+TRADING_DAYS_PER_YEAR = 252
+
+# 计算年化收益率时每年的自然日数
+DAYS_PER_YEAR = 365.25
+
+# 风险指标统计窗口的写法：Nm（N个月）、Ny（N年）或all（成立以来）
+_WINDOW_PATTERN = re.compile(r'^(\d+)([my])$')
+
+# 单个统计窗口最多回溯的月数（50年），以及单次最多的统计窗口数
+MAX_RISK_WINDOW_MONTHS = 600
+MAX_RISK_WINDOWS = 10
+
+RISK_METRIC_NAMES = (
+    'annualized_return', 'volatility', 'max_drawdown', 'sharpe_ratio', 'sortino_ratio', 'calmar_ratio'
+)
+
+def parse_risk_windows(value):
+    """解析逗号分隔的统计窗口，如 "1y,3y,all"
+
+    Returns:
+        (窗口名, 回溯月数) 元组的列表，成立以来的回溯月数为None
+
+    Raises:
+        ValueError: 窗口写法无效、回溯超过MAX_RISK_WINDOW_MONTHS个月或窗口数超过MAX_RISK_WINDOWS
+    """
+    windows = []
+    for name in (item.strip().lower() for item in value.split(',')):
+        if not name:
+            continue
+        if name == 'all':
+            windows.append((name, None))
+            continue
+        match = _WINDOW_PATTERN.match(name)
+        if not match or int(match.group(1)) == 0:
+            raise ValueError(f"无效的统计窗口: {name}")
+        count, unit = int(match.group(1)), match.group(2)
+        months = count * 12 if unit == 'y' else count
+        if months > MAX_RISK_WINDOW_MONTHS:
+            raise ValueError(f"统计窗口不能超过{MAX_RISK_WINDOW_MONTHS}个月: {name}")
+        windows.append((name, months))
+    if not windows:
+        raise ValueError("至少需要一个统计窗口")
+    if len(windows) > MAX_RISK_WINDOWS:
+        raise ValueError(f"最多指定{MAX_RISK_WINDOWS}个统计窗口")
+    return windows
+
+def configured_risk_windows():
+    """读取RISK_WINDOWS配置的统计窗口"""
+    return parse_risk_windows(current_app.config['RISK_WINDOWS'])
+
+def empty_risk():
+    """数据不足时的风险指标结果"""
+    result = {name: None for name in RISK_METRIC_NAMES}
+    result.update({
+        'start_date': None,
+        'end_date': None,
+        'max_drawdown_peak_date': None,
+        'max_drawdown_trough_date': None,
+        'max_drawdown_recovery_date': None
+    })
+    return result
+
+def compute_risk(dates, values, windows, risk_free_rate=0.0):
+    """根据升序的日期和累计净值数组计算各窗口的风险指标
+
+    窗口起点与收益率统计一致：取不晚于起始日期的最后一条净值，历史不足时从最早的净值开始。
+    无效净值（空值或非正数）在计算前剔除。
+
+    Args:
+        dates: datetime64[D]数组
+        values: 累计净值float64数组
+        windows: parse_risk_windows返回的窗口列表
+        risk_free_rate: 年化无风险利率（小数，如0.015）
+
+    Returns:
+        以窗口名为键的风险指标字典。收益率、波动率和回撤为百分比（保留两位小数），
+        夏普、索提诺和卡玛比率保留两位小数
+    """
+    valid = np.isfinite(values) & (values > 0)
+    dates, values = dates[valid], values[valid]
+
+    results = {}
+    for name, months in windows:
+        if len(dates) < 2:
+            results[name] = empty_risk()
+            continue
+        start = 0
+        if months is not None:
+            start_date = np.datetime64(shift_months(dates[-1].astype(object), -months), 'D')
+            start = max(int(np.searchsorted(dates, start_date, side='right')) - 1, 0)
+        results[name] = _window_risk(dates[start:], values[start:], risk_free_rate)
+    return results
+
+def calculate_risk(fund_id, windows=None, risk_free_rate=None):
+    """计算单只基金的风险指标，只需一次查询"""
+    windows = windows or configured_risk_windows()
+    if risk_free_rate is None:
+        risk_free_rate = current_app.config['RISK_FREE_RATE']
+    dates, values = load_value_series(fund_id)
+    return compute_risk(dates, values, windows, risk_free_rate)
+
+def calculate_risk_batch(fund_ids, windows=None, risk_free_rate=None, chunk_size=200):
+    """批量计算多只基金的风险指标
+
+    每批基金用一次查询加载全部净值，再按基金切分成视图分别向量化计算，不复制数据。
+
+    Returns:
+        以基金ID为键的风险指标字典，没有净值数据的基金各窗口均为空结果
+    """
+    windows = windows or configured_risk_windows()
+    if risk_free_rate is None:
+        risk_free_rate = current_app.config['RISK_FREE_RATE']
+
+    results = {}
+    fund_ids = list(fund_ids)
+    for offset in range(0, len(fund_ids), chunk_size):
+        chunk = fund_ids[offset:offset + chunk_size]
+        rows = db.session.query(FundValue.fund_id, FundValue.date, FundValue.accumulated_value)\
+            .filter(FundValue.fund_id.in_(chunk))\
+            .order_by(FundValue.fund_id.asc(), FundValue.date.asc())\
+            .all()
+        if rows:
+            row_fund_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            dates, values = _to_arrays([(row[1], row[2]) for row in rows])
+            starts = np.flatnonzero(np.r_[True, row_fund_ids[1:] != row_fund_ids[:-1]])
+            ends = np.r_[starts[1:], len(rows)]
+            for start, end in zip(starts, ends):
+                results[int(row_fund_ids[start])] = compute_risk(
+                    dates[start:end], values[start:end], windows, risk_free_rate
+                )
+        for fund_id in chunk:
+            results.setdefault(fund_id, {name: empty_risk() for name, _ in windows})
+    return results
+
+def _window_risk(dates, values, risk_free_rate):
+    """计算单个窗口内的风险指标"""
+    returns = values[1:] / values[:-1] - 1
+    daily_risk_free = risk_free_rate / TRADING_DAYS_PER_YEAR
+
+    # 年化收益率按自然日折算
+    days = int((dates[-1] - dates[0]).astype(np.int64))
+    annualized_return = (values[-1] / values[0]) ** (DAYS_PER_YEAR / days) - 1 if days > 0 else None
+
+    # 年化波动率和夏普比率
+    volatility = float(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)) if len(returns) > 1 else None
+    mean_excess = float(np.mean(returns) - daily_risk_free) * TRADING_DAYS_PER_YEAR
+    sharpe_ratio = mean_excess / volatility if volatility else None
+
+    # 索提诺比率只计低于无风险收益的波动
+    downside = np.minimum(returns - daily_risk_free, 0)
+    downside_deviation = float(np.sqrt(np.mean(downside ** 2)) * np.sqrt(TRADING_DAYS_PER_YEAR))
+    sortino_ratio = mean_excess / downside_deviation if downside_deviation else None
+
+    # 最大回撤：相对历史最高点的最大跌幅，以及最高点、最低点和恢复到最高点的日期
+    running_max = np.maximum.accumulate(values)
+    drawdowns = values / running_max - 1
+    trough = int(np.argmin(drawdowns))
+    max_drawdown = float(drawdowns[trough])
+    peak_date = trough_date = recovery_date = None
+    if max_drawdown < 0:
+        peak = int(np.flatnonzero(values[:trough + 1] == running_max[trough])[-1])
+        recovered = np.flatnonzero(values[trough:] >= values[peak])
+        peak_date = dates[peak].astype(object)
+        trough_date = dates[trough].astype(object)
+        if len(recovered):
+            recovery_date = dates[trough + int(recovered[0])].astype(object)
+
+    calmar_ratio = annualized_return / -max_drawdown if annualized_return is not None and max_drawdown < 0 else None
+
+    return {
+        'start_date': dates[0].astype(object),
+        'end_date': dates[-1].astype(object),
+        'annualized_return': _percent(annualized_return),
+        'volatility': _percent(volatility),
+        'max_drawdown': _percent(max_drawdown),
+        'max_drawdown_peak_date': peak_date,
+        'max_drawdown_trough_date': trough_date,
+        'max_drawdown_recovery_date': recovery_date,
+        'sharpe_ratio': _ratio(sharpe_ratio),
+        'sortino_ratio': _ratio(sortino_ratio),
+        'calmar_ratio': _ratio(calmar_ratio)
+    }
+
+def _percent(value):
+    return None if value is None or not np.isfinite(value) else round(float(value) * 100, 2)
+
+def _ratio(value):
+    return None if value is None or not np.isfinite(value) else round(float(value), 2)
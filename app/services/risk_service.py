@@ -0,0 +1,94 @@
+import logging
+from app.extensions import db
+from app.models import Fund, FundRisk
+from app.services.risk_engine import calculate_risk, calculate_risk_batch, configured_risk_windows
+from app.services.screener import fund_screener
+
+logger = logging.getLogger(__name__)
+
+# 定时任务每批刷新的基金数
+RISK_REFRESH_CHUNK = 200
+
+def refresh_risk_metrics(fund_ids=None):
+    """批量重算并保存基金在RISK_WINDOWS各窗口的风险指标
+
+    Args:
+        fund_ids: 基金ID列表，为None时刷新所有基金
+
+    Returns:
+        成功刷新的基金数
+    """
+    if fund_ids is None:
+        fund_ids = [fund_id for fund_id, in db.session.query(Fund.id).order_by(Fund.id).all()]
+    fund_ids = list(fund_ids)
+    windows = configured_risk_windows()
+    period_names = [name for name, _ in windows]
+
+    refreshed = 0
+    for offset in range(0, len(fund_ids), RISK_REFRESH_CHUNK):
+        chunk = fund_ids[offset:offset + RISK_REFRESH_CHUNK]
+        try:
+            risks = calculate_risk_batch(chunk, windows, chunk_size=RISK_REFRESH_CHUNK)
+            existing = {
+                (row.fund_id, row.period): row
+                for row in FundRisk.query.filter(FundRisk.fund_id.in_(chunk)).all()
+            }
+
+            for fund_id, periods in risks.items():
+                for period, risk in periods.items():
+                    row = existing.pop((fund_id, period), None)
+                    if row is None:
+                        row = FundRisk(fund_id=fund_id, period=period)
+                        db.session.add(row)
+                    row.update_from(risk)
+
+            # 删除已不在配置中的窗口
+            for row in existing.values():
+                if row.period not in period_names:
+                    db.session.delete(row)
+
+            db.session.commit()
+            refreshed += len(chunk)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error refreshing risk metrics for funds {chunk[0]}-{chunk[-1]}: {str(e)}")
+
+    fund_screener.invalidate()
+    logger.info(f"Refreshed risk metrics for {refreshed} funds")
+    return refreshed
+
+def get_fund_risk(fund_id, windows=None):
+    """读取基金的风险指标
+
+    已保存的窗口直接返回，其余窗口（未刷新过或不在RISK_WINDOWS中）即时计算，不写入数据库。
+
+    Args:
+        fund_id: 基金ID
+        windows: parse_risk_windows返回的窗口列表，为None时使用RISK_WINDOWS
+
+    Returns:
+        以窗口名为键、指标字典为值的有序字典
+    """
+    windows = windows or configured_risk_windows()
+    stored = {
+        row.period: row.to_dict()
+        for row in FundRisk.query.filter(
+            FundRisk.fund_id == fund_id,
+            FundRisk.period.in_([name for name, _ in windows])
+        ).all()
+    }
+
+    missing = [(name, months) for name, months in windows if name not in stored]
+    if missing:
+        for name, risk in calculate_risk(fund_id, missing).items():
+            stored[name] = _serialize(name, risk)
+
+    return {name: stored[name] for name, _ in windows}
+
+def _serialize(period, risk):
+    """把compute_risk的结果转换为与FundRisk.to_dict一致的结构"""
+    data = {'period': period}
+    for key, value in risk.items():
+        data[key] = value.isoformat() if hasattr(value, 'isoformat') else value
+    data['updated_at'] = None
+    return data
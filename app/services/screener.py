@@ -0,0 +1,199 @@
+import base64
+import json
+import logging
+import threading
+import time
+import numpy as np
+from flask import current_app
+from app.extensions import db
+from app.models import Fund, FundPerformance, FundRisk
+
+logger = logging.getLogger(__name__)
+
+# 可用于筛选和排序的收益率字段（来自fund_performance表）
+PERFORMANCE_FIELDS = (
+    'net_value', 'daily_change', 'week_change', 'month_change', 'three_month_change', 'six_month_change',
+    'year_change', 'three_year_change', 'five_year_change', 'since_inception_change'
+)
+
+# 可用于筛选和排序的风险字段（来自fund_risk表中SCREENER_RISK_PERIOD窗口）
+RISK_FIELDS = ('annualized_return', 'volatility', 'max_drawdown', 'sharpe_ratio', 'sortino_ratio', 'calmar_ratio')
+
+NUMERIC_FIELDS = PERFORMANCE_FIELDS + RISK_FIELDS + ('size',)
+
+# 单页最多返回的基金数
+MAX_LIMIT = 200
+
+class ScreenerQueryError(ValueError):
+    """筛选参数无效"""
+
+class FundSnapshot:
+    """所有基金筛选字段的列式快照，每个数值字段一个float64数组（缺失为NaN）"""
+
+    def __init__(self, rows, risk_period):
+        self.risk_period = risk_period
+        self.built_at = time.time()
+        self.ids = np.array([row.id for row in rows], dtype=np.int64)
+        self.codes = [row.code for row in rows]
+        self.names = [row.name for row in rows]
+        self.types = np.array([row.type or '' for row in rows], dtype=object)
+        self.companies = np.array([row.company or '' for row in rows], dtype=object)
+        self.latest_dates = [row.latest_date for row in rows]
+        self.columns = {
+            field: np.array([np.nan if getattr(row, field) is None else getattr(row, field) for row in rows],
+                            dtype=np.float64)
+            for field in NUMERIC_FIELDS
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def item(self, index):
+        """把快照中的一行转换为响应字典"""
+        data = {
+            'id': int(self.ids[index]),
+            'code': self.codes[index],
+            'name': self.names[index],
+            'type': self.types[index] or None,
+            'company': self.companies[index] or None,
+            'latest_date': self.latest_dates[index].isoformat() if self.latest_dates[index] else None
+        }
+        for field, column in self.columns.items():
+            value = column[index]
+            data[field] = None if np.isnan(value) else float(value)
+        return data
+
+class FundScreener:
+    """基于列式快照的基金筛选器
+
+    快照由一次联表查询生成，在进程内缓存SCREENER_SNAPSHOT_TTL秒；本进程刷新业绩汇总或风险指标后
+    会立即失效。筛选和排序全部在NumPy数组上完成，不访问数据库。
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """使快照失效，下次查询时重建"""
+        self._snapshot = None
+
+    def snapshot(self):
+        """返回当前快照，过期时重建"""
+        ttl = current_app.config['SCREENER_SNAPSHOT_TTL']
+        risk_period = current_app.config['SCREENER_RISK_PERIOD']
+        snapshot = self._snapshot
+        if snapshot is not None and time.time() - snapshot.built_at < ttl and snapshot.risk_period == risk_period:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.time() - snapshot.built_at >= ttl or snapshot.risk_period != risk_period:
+                started_at = time.time()
+                snapshot = FundSnapshot(_load_rows(risk_period), risk_period)
+                self._snapshot = snapshot
+                logger.info(f"Built screener snapshot of {len(snapshot)} funds in {time.time() - started_at:.3f}s")
+        return snapshot
+
+    def screen(self, sort='year_change', order='desc', limit=50, cursor=None, types=None, companies=None,
+               ranges=None):
+        """筛选并排序基金，使用键集分页
+
+        Args:
+            sort: 排序字段，NUMERIC_FIELDS之一，该字段缺失的基金不参与排序
+            order: desc或asc，相同取值按基金ID升序
+            limit: 每页基金数，不超过MAX_LIMIT
+            cursor: 上一页返回的next_cursor
+            types: 基金类型列表
+            companies: 基金公司列表
+            ranges: {字段: (下限, 上限)}，上下限可为None
+
+        Returns:
+            包含items、total（满足条件的基金总数）和next_cursor的字典
+
+        Raises:
+            ScreenerQueryError: 参数无效
+        """
+        if sort not in NUMERIC_FIELDS:
+            raise ScreenerQueryError(f"不支持的排序字段: {sort}")
+        if order not in ('asc', 'desc'):
+            raise ScreenerQueryError(f"不支持的排序方向: {order}")
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        snapshot = self.snapshot()
+        values = snapshot.columns[sort]
+        mask = ~np.isnan(values)
+
+        if types:
+            mask &= np.isin(snapshot.types, types)
+        if companies:
+            mask &= np.isin(snapshot.companies, companies)
+        for field, (lower, upper) in (ranges or {}).items():
+            if field not in NUMERIC_FIELDS:
+                raise ScreenerQueryError(f"不支持的筛选字段: {field}")
+            column = snapshot.columns[field]
+            if lower is not None:
+                mask &= column >= lower
+            if upper is not None:
+                mask &= column <= upper
+
+        total = int(np.count_nonzero(mask))
+
+        # 键集分页：只保留排在游标之后的基金
+        if cursor:
+            after_value, after_id = _decode_cursor(cursor, sort, order)
+            if order == 'desc':
+                mask &= (values < after_value) | ((values == after_value) & (snapshot.ids > after_id))
+            else:
+                mask &= (values > after_value) | ((values == after_value) & (snapshot.ids > after_id))
+
+        candidates = np.flatnonzero(mask)
+        keys = -values[candidates] if order == 'desc' else values[candidates]
+        if len(candidates) > limit:
+            # 先用partition找到第limit小的键，只对不大于它的基金精确排序
+            kth = np.partition(keys, limit - 1)[limit - 1]
+            candidates = candidates[keys <= kth]
+            keys = keys[keys <= kth]
+        page = candidates[np.lexsort((snapshot.ids[candidates], keys))][:limit]
+
+        next_cursor = None
+        if len(page) == limit and np.count_nonzero(mask) > limit:
+            last = page[-1]
+            next_cursor = _encode_cursor(sort, order, float(values[last]), int(snapshot.ids[last]))
+
+        return {
+            'items': [snapshot.item(index) for index in page],
+            'total': total,
+            'next_cursor': next_cursor,
+            'risk_period': snapshot.risk_period
+        }
+
+def _load_rows(risk_period):
+    """一次联表查询加载所有基金的筛选字段"""
+    return db.session.query(
+        Fund.id, Fund.code, Fund.name, Fund.type, Fund.company, Fund.size,
+        FundPerformance.latest_date,
+        *[getattr(FundPerformance, field) for field in PERFORMANCE_FIELDS],
+        *[getattr(FundRisk, field) for field in RISK_FIELDS]
+    ).outerjoin(FundPerformance, FundPerformance.fund_id == Fund.id)\
+        .outerjoin(FundRisk, db.and_(FundRisk.fund_id == Fund.id, FundRisk.period == risk_period))\
+        .order_by(Fund.id)\
+        .all()
+
+def _encode_cursor(sort, order, value, fund_id):
+    payload = json.dumps([sort, order, value, fund_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii')
+
+def _decode_cursor(cursor, sort, order):
+    """解析游标，游标必须来自相同排序条件的上一页"""
+    try:
+        cursor_sort, cursor_order, value, fund_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        value, fund_id = float(value), int(fund_id)
+    except (ValueError, TypeError):
+        raise ScreenerQueryError("无效的分页游标")
+    if cursor_sort != sort or cursor_order != order:
+        raise ScreenerQueryError("分页游标与排序条件不一致")
+    return value, fund_id
+
+# 进程内共享的筛选器
+fund_screener = FundScreener()
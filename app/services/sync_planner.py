@@ -0,0 +1,78 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.extensions import db, trading_calendar
+from app.models import FundValue
+
+logger = logging.getLogger(__name__)
+
+# 没有净值记录也没有成立日期时默认回溯的天数，天天基金API通常最多返回约2000条记录
+DEFAULT_LOOKBACK_DAYS = 2000
+
+def plan_incremental_sync(funds, start_date=None, end_date=None):
+    """为一批基金规划增量抓取任务
+
+    一次分组查询取出所有基金的最新净值日期，据此计算每只基金缺失的区间，
+    最新净值已覆盖最近交易日的基金直接跳过，不再发起上游请求。
+    指定start_date时视为手动补数，所有基金都按指定区间抓取。
+
+    Args:
+        funds: 基金对象列表
+        start_date: 指定的开始日期 (YYYY-MM-DD)，为None时按已有净值自动推断
+        end_date: 指定的结束日期 (YYYY-MM-DD)，为None时取今天
+
+    Returns:
+        (jobs, skipped) 元组，jobs为抓取任务列表，skipped为已是最新而跳过的基金数
+    """
+    if not end_date:
+        end_date = datetime.now().date().strftime('%Y-%m-%d')
+
+    if start_date:
+        jobs = [_make_job(fund, start_date, end_date) for fund in funds]
+        return jobs, 0
+
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    expected_date = trading_calendar.previous_trading_day(end)
+    latest_dates = get_latest_value_dates([fund.id for fund in funds])
+
+    jobs = []
+    skipped = 0
+    for fund in funds:
+        latest_date = latest_dates.get(fund.id)
+        if latest_date:
+            if latest_date >= expected_date:
+                skipped += 1
+                continue
+            # 从最近一次净值的下一天开始获取，避免重复获取最后一天的数据
+            fund_start = latest_date + timedelta(days=1)
+        elif fund.inception_date:
+            fund_start = fund.inception_date
+        else:
+            fund_start = end - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+        jobs.append(_make_job(fund, fund_start.strftime('%Y-%m-%d'), end_date))
+
+    logger.info(f"Planned incremental sync up to {expected_date}: {len(jobs)} funds to fetch, {skipped} already current")
+    return jobs, skipped
+
+def get_latest_value_dates(fund_ids=None):
+    """用一次分组查询获取基金的最新净值日期
+
+    Args:
+        fund_ids: 基金ID列表，为None时查询全部基金
+
+    Returns:
+        以基金ID为键、最新净值日期为值的字典，没有净值记录的基金不在其中
+    """
+    query = db.session.query(FundValue.fund_id, func.max(FundValue.date)).group_by(FundValue.fund_id)
+    # 基金较多时直接全表分组，避免生成超长的IN列表
+    if fund_ids is not None and len(fund_ids) <= 500:
+        query = query.filter(FundValue.fund_id.in_(fund_ids))
+    return {fund_id: latest_date for fund_id, latest_date in query.all()}
+
+def _make_job(fund, start_date, end_date):
+    return {
+        'fund_id': fund.id,
+        'code': fund.code,
+        'start_date': start_date,
+        'end_date': end_date,
+    }
@@ -1,8 +1,10 @@
 import logging
-from datetime import datetime, time, timedelta
+from datetime import date
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from app.extensions import trading_calendar
 from app.services.fund_value_service import fetch_fund_value
+from app.services.risk_service import refresh_risk_metrics
 
 # 使用名称获取logger，但不进行额外配置
 logger = logging.getLogger(__name__)
@@ -31,18 +33,21 @@ def setup_scheduled_tasks():
 def update_all_fund_values():
     """更新所有基金的净值数据"""
     try:
+        # 休市日不发布净值，不发起任何请求
+        if not trading_calendar.is_trading_day(date.today()):
+            logger.info("今天不是交易日，跳过基金净值更新任务")
+            return
+        
         logger.info("开始执行基金净值更新任务")
-        today = datetime.now().date()
-        yesterday = today - timedelta(days=1)
         
-        # 获取昨天的基金净值数据
-        # 由于基金净值通常是T+1发布，所以获取昨天的数据
-        count = fetch_fund_value(
-            start_date=yesterday.strftime('%Y-%m-%d'),
-            end_date=today.strftime('%Y-%m-%d')
-        )
+        # 按每只基金的最新净值日期增量获取，已是最新的基金不会发起请求
+        count = fetch_fund_value()
         
         logger.info(f"基金净值更新完成，共更新 {count} 条记录")
+        
+        # 净值更新后批量刷新所有基金的风险指标
+        refreshed = refresh_risk_metrics()
+        logger.info(f"风险指标刷新完成，共刷新 {refreshed} 只基金")
     except Exception as e:
         logger.error(f"基金净值更新任务出错: {str(e)}")
 
@@ -0,0 +1,248 @@
+import hashlib
+import logging
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from redis.exceptions import RedisError
+from app import extensions
+from app.utils.redis_utils import cache_get_raw, cache_set_raw, versioned_key
+
+logger = logging.getLogger(__name__)
+
+# 没有缓存族的响应缓存键前缀
+RESPONSE_PREFIX = 'response'
+
+# 缓存条目头部与响应体之间的分隔符，头部为 "逻辑过期时间:重新计算耗时"
+_HEADER_SEPARATOR = b'|'
+
+# 等待其他进程重新计算时轮询缓存的间隔（秒）
+_POLL_INTERVAL = 0.05
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+def pack_entry(payload, expires_at, delta):
+    """把响应体和过期信息打包为缓存条目"""
+    return f'{expires_at:.3f}:{delta:.4f}'.encode() + _HEADER_SEPARATOR + payload
+
+def unpack_entry(entry):
+    """解析缓存条目，返回(逻辑过期时间, 重新计算耗时, 响应体)，格式不符时返回None"""
+    header, separator, payload = entry.partition(_HEADER_SEPARATOR)
+    if not separator:
+        return None
+    try:
+        expires_at, delta = header.split(b':')
+        return float(expires_at), float(delta), payload
+    except ValueError:
+        return None
+
+def should_refresh_early(expires_at, delta, beta, now=None):
+    """概率提前过期（XFetch）：越接近过期、重新计算越慢，越可能提前刷新
+
+    当 now - delta * beta * ln(rand) >= expires_at 时刷新，所有进程各自独立判断，
+    刷新时间分散在过期前的一段时间内，而不是同时在过期时刻失效。
+    """
+    now = time.time() if now is None else now
+    if beta <= 0 or delta <= 0:
+        return now >= expires_at
+    return now - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+def cached_response(ttl, families=None, tags=None, vary=None, vary_on_user=False, unless=None, stale_ttl=None):
+    """缓存返回JSON的视图函数，防止缓存击穿
+
+    缓存键由路由端点、视图参数和规范化的查询参数（按名称和值排序）组成，指定vary_on_user时再加上当前用户，
+    指定families时带有缓存族的代数。只缓存状态码为200的JSON响应，保存序列化后的字节，命中时直接返回。
+
+    - 单飞：缓存缺失时只有拿到Redis锁的进程重新计算，其他请求等待结果写入，超时后自行计算
+    - 概率提前过期：临近过期时按XFetch概率在后台提前刷新
+    - 过期后仍可用：逻辑过期后的stale_ttl秒内直接返回旧结果，并在后台刷新
+
+    Redis不可用时直接调用视图。应放在@jwt_required()之下，鉴权在读取缓存之前完成。
+
+    Args:
+        ttl: 逻辑有效期（秒）
+        families: 缓存族名称或元组，也可以是以视图参数调用并返回缓存族的函数
+        tags: 以视图参数调用、返回缓存标签列表的函数，只在写入缓存时调用
+        vary: 以视图参数调用、返回额外键部分的函数，用于结果还依赖查询参数以外的条件（如当天日期）
+        vary_on_user: 结果因用户而异时为True，按可选的JWT身份区分缓存
+        unless: 以视图参数调用的函数，返回True时不读写缓存
+        stale_ttl: 逻辑过期后仍可返回旧结果的时间（秒），默认读取CACHE_STALE_TTL配置
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if unless is not None and unless(*args, **kwargs):
+                return view(*args, **kwargs)
+
+            start_time = time.time()
+            try:
+                cache_key = response_cache_key(
+                    families(*args, **kwargs) if callable(families) else families,
+                    kwargs,
+                    vary(*args, **kwargs) if vary else (),
+                    vary_on_user
+                )
+                entry = cache_get_raw(cache_key)
+            except RedisError as e:
+                current_app.logger.warning(f"缓存不可用，直接计算: {str(e)}")
+                return view(*args, **kwargs)
+
+            config = current_app.config
+            options = {
+                'ttl': ttl,
+                'stale_ttl': config['CACHE_STALE_TTL'] if stale_ttl is None else stale_ttl,
+                'tags': tags,
+                'lock_timeout': config['CACHE_LOCK_TIMEOUT'],
+                'vary_on_user': vary_on_user,
+            }
+
+            unpacked = unpack_entry(entry) if entry else None
+            if unpacked is not None:
+                expires_at, delta, payload = unpacked
+                if should_refresh_early(expires_at, delta, config['CACHE_EARLY_EXPIRATION_BETA']):
+                    _refresh_in_background(view, args, kwargs, cache_key, options)
+                current_app.logger.info(f"缓存命中: {cache_key}")
+                current_app.logger.info(f"API响应时间: {time.time() - start_time:.3f}秒")
+                return _json_response(payload), 200
+
+            current_app.logger.info(f"缓存未命中: {cache_key}")
+            return _compute_single_flight(view, args, kwargs, cache_key, options, config['CACHE_LOCK_WAIT'])
+        return wrapper
+    return decorator
+
+def response_cache_key(families=None, view_args=None, extra=(), vary_on_user=False):
+    """根据当前请求生成响应缓存键
+
+    形如 "funds:detail:000001:v2.5:funds.get_fund:code=000001:<查询参数摘要>"，没有缓存族时以 "response" 为前缀。
+    查询参数按名称和值排序后取摘要，参数顺序不同的请求共用同一缓存；空值保留，部分接口区分空值和未提供。
+    """
+    parts = [request.endpoint]
+    parts.extend(f'{name}={value}' for name, value in sorted((view_args or {}).items()))
+    parts.extend(str(part) for part in extra)
+    if vary_on_user:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        parts.append(f'user={identity}' if identity is not None else 'anonymous')
+
+    query = sorted((name, value) for name, value in request.args.items(multi=True))
+    parts.append(hashlib.md5(urlencode(query).encode()).hexdigest() if query else '-')
+
+    if families:
+        return versioned_key(families, *parts)
+    return ':'.join([RESPONSE_PREFIX] + parts)
+
+def _compute_single_flight(view, args, kwargs, cache_key, options, lock_wait):
+    """缓存缺失时只让一个进程重新计算，其他请求在lock_wait秒内等待结果，锁释放后仍没有结果时自行计算"""
+    lock = _lock(cache_key, options['lock_timeout'])
+    try:
+        acquired = lock.acquire(blocking=False)
+    except RedisError:
+        return view(*args, **kwargs)
+
+    if acquired:
+        try:
+            return _compute_and_store(view, args, kwargs, cache_key, options)
+        finally:
+            _release(lock)
+
+    deadline = time.time() + lock_wait
+    while time.time() < deadline:
+        time.sleep(_POLL_INTERVAL)
+        try:
+            entry = cache_get_raw(cache_key)
+            unpacked = unpack_entry(entry) if entry else None
+            if unpacked is not None:
+                return _json_response(unpacked[2]), 200
+            # 持锁进程已结束但没有写入缓存（如404、500等不缓存的响应），不再等待
+            if not lock.locked():
+                break
+        except RedisError:
+            break
+
+    # 持锁进程的结果不可缓存、等待超时或持锁进程失败时自行计算
+    return _compute_and_store(view, args, kwargs, cache_key, options)
+
+def _compute_and_store(view, args, kwargs, cache_key, options):
+    """调用视图并缓存状态码为200的JSON响应"""
+    start = time.time()
+    result = view(*args, **kwargs)
+    delta = time.time() - start
+
+    response = current_app.make_response(result)
+    if response.status_code == 200 and response.mimetype == 'application/json':
+        entry = pack_entry(response.get_data(), time.time() + options['ttl'], delta)
+        try:
+            tags = options['tags'](*args, **kwargs) if options['tags'] else ()
+            cache_set_raw(cache_key, entry, options['ttl'] + options['stale_ttl'], tags)
+        except RedisError as e:
+            current_app.logger.warning(f"缓存写入失败: {cache_key}, {str(e)}")
+    return response
+
+def _refresh_in_background(view, args, kwargs, cache_key, options):
+    """拿到锁时在后台线程中重新计算，请求本身立即返回当前缓存
+
+    后台按原请求的路径和查询参数重放视图，除按用户区分时的Authorization外不带其他请求头。
+    """
+    lock = _lock(cache_key, options['lock_timeout'])
+    try:
+        if not lock.acquire(blocking=False):
+            return
+    except RedisError:
+        return
+
+    app = current_app._get_current_object()
+    path, query_string = request.path, request.query_string
+    # 按用户区分的缓存需要带上原请求的身份
+    headers = {'Authorization': request.headers['Authorization']} \
+        if options['vary_on_user'] and 'Authorization' in request.headers else {}
+
+    def refresh():
+        try:
+            with app.test_request_context(path, query_string=query_string, headers=headers):
+                if options['vary_on_user']:
+                    verify_jwt_in_request(optional=True)
+                _compute_and_store(view, args, kwargs, cache_key, options)
+        except Exception as e:
+            logger.error(f"Background cache refresh failed for {cache_key}: {str(e)}")
+        finally:
+            _release(lock)
+
+    try:
+        _background_executor(app).submit(refresh)
+    except RuntimeError:
+        _release(lock)
+
+def _background_executor(app):
+    """后台刷新线程池，每个进程一个（fork出的worker会重新创建）"""
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor_pid != pid:
+        with _executor_lock:
+            if _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=app.config['CACHE_REFRESH_WORKERS'],
+                    thread_name_prefix='cache-refresh'
+                )
+                _executor_pid = pid
+    return _executor
+
+def _lock(cache_key, timeout):
+    # 锁的令牌不保存在线程本地，后台线程可以释放请求线程获取的锁
+    return extensions.redis_client.lock(f'{cache_key}:lock', timeout=timeout, thread_local=False)
+
+def _release(lock):
+    try:
+        lock.release()
+    except Exception as e:
+        logger.debug(f"Cache lock already released: {str(e)}")
+
+def _json_response(payload):
+    return current_app.response_class(payload, mimetype='application/json')
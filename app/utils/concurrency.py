@@ -0,0 +1,40 @@
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class HostLimiter:
+    """按上游主机限制并发请求数
+
+    每个主机持有一个信号量，所有线程共享，保证并发抓取时
+    同一主机上同时进行的请求不超过配置的上限。
+    """
+
+    def __init__(self, limit=8):
+        self.limit = limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """从应用配置读取单主机并发上限"""
+        self.limit = app.config.get('FUND_FETCH_PER_HOST_LIMIT', self.limit)
+        with self._lock:
+            self._semaphores = {}
+
+    def _get_semaphore(self, host):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(max(1, self.limit))
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def slot(self, url):
+        """占用目标URL所在主机的一个并发名额"""
+        semaphore = self._get_semaphore(urlparse(url).netloc)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
@@ -0,0 +1,153 @@
+import threading
+from urllib.parse import urlparse, urlunparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 模拟浏览器的通用请求头，所有上游请求共用
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# 天天基金网接口需要额外携带Referer
+EASTMONEY_HEADERS = {
+    'Referer': 'http://fund.eastmoney.com/',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+}
+
+# 遇到这些状态码时按退避策略重试
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# 这些状态码计入熔断器的失败次数
+FAILURE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def parse_host_overrides(value):
+    """解析 "host=http://127.0.0.1:8900,host2=..." 格式的上游主机重定向配置"""
+    overrides = {}
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item or '=' not in item:
+            continue
+        host, base_url = item.split('=', 1)
+        overrides[host.strip()] = urlparse(base_url.strip())
+    return overrides
+
+
+class HttpClient:
+    """应用级共享的HTTP客户端
+
+    所有上游请求共用一个requests.Session：每个主机维护一个keep-alive连接池，
+    默认带超时、gzip压缩和针对5xx/超时的指数退避重试，并受主机并发上限、
+    令牌桶限流和熔断器约束。
+    """
+
+    def __init__(self, limiter=None, rate_limiter=None, circuit_breaker=None):
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.timeout = 10
+        self.max_retries = 3
+        self.retry_backoff = 0.5
+        self.pool_maxsize = 32
+        self.host_overrides = {}
+        self._session = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """从应用配置读取超时、重试和连接池参数"""
+        self.timeout = app.config.get('HTTP_TIMEOUT', self.timeout)
+        self.max_retries = app.config.get('HTTP_MAX_RETRIES', self.max_retries)
+        self.retry_backoff = app.config.get('HTTP_RETRY_BACKOFF', self.retry_backoff)
+        self.pool_maxsize = app.config.get('HTTP_POOL_MAXSIZE', self.pool_maxsize)
+        self.host_overrides = parse_host_overrides(app.config.get('UPSTREAM_HOST_OVERRIDES', ''))
+        self.close()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            backoff_factor=self.retry_backoff,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry
+        )
+
+        session = requests.Session()
+        session.headers.update(BROWSER_HEADERS)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def request(self, method, url, **kwargs):
+        """发送请求，未指定timeout时使用默认超时
+
+        Raises:
+            CircuitOpenError: 目标主机处于熔断状态
+            RateLimitExceeded: 等待限流令牌超时
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        parsed = urlparse(url)
+        host = parsed.netloc
+        
+        # 上游主机被重定向（如本地模拟服务器）时只替换协议和地址，限流和熔断仍按原主机计算
+        request_url = url
+        override = self.host_overrides.get(host)
+        if override is not None:
+            request_url = urlunparse(parsed._replace(scheme=override.scheme, netloc=override.netloc))
+
+        # 先获取限流令牌再检查熔断，避免半开状态放行探测请求后因限流超时而没有记录结果
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(host)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request(host)
+
+        try:
+            if self.limiter is None:
+                response = self.session.request(method, request_url, **kwargs)
+            else:
+                with self.limiter.slot(url):
+                    response = self.session.request(method, request_url, **kwargs)
+        except requests.RequestException:
+            self._record_result(host, success=False)
+            raise
+
+        self._record_result(host, success=response.status_code not in FAILURE_STATUS_CODES)
+        return response
+
+    def _record_result(self, host, success):
+        if self.circuit_breaker is None:
+            return
+        if success:
+            self.circuit_breaker.record_success(host)
+        else:
+            self.circuit_breaker.record_failure(host)
+
+    def get(self, url, **kwargs):
+        """发送GET请求"""
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        """关闭连接池，下次请求时重新创建"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# 每个条目除键和值以外的固定内存开销估算（字节）
+_ENTRY_OVERHEAD = 128
+
+# 订阅断开后重连的等待时间上限（秒）
+_MAX_RECONNECT_DELAY = 30.0
+
+
+class LocalCache:
+    """Redis前面的进程内LRU缓存（L1）
+
+    条目数、内存和有效期都有上限。缓存失效通过Redis发布/订阅广播，每个进程的后台线程收到后删除本地条目；
+    只有订阅正常时才使用本地条目，订阅断开期间全部读取退回Redis，重新订阅后清空本地缓存，
+    因此错过的失效消息不会导致读到旧数据。
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=30.0):
+        self.enabled = True
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.channel = 'cache:invalidate'
+        self.redis = None
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self._listener_epoch = 0
+        self._subscribed = threading.Event()
+
+    def init_app(self, app, redis_client):
+        """从应用配置读取容量、有效期和失效广播频道"""
+        self.enabled = app.config.get('CACHE_L1_ENABLED', self.enabled)
+        self.max_entries = app.config.get('CACHE_L1_MAX_ENTRIES', self.max_entries)
+        self.max_bytes = app.config.get('CACHE_L1_MAX_BYTES', self.max_bytes)
+        self.ttl = app.config.get('CACHE_L1_TTL', self.ttl)
+        self.channel = app.config.get('CACHE_INVALIDATION_CHANNEL', self.channel)
+        self.redis = redis_client
+        # 更换Redis客户端后旧的订阅线程退出，下次使用时在新客户端上重新订阅
+        with self._lock:
+            self._listener_epoch += 1
+            self._listener_pid = None
+            self._subscribed.clear()
+        self.clear()
+
+    @property
+    def active(self):
+        """本地缓存是否可用：已启用且当前进程的失效订阅正常"""
+        if not self.enabled or self.redis is None:
+            return False
+        self._ensure_listener()
+        return self._subscribed.is_set()
+
+    @property
+    def sequence(self):
+        """失效序号，每次删除或清空本地条目时递增"""
+        return self._sequence
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """读取未过期的本地条目，不存在或不可用时返回None"""
+        if not self.active:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, since=None):
+        """写入本地条目
+
+        Args:
+            key: 缓存键
+            value: bytes值
+            ttl: 有效期（秒），不超过本地缓存的有效期上限
+            since: 读取value之前的失效序号，期间发生过失效时不写入，避免把旧值放回本地缓存
+        """
+        if not self.active:
+            return
+        size = len(key) + len(value) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + min(ttl or self.ttl, self.ttl)
+        with self._lock:
+            if since is not None and since != self._sequence:
+                return
+            self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._nbytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._nbytes > self.max_bytes):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._nbytes -= evicted
+
+    def delete(self, keys):
+        """删除本进程的本地条目"""
+        with self._lock:
+            self._sequence += 1
+            for key in keys:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._sequence += 1
+            self._entries.clear()
+            self._nbytes = 0
+
+    def publish(self, keys):
+        """删除本地条目并广播给所有进程，广播失败只记录警告"""
+        keys = [key.decode() if isinstance(key, bytes) else key for key in keys]
+        if not keys:
+            return
+        self.delete(keys)
+        if not self.enabled or self.redis is None:
+            return
+        try:
+            self.redis.publish(self.channel, json.dumps(keys))
+        except RedisError as e:
+            logger.warning(f"Failed to publish cache invalidation: {str(e)}")
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry[2]
+
+    def _ensure_listener(self):
+        """在当前进程启动订阅线程；gunicorn预加载后fork出的worker会各自启动"""
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            self._listener_pid = pid
+            self._subscribed.clear()
+            thread = threading.Thread(
+                target=self._listen, args=(self.redis, self._listener_epoch),
+                name='cache-invalidation-listener', daemon=True
+            )
+            thread.start()
+
+    def _listen(self, redis_client, epoch):
+        delay = 1.0
+        while epoch == self._listener_epoch:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub()
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    if epoch != self._listener_epoch:
+                        return
+                    if message.get('type') == 'subscribe':
+                        # 服务器确认订阅后才启用本地缓存，订阅之前可能错过了失效消息
+                        self.clear()
+                        self._subscribed.set()
+                        delay = 1.0
+                    elif message.get('type') == 'message':
+                        self.delete(json.loads(message['data']))
+            except (RedisError, ValueError) as e:
+                logger.warning(f"Cache invalidation listener disconnected: {str(e)}")
+            finally:
+                if epoch == self._listener_epoch:
+                    self._subscribed.clear()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except RedisError:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, _MAX_RECONNECT_DELAY)
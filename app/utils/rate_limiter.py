@@ -0,0 +1,252 @@
+import logging
+import threading
+import time
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# 令牌桶脚本：在Redis中原子地补充并预留令牌，使用Redis服务器时间避免各进程时钟偏差
+# 返回需要等待的秒数（字符串），令牌不足且等待超过上限时返回-1且不预留
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+    if wait > max_wait then
+        return '-1'
+    end
+end
+
+tokens = tokens - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + math.ceil(max_wait) + 60)
+return tostring(wait)
+"""
+
+
+class RateLimitExceeded(Exception):
+    """等待令牌的时间超过上限"""
+
+
+class CircuitOpenError(Exception):
+    """上游主机熔断中，拒绝发送请求"""
+
+
+def parse_host_limits(value):
+    """解析 "host=rate:burst,host2=rate:burst" 格式的限流配置"""
+    limits = {}
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item or '=' not in item:
+            continue
+        host, spec = item.split('=', 1)
+        rate, _, burst = spec.partition(':')
+        rate = float(rate)
+        limits[host.strip()] = (rate, float(burst) if burst else rate)
+    return limits
+
+
+class TokenBucketRateLimiter:
+    """按上游主机的令牌桶限流
+
+    令牌桶状态保存在Redis中，所有gunicorn worker和命令行脚本共享同一额度；
+    Redis不可用时退回到进程内令牌桶，保证至少单进程内不超速。
+    """
+
+    def __init__(self):
+        self.default_rate = 10.0
+        self.default_burst = 20.0
+        self.host_limits = {}
+        self.max_wait = 30.0
+        self.redis = None
+        self._script = None
+        self._local_buckets = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, redis_client):
+        """从应用配置读取各主机的速率和桶容量"""
+        self.default_rate = app.config.get('UPSTREAM_RATE_LIMIT', self.default_rate)
+        self.default_burst = app.config.get('UPSTREAM_RATE_BURST', self.default_burst)
+        self.host_limits = parse_host_limits(app.config.get('UPSTREAM_RATE_LIMITS', ''))
+        self.max_wait = app.config.get('UPSTREAM_RATE_MAX_WAIT', self.max_wait)
+        self.redis = redis_client
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client is not None else None
+        self._local_buckets = {}
+
+    def get_limit(self, host):
+        """返回主机的(每秒速率, 桶容量)，速率<=0表示不限流"""
+        return self.host_limits.get(host, (self.default_rate, self.default_burst))
+
+    def acquire(self, host):
+        """获取一个令牌，必要时阻塞等待
+
+        Raises:
+            RateLimitExceeded: 需要等待的时间超过UPSTREAM_RATE_MAX_WAIT
+        """
+        rate, burst = self.get_limit(host)
+        if rate <= 0:
+            return 0.0
+
+        wait = self._reserve(host, rate, max(burst, 1.0))
+        if wait < 0:
+            raise RateLimitExceeded(f'上游主机 {host} 限流等待超过 {self.max_wait} 秒')
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _reserve(self, host, rate, burst):
+        if self._script is not None:
+            try:
+                return float(self._script(keys=[f'ratelimit:{host}'], args=[rate, burst, self.max_wait]))
+            except RedisError as e:
+                logger.warning(f"Redis rate limiter unavailable, falling back to local bucket: {str(e)}")
+        return self._reserve_local(host, rate, burst)
+
+    def _reserve_local(self, host, rate, burst):
+        with self._lock:
+            now = time.monotonic()
+            tokens, ts = self._local_buckets.get(host, (burst, now))
+            tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+
+            wait = 0.0
+            if tokens < 1:
+                wait = (1 - tokens) / rate
+                if wait > self.max_wait:
+                    return -1.0
+
+            self._local_buckets[host] = (tokens - 1, now)
+            return wait
+
+
+class CircuitBreaker:
+    """按上游主机的熔断器
+
+    连续失败达到阈值后进入打开状态，在冷却时间内直接拒绝请求；
+    冷却结束后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    状态保存在Redis中供所有进程共享，Redis不可用时退回到进程内状态。
+    """
+
+    def __init__(self):
+        self.failure_threshold = 5
+        self.reset_timeout = 30
+        self.redis = None
+        self._local_state = {}
+        self._tripped_hosts = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, redis_client):
+        """从应用配置读取失败阈值和冷却时间"""
+        self.failure_threshold = app.config.get('CIRCUIT_BREAKER_FAILURES', self.failure_threshold)
+        self.reset_timeout = app.config.get('CIRCUIT_BREAKER_RESET_TIMEOUT', self.reset_timeout)
+        self.redis = redis_client
+        self._local_state = {}
+
+    def before_request(self, host):
+        """请求前检查熔断状态
+
+        Raises:
+            CircuitOpenError: 主机处于打开状态，或半开状态下已有探测请求
+        """
+        if self.failure_threshold <= 0:
+            return
+
+        try:
+            if self.redis is not None:
+                return self._before_request_redis(host)
+        except RedisError as e:
+            logger.warning(f"Redis circuit breaker unavailable, falling back to local state: {str(e)}")
+        return self._before_request_local(host)
+
+    def record_success(self, host):
+        """请求成功，关闭熔断器"""
+        # 只有观察到过失败记录的主机才需要清理，避免每次成功请求都多一次Redis往返
+        if host not in self._tripped_hosts:
+            return
+        self._tripped_hosts.discard(host)
+
+        try:
+            if self.redis is not None:
+                self.redis.delete(f'circuit:{host}', f'circuit:{host}:probe')
+                return
+        except RedisError:
+            pass
+        with self._lock:
+            self._local_state.pop(host, None)
+
+    def record_failure(self, host):
+        """请求失败，累计失败次数，达到阈值时打开熔断器"""
+        if self.failure_threshold <= 0:
+            return
+
+        self._tripped_hosts.add(host)
+        try:
+            if self.redis is not None:
+                return self._record_failure_redis(host)
+        except RedisError:
+            pass
+        self._record_failure_local(host)
+
+    def _before_request_redis(self, host):
+        key = f'circuit:{host}'
+        failures, opened_until = self.redis.hmget(key, 'failures', 'opened_until')
+        if failures is None:
+            return
+
+        self._tripped_hosts.add(host)
+        if int(failures) < self.failure_threshold:
+            return
+
+        if time.time() < float(opened_until or 0):
+            raise CircuitOpenError(f'上游主机 {host} 已熔断')
+
+        # 半开状态：只允许一个进程发送探测请求
+        if not self.redis.set(f'{key}:probe', 1, nx=True, ex=max(1, int(self.reset_timeout))):
+            raise CircuitOpenError(f'上游主机 {host} 已熔断，正在等待探测结果')
+        logger.info(f"Circuit for {host} half-open, sending probe request")
+
+    def _record_failure_redis(self, host):
+        key = f'circuit:{host}'
+        pipe = self.redis.pipeline()
+        pipe.hincrby(key, 'failures', 1)
+        pipe.expire(key, max(1, int(self.reset_timeout)) * 10)
+        failures = pipe.execute()[0]
+
+        if failures >= self.failure_threshold:
+            pipe = self.redis.pipeline()
+            pipe.hset(key, 'opened_until', time.time() + self.reset_timeout)
+            pipe.delete(f'{key}:probe')
+            pipe.execute()
+            if failures == self.failure_threshold:
+                logger.warning(f"Circuit for {host} opened after {failures} consecutive failures")
+
+    def _before_request_local(self, host):
+        with self._lock:
+            state = self._local_state.get(host)
+            if not state or state['failures'] < self.failure_threshold:
+                return
+
+            if time.time() < state['opened_until']:
+                raise CircuitOpenError(f'上游主机 {host} 已熔断')
+
+            # 与Redis探测键的过期时间一致，探测请求没有记录结果（如抛出其他异常）时不会永久阻塞该主机
+            if time.time() < state.get('probe_until', 0):
+                raise CircuitOpenError(f'上游主机 {host} 已熔断，正在等待探测结果')
+            state['probe_until'] = time.time() + max(1, self.reset_timeout)
+
+    def _record_failure_local(self, host):
+        with self._lock:
+            state = self._local_state.setdefault(host, {'failures': 0, 'opened_until': 0})
+            state['failures'] += 1
+            if state['failures'] >= self.failure_threshold:
+                state['opened_until'] = time.time() + self.reset_timeout
+                state['probe_until'] = 0
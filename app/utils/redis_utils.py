@@ -1,35 +1,198 @@
 import json
-from app.extensions import redis_client
+import logging
+from redis.exceptions import RedisError
+from app import extensions
+
+logger = logging.getLogger(__name__)
+
+# 标签集合的键前缀，集合成员为登记在该标签下的缓存键
+TAG_PREFIX = 'cache:tag:'
+
+# 标签集合的最短有效期（秒），须长于登记在其中的缓存，避免标签先于缓存过期
+TAG_MIN_TTL = 86400
+
+# SCAN每次迭代的建议数量，以及每批删除的键数
+SCAN_COUNT = 1000
+DELETE_BATCH_SIZE = 500
+
+# 代数计数器的键前缀，计数器的值作为缓存键的一部分
+GENERATION_PREFIX = 'cache:gen:'
+
+# 按代数失效的缓存族：基金列表、基金搜索、基金详情（全部基金和单只基金）、笔记（全部笔记和单只基金的笔记）
+FUND_LIST_FAMILY = 'funds:list'
+FUND_SEARCH_FAMILY = 'funds:search'
+FUND_DETAIL_FAMILY = 'funds:detail'
+NOTES_FAMILY = 'notes'
+
+def fund_detail_family(code):
+    return f'funds:detail:{code}'
+
+def fund_notes_family(code):
+    return f'fund_notes:{code}'
+
+# 按标签失效的缓存：单只基金的外部查询结果、基金净值
+def fund_tag(code):
+    return f'fund:{code}'
+
+def fund_values_tag(fund_id):
+    return f'fund_values:{fund_id}'
+
+def cache_get_raw(key):
+    """获取缓存的原始JSON字节，先查进程内缓存，未命中再查Redis并回填进程内缓存"""
+    local_cache = extensions.local_cache
+    data = local_cache.get(key)
+    if data is not None:
+        return data
+
+    sequence = local_cache.sequence
+    data = extensions.redis_client.get(key)
+    if data is not None:
+        local_cache.set(key, data, since=sequence)
+    return data
 
 def cache_get(key):
-    """从Redis缓存获取数据"""
-    data = redis_client.get(key)
+    """从缓存获取数据"""
+    data = cache_get_raw(key)
     if data:
         return json.loads(data)
     return None
 
-def cache_set(key, data, expire=3600):
-    """将数据存入Redis缓存"""
-    redis_client.setex(key, expire, json.dumps(data))
+def cache_set(key, data, expire=3600, tags=()):
+    """将数据存入Redis缓存，并登记到各标签集合中"""
+    cache_set_raw(key, json.dumps(data).encode(), expire, tags)
+
+def cache_set_raw(key, payload, expire=3600, tags=()):
+    """存入已序列化的字节，写入和登记标签在一次往返中完成"""
+    pipe = extensions.redis_client.pipeline(transaction=False)
+    pipe.setex(key, expire, payload)
+    for tag in tags:
+        tag_key = TAG_PREFIX + tag
+        pipe.sadd(tag_key, key)
+        pipe.expire(tag_key, max(expire, TAG_MIN_TTL))
+    pipe.execute()
+    extensions.local_cache.set(key, payload, expire)
 
 def cache_delete(key):
-    """删除Redis缓存"""
-    redis_client.delete(key)
+    """删除缓存，并通知所有进程删除进程内缓存"""
+    extensions.redis_client.delete(key)
+    extensions.local_cache.publish([key])
+
+def versioned_key(families, *parts):
+    """生成包含缓存族当前代数的缓存键
+
+    多个缓存族的代数用一次MGET读取，任一缓存族的代数变化都会得到新的键；键以第一个缓存族为前缀。
+
+    Args:
+        families: 缓存族名称，或缓存族名称的元组
+        parts: 键的其余部分，如查询参数
+
+    Returns:
+        形如 "funds:list:v3:关键字:类型:1:10" 的缓存键
+    """
+    if isinstance(families, str):
+        families = (families,)
+    local_cache = extensions.local_cache
+    generation_keys = [GENERATION_PREFIX + family for family in families]
+    generations = [local_cache.get(key) for key in generation_keys]
+
+    # 进程内缓存没有的代数用一次MGET读取并回填
+    missing = [index for index, generation in enumerate(generations) if generation is None]
+    if missing:
+        sequence = local_cache.sequence
+        values = extensions.redis_client.mget([generation_keys[index] for index in missing])
+        for index, value in zip(missing, values):
+            generations[index] = value or b'0'
+            local_cache.set(generation_keys[index], generations[index], since=sequence)
+
+    version = '.'.join(generation.decode() for generation in generations)
+    return ':'.join([families[0], f'v{version}'] + [str(part) for part in parts])
+
+def bump_generations(*families):
+    """递增缓存族的代数，整族缓存立即失效且无需遍历键，旧代数的缓存等待过期
+
+    所有递增在一个管道中发送；Redis不可用时只记录警告，不影响已经完成的数据库写入。
+    """
+    families = [family for family in families if family]
+    if not families:
+        return
+    try:
+        pipe = extensions.redis_client.pipeline(transaction=False)
+        for family in families:
+            pipe.incr(GENERATION_PREFIX + family)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to bump cache generations {families}: {str(e)}")
+    extensions.local_cache.publish([GENERATION_PREFIX + family for family in families])
+
+def cache_invalidate_tags(*tags):
+    """清除登记在这些标签下的所有缓存
+
+    一次事务读取并删除所有标签集合，之后写入的缓存会登记到新集合；再用UNLINK分批删除缓存键，
+    内存在Redis后台线程释放。Redis不可用时只记录警告，不影响已经完成的数据库写入。
+
+    Returns:
+        删除的缓存键数量
+    """
+    tags = [tag for tag in tags if tag]
+    if not tags:
+        return 0
+
+    try:
+        pipe = extensions.redis_client.pipeline(transaction=True)
+        for tag in tags:
+            pipe.smembers(TAG_PREFIX + tag)
+        pipe.delete(*[TAG_PREFIX + tag for tag in tags])
+        results = pipe.execute()
+
+        keys = set()
+        for members in results[:-1]:
+            keys.update(members)
+        return _unlink(list(keys))
+    except RedisError as e:
+        logger.warning(f"Failed to invalidate cache tags {tags}: {str(e)}")
+        return 0
 
 def cache_clear_pattern(pattern):
-    """清除匹配模式的所有缓存"""
-    keys = redis_client.keys(pattern)
-    if keys:
-        redis_client.delete(*keys)
+    """清除匹配模式的所有缓存
+
+    用SCAN增量遍历键空间，不会像KEYS那样长时间阻塞Redis；适用于没有登记标签的旧缓存，
+    键数量多时应优先使用cache_invalidate_tags。
+
+    Returns:
+        删除的缓存键数量
+    """
+    try:
+        deleted = 0
+        batch = []
+        for key in extensions.redis_client.scan_iter(match=pattern, count=SCAN_COUNT):
+            batch.append(key)
+            if len(batch) >= DELETE_BATCH_SIZE:
+                deleted += _unlink(batch)
+                batch = []
+        return deleted + _unlink(batch)
+    except RedisError as e:
+        logger.warning(f"Failed to clear cache pattern {pattern}: {str(e)}")
+        return 0
+
+def _unlink(keys):
+    """分批UNLINK缓存键，所有批次在一个管道中发送，并通知所有进程删除进程内缓存"""
+    if not keys:
+        return 0
+    pipe = extensions.redis_client.pipeline(transaction=False)
+    for offset in range(0, len(keys), DELETE_BATCH_SIZE):
+        pipe.unlink(*keys[offset:offset + DELETE_BATCH_SIZE])
+    deleted = sum(pipe.execute())
+    extensions.local_cache.publish(keys)
+    return deleted
 
 def increment_counter(key, amount=1, expire=None):
     """增加计数器"""
-    value = redis_client.incrby(key, amount)
-    if expire and redis_client.ttl(key) < 0:
-        redis_client.expire(key, expire)
+    value = extensions.redis_client.incrby(key, amount)
+    if expire and extensions.redis_client.ttl(key) < 0:
+        extensions.redis_client.expire(key, expire)
     return value
 
 def get_counter(key):
     """获取计数器值"""
-    value = redis_client.get(key)
-    return int(value) if value else 0 
\ No newline at end of file
+    value = extensions.redis_client.get(key)
+    return int(value) if value else 0
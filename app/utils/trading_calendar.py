@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# 随代码分发的沪深交易所休市日（仅含工作日，周末按规则判断）
+DEFAULT_HOLIDAYS_FILE = os.path.join(os.path.dirname(__file__), 'trading_holidays.json')
+
+
+class TradingCalendar:
+    """A股交易日历
+
+    周末和节假日休市，休市日不发布基金净值。节假日列表从本地JSON文件加载，
+    格式为 {"年份": ["YYYY-MM-DD", ...]}，每年交易所公布休市安排后追加即可，
+    文件未覆盖的年份只按周末规则判断。
+    """
+
+    def __init__(self, holidays_file=None):
+        self.holidays_file = holidays_file or DEFAULT_HOLIDAYS_FILE
+        self._holidays = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """从应用配置读取节假日文件路径"""
+        self.holidays_file = app.config.get('TRADING_HOLIDAYS_FILE') or DEFAULT_HOLIDAYS_FILE
+        with self._lock:
+            self._holidays = None
+
+    @property
+    def holidays(self):
+        if self._holidays is None:
+            with self._lock:
+                if self._holidays is None:
+                    self._holidays = self._load_holidays(self.holidays_file)
+        return self._holidays
+
+    @staticmethod
+    def _load_holidays(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load trading holidays from {path}, using weekday rules only: {str(e)}")
+            return frozenset()
+
+        holidays = set()
+        for days in data.values():
+            holidays.update(datetime.strptime(day, '%Y-%m-%d').date() for day in days)
+        return frozenset(holidays)
+
+    def is_trading_day(self, day):
+        """判断是否为交易日"""
+        if isinstance(day, datetime):
+            day = day.date()
+        return day.weekday() < 5 and day not in self.holidays
+
+    def previous_trading_day(self, day, inclusive=True):
+        """返回day之前（inclusive为True时含day本身）最近的交易日"""
+        if isinstance(day, datetime):
+            day = day.date()
+        if not inclusive:
+            day -= timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    def next_trading_day(self, day, inclusive=True):
+        """返回day之后（inclusive为True时含day本身）最近的交易日"""
+        if isinstance(day, datetime):
+            day = day.date()
+        if not inclusive:
+            day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def trading_days(self, start, end):
+        """返回[start, end]区间内的所有交易日"""
+        days = []
+        day = start
+        while day <= end:
+            if self.is_trading_day(day):
+                days.append(day)
+            day += timedelta(days=1)
+        return days
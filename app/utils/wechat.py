@@ -1,6 +1,6 @@
-import requests
 import json
 from flask import current_app
+from app.extensions import http_client
 
 def get_access_token():
     """获取微信小程序全局接口调用凭据"""
@@ -17,7 +17,7 @@ def get_access_token():
     
     # 请求微信API
     url = f'https://api.weixin.qq.com/cgi-bin/token?grant_type=client_credential&appid={appid}&secret={secret}'
-    response = requests.get(url)
+    response = http_client.get(url)
     
     if response.status_code != 200:
         raise Exception('微信服务器请求失败')
@@ -44,7 +44,7 @@ def code2session(code):
     
     # 请求微信API
     url = f'https://api.weixin.qq.com/sns/jscode2session?appid={appid}&secret={secret}&js_code={code}&grant_type=authorization_code'
-    response = requests.get(url)
+    response = http_client.get(url)
     
     if response.status_code != 200:
         raise Exception('微信服务器请求失败')
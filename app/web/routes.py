@@ -4,12 +4,15 @@ from werkzeug.security import check_password_hash, generate_password_hash
 import requests
 import json
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 
 from app.web import web_bp
 from app.extensions import db
 from app.models import User, Fund, Note, Purchase, FundValue
-from app.services.fund_value_service import get_fund_values_by_date_range, fetch_fund_value, calculate_fund_performance
+from app.services.fund_value_service import get_fund_values_by_date_range, fetch_fund_value, get_fund_performance
 from app.services.fund_service import fetch_fund_details
+from app.services.note_service import invalidate_note_caches
+from app.services.portfolio_service import get_user_portfolio
 
 # 辅助函数
 def get_fund(fund_id):
@@ -38,8 +41,8 @@ def funds():
     page = request.args.get('page', 1, type=int)
     per_page = 12
     
-    # 构建查询
-    query = Fund.query
+    # 构建查询，同时加载业绩汇总
+    query = Fund.query.options(joinedload(Fund.performance))
     
     # 如果有关键字，则搜索基金代码或名称
     if keyword:
@@ -89,19 +92,13 @@ def fund_detail(code):
     notes_pagination = notes_query.paginate(page=page, per_page=per_page)
     notes = notes_pagination.items
     
-    # 获取基金净值数据（最多100条最近记录）
-    fund_values = FundValue.query.filter_by(fund_id=fund.id)\
-        .order_by(FundValue.date.asc())\
-        .limit(100).all()
+    # 图表数据由/api/funds/<code>/chart按需加载，这里只检查是否已有净值数据
+    has_values = db.session.query(FundValue.id).filter_by(fund_id=fund.id).first() is not None
     
     # 如果没有净值数据且用户已登录，尝试获取
-    if not fund_values and current_user.is_authenticated:
+    if not has_values and current_user.is_authenticated:
         try:
             fetch_fund_value(fund_code=code)
-            # 重新查询
-            fund_values = FundValue.query.filter_by(fund_id=fund.id)\
-                .order_by(FundValue.date.asc())\
-                .limit(100).all()
         except Exception as e:
             flash(f'获取基金净值数据失败: {str(e)}', 'danger')
     
@@ -117,7 +114,6 @@ def fund_detail(code):
                           fund=fund, 
                           notes=notes, 
                           pagination=notes_pagination,
-                          fund_values=fund_values,
                           user_purchases=user_purchases)
 
 # Note pages
@@ -343,6 +339,7 @@ def create_note():
         
         db.session.add(note)
         db.session.commit()
+        invalidate_note_caches(fund)
         
         flash('笔记创建成功！', 'success')
         return redirect(url_for('web.note_detail', note_id=note.id))
@@ -384,6 +381,7 @@ def edit_note(note_id):
         note.is_public = is_public
         
         db.session.commit()
+        invalidate_note_caches(note.fund)
         
         flash('笔记更新成功！', 'success')
         return redirect(url_for('web.note_detail', note_id=note.id))
@@ -402,8 +400,10 @@ def delete_note(note_id):
     if note.user_id != current_user.id:
         abort(403)
     
+    fund = note.fund
     db.session.delete(note)
     db.session.commit()
+    invalidate_note_caches(fund)
     
     flash('笔记已删除', 'success')
     return redirect(url_for('web.my_notes'))
@@ -434,9 +434,13 @@ def my_purchases():
     pagination = query.paginate(page=page, per_page=per_page)
     purchases = pagination.items
     
+    # 汇总覆盖全部购买记录，而不仅是当前页
+    portfolio = get_user_portfolio(current_user.id, fund_id)
+    
     return render_template('my_purchases.html', 
                           purchases=purchases, 
                           pagination=pagination, 
+                          portfolio=portfolio,
                           fund_id=fund_id,
                           fund=fund,
                           get_fund=get_fund)
@@ -613,13 +617,9 @@ def fund_values(code):
         except Exception as e:
             flash(f'获取基金净值数据失败: {str(e)}', 'danger')
     
-    # 获取所有净值数据用于绘制图表
-    all_values = FundValue.query.filter_by(fund_id=fund.id)\
-        .order_by(FundValue.date.asc())\
-        .all()
-    
-    # 计算各时间段收益率
-    performance = calculate_fund_performance(fund.id) if values else {
+    # 从业绩汇总表读取各时间段收益率
+    summary = get_fund_performance(fund.id) if values else None
+    performance = summary.performance if summary else {
         'week': None,
         'month': None,
         'three_month': None,
@@ -634,7 +634,6 @@ def fund_values(code):
                           fund=fund, 
                           values=values, 
                           pagination=pagination,
-                          all_values=all_values,
                           performance=performance)
 
 @web_bp.route('/fund/<code>/refresh-values', methods=['POST'])
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+基金数据抓取基准测试工具
+
+启动本地模拟的天天基金网服务器（tests/fake_eastmoney.py），把所有上游请求重定向过去，
+依次运行基金列表同步、净值抓取和基金详情抓取，报告每个场景的 rows/s、requests/s
+以及请求延迟的 p50/p99，用于在部署前验证抓取性能的改进，不访问外网。
+
+用法:
+    python benchmark_ingest.py                          # 默认50只基金、约2000天历史
+    python benchmark_ingest.py -n 500 --history-days 5000   # 扩大规模
+    python benchmark_ingest.py --latency-ms 50 --jitter-ms 30 --error-rate 0.01  # 模拟网络延迟和错误
+    python benchmark_ingest.py -w 32 -b 1000            # 调整并发数和批量大小
+    python benchmark_ingest.py --scenarios values       # 只运行净值抓取场景
+    python benchmark_ingest.py --rate-limit             # 保留上游限流配置（默认关闭以测量抓取本身）
+
+默认使用测试配置（内存SQLite），设置 FLASK_ENV=production 及 DB_* 环境变量可对MySQL测试写入性能。
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+SCENARIOS = ('sync', 'values', 'details')
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='基金数据抓取基准测试工具')
+    parser.add_argument('-n', '--funds', type=int, default=50, help='模拟的基金数量 (默认: 50)')
+    parser.add_argument('--history-days', type=int, default=2000, help='每只基金净值历史的天数 (默认: 2000)')
+    parser.add_argument('--max-page-size', type=int, default=20, help='模拟净值接口接受的最大页面大小 (默认: 20)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='每个请求的基础延迟毫秒数 (默认: 0)')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='叠加的随机延迟上限毫秒数 (默认: 0)')
+    parser.add_argument('--error-rate', type=float, default=0, help='模拟服务器返回503的比例 (默认: 0)')
+    parser.add_argument('--detail-funds', type=int, default=20, help='基金详情场景抓取的基金数 (默认: 20)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'要运行的场景，逗号分隔 (默认: {",".join(SCENARIOS)})')
+    parser.add_argument('-w', '--workers', type=int, help='同时抓取的基金数，不提供则使用FUND_FETCH_MAX_WORKERS配置')
+    parser.add_argument('-b', '--batch-size', type=int, help='每批写入的净值记录数，不提供则使用FUND_VALUE_BATCH_SIZE配置')
+    parser.add_argument('--rate-limit', action='store_true', help='保留上游限流配置')
+    parser.add_argument('-v', '--verbose', action='store_true', help='显示应用日志')
+    return parser.parse_args()
+
+class LatencyRecorder:
+    """记录共享HTTP客户端每个响应的耗时"""
+
+    def __init__(self):
+        self._latencies = []
+        self._lock = threading.Lock()
+
+    def __call__(self, response, *args, **kwargs):
+        with self._lock:
+            self._latencies.append(response.elapsed.total_seconds())
+
+    def drain(self):
+        with self._lock:
+            latencies, self._latencies = self._latencies, []
+        return latencies
+
+def percentile(values, pct):
+    """返回已排序列表的百分位数"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+def report(name, elapsed, latencies, rows=None, unit='rows', status=None):
+    """输出单个场景的统计结果"""
+    latencies = sorted(latencies)
+    requests = len(latencies)
+    line = f"{name:<10} {elapsed:8.2f}s  {requests:7d} req  {requests / elapsed if elapsed else 0:9.1f} req/s"
+    if rows is not None:
+        line += f"  {rows:8d} {unit}  {rows / elapsed if elapsed else 0:9.1f} {unit}/s"
+    line += f"  p50 {percentile(latencies, 50) * 1000:7.1f}ms  p99 {percentile(latencies, 99) * 1000:7.1f}ms"
+    if status is not None:
+        line += f"  status {status}"
+    print(line)
+
+def main():
+    args = parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"未知场景: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 1
+
+    from tests.fake_eastmoney import FakeEastMoneyServer
+    server = FakeEastMoneyServer(
+        fund_count=args.funds,
+        history_days=args.history_days,
+        max_page_size=args.max_page_size,
+        latency=args.latency_ms / 1000,
+        latency_jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate
+    ).start()
+
+    from flask_jwt_extended import create_access_token
+    from redis.exceptions import RedisError
+    from app import create_app, extensions
+    from app.extensions import db, http_client, rate_limiter, circuit_breaker
+    from app.models import Fund
+    from app.services.fund_service import fetch_fund_details
+    from app.services.fund_value_service import fetch_fund_value
+
+    # 未指定环境时使用测试配置（内存SQLite）
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    app = create_app()
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    # 把所有上游主机重定向到模拟服务器
+    app.config['UPSTREAM_HOST_OVERRIDES'] = server.host_overrides
+    if not args.rate_limit:
+        app.config['UPSTREAM_RATE_LIMIT'] = 0
+        app.config['UPSTREAM_RATE_LIMITS'] = ''
+
+    # Redis不可用时限流和熔断直接使用进程内状态，避免每个请求都尝试连接Redis
+    redis_client = extensions.redis_client
+    try:
+        redis_client.ping()
+    except RedisError:
+        print("Redis不可用，限流和熔断使用进程内状态", file=sys.stderr)
+        redis_client = None
+    rate_limiter.init_app(app, redis_client)
+    circuit_breaker.init_app(app, redis_client)
+    http_client.init_app(app)
+
+    recorder = LatencyRecorder()
+    http_client.session.hooks['response'].append(recorder)
+
+    print(f"模拟服务器 {server.url}: {args.funds} 只基金, {args.history_days} 天历史, "
+          f"单页最多 {args.max_page_size} 条, 延迟 {args.latency_ms}+{args.jitter_ms}ms, 错误率 {args.error_rate}")
+
+    try:
+        with app.app_context():
+            db.create_all()
+
+            if 'sync' in scenarios:
+                token = create_access_token(identity='1')
+                started_at = time.time()
+                response = app.test_client().post(
+                    '/api/funds/sync_all_from_external',
+                    headers={'Authorization': f'Bearer {token}'}
+                )
+                report('sync', time.time() - started_at, recorder.drain(),
+                       rows=Fund.query.count(), unit='funds', status=response.status_code)
+
+            # 未运行列表同步时直接写入基金记录
+            if Fund.query.count() == 0:
+                db.session.add_all(Fund(code=code, name=server.fund_name(code)) for code in server.fund_codes)
+                db.session.commit()
+
+            if 'values' in scenarios:
+                started_at = time.time()
+                rows = fetch_fund_value(max_workers=args.workers, batch_size=args.batch_size)
+                report('values', time.time() - started_at, recorder.drain(), rows=rows)
+
+            if 'details' in scenarios:
+                codes = server.fund_codes[:args.detail_funds]
+                started_at = time.time()
+                updated = sum(1 for code in codes if fetch_fund_details(code) is not None)
+                report('details', time.time() - started_at, recorder.drain(), rows=updated, unit='funds')
+    finally:
+        server.stop()
+
+    print(f"模拟服务器共处理 {server.request_count} 个请求，注入错误 {server.error_count} 个")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
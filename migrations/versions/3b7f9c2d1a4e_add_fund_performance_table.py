@@ -0,0 +1,42 @@
+"""Add fund_performance summary table
+
+Revision ID: 3b7f9c2d1a4e
+Revises: 654ed1962940
+Create Date: 2026-10-17 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7f9c2d1a4e'
+down_revision = '654ed1962940'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('fund_performance',
+        sa.Column('fund_id', sa.Integer(), nullable=False),
+        sa.Column('latest_value_id', sa.Integer(), nullable=True),
+        sa.Column('latest_date', sa.Date(), nullable=False),
+        sa.Column('net_value', sa.Float(), nullable=True),
+        sa.Column('accumulated_value', sa.Float(), nullable=True),
+        sa.Column('daily_change', sa.Float(), nullable=True),
+        sa.Column('week_change', sa.Float(), nullable=True),
+        sa.Column('month_change', sa.Float(), nullable=True),
+        sa.Column('three_month_change', sa.Float(), nullable=True),
+        sa.Column('six_month_change', sa.Float(), nullable=True),
+        sa.Column('year_change', sa.Float(), nullable=True),
+        sa.Column('three_year_change', sa.Float(), nullable=True),
+        sa.Column('five_year_change', sa.Float(), nullable=True),
+        sa.Column('since_inception_change', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['fund_id'], ['funds.id'], ),
+        sa.PrimaryKeyConstraint('fund_id')
+    )
+
+
+def downgrade():
+    op.drop_table('fund_performance')
@@ -0,0 +1,41 @@
+"""Add fund_risk table
+
+Revision ID: 8d2e4a6c9f1b
+Revises: 3b7f9c2d1a4e
+Create Date: 2026-10-17 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4a6c9f1b'
+down_revision = '3b7f9c2d1a4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('fund_risk',
+        sa.Column('fund_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=True),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('annualized_return', sa.Float(), nullable=True),
+        sa.Column('volatility', sa.Float(), nullable=True),
+        sa.Column('max_drawdown', sa.Float(), nullable=True),
+        sa.Column('max_drawdown_peak_date', sa.Date(), nullable=True),
+        sa.Column('max_drawdown_trough_date', sa.Date(), nullable=True),
+        sa.Column('max_drawdown_recovery_date', sa.Date(), nullable=True),
+        sa.Column('sharpe_ratio', sa.Float(), nullable=True),
+        sa.Column('sortino_ratio', sa.Float(), nullable=True),
+        sa.Column('calmar_ratio', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['fund_id'], ['funds.id'], ),
+        sa.PrimaryKeyConstraint('fund_id', 'period')
+    )
+
+
+def downgrade():
+    op.drop_table('fund_risk')
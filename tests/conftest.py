@@ -1,6 +1,11 @@
 import pytest
 from app import create_app
-from app.extensions import db as _db
+from app import extensions
+from app.extensions import db as _db, http_client, rate_limiter, circuit_breaker
+from app.services import fund_value_service
+from app.services.nav_store import nav_store
+from app.services.screener import fund_screener
+from tests.fake_eastmoney import FakeEastMoneyServer
 
 @pytest.fixture
 def app():
@@ -20,6 +25,10 @@ def app():
     with app.app_context():
         _db.session.remove()
         _db.drop_all()
+    
+    # 进程内缓存按基金ID保存，不能带到下一个测试的数据库
+    nav_store.clear()
+    fund_screener.invalidate()
 
 @pytest.fixture
 def client(app):
@@ -30,4 +39,41 @@ def client(app):
 def db(app):
     """提供数据库会话"""
     with app.app_context():
-        yield _db 
\ No newline at end of file
+        yield _db 
+
+@pytest.fixture
+def fake_upstream(app):
+    """启动本地模拟的天天基金网服务器，并把共享HTTP客户端的上游请求重定向过去"""
+    server = FakeEastMoneyServer(fund_count=3, history_days=120, max_page_size=20).start()
+    app.config.update({
+        'UPSTREAM_HOST_OVERRIDES': server.host_overrides,
+        'UPSTREAM_RATE_LIMIT': 0,
+        'UPSTREAM_RATE_LIMITS': '',
+    })
+    rate_limiter.init_app(app, None)
+    circuit_breaker.init_app(app, None)
+    http_client.init_app(app)
+    fund_value_service._page_size_cache.clear()
+
+    yield server
+
+    server.stop()
+    app.config['UPSTREAM_HOST_OVERRIDES'] = ''
+    http_client.init_app(app)
+    fund_value_service._page_size_cache.clear()
+
+@pytest.fixture
+def fake_redis(app):
+    """把共享Redis客户端替换为fakeredis，用于缓存相关的测试；未安装fakeredis时跳过"""
+    fakeredis = pytest.importorskip('fakeredis')
+    # Redis锁的释放使用Lua脚本，fakeredis需要lupa才能执行
+    pytest.importorskip('lupa')
+    client = fakeredis.FakeRedis()
+    original = extensions.redis_client
+    extensions.redis_client = client
+    extensions.local_cache.init_app(app, client)
+
+    yield client
+
+    extensions.redis_client = original
+    extensions.local_cache.init_app(app, original)
@@ -0,0 +1,272 @@
+"""天天基金网本地模拟服务器
+
+用生成的数据模拟净值抓取用到的上游接口，供离线集成测试和基准测试使用：
+
+- api.fund.eastmoney.com/f10/lsjz               历史净值分页JSON
+- fundgz.1234567.com.cn/js/{code}.js            实时估值JSONP
+- fund.eastmoney.com/pingzhongdata/{code}.js    基金详情JS
+- fund.eastmoney.com/js/fundcode_search.js      全部基金列表
+- fundmobapi.eastmoney.com/FundMNewApi/FundMNFInfo  移动端基金信息
+
+所有主机由同一个端口按路径分发，通过UPSTREAM_HOST_OVERRIDES把真实主机重定向过来。
+数据按基金代码确定性生成，可配置延迟、延迟抖动和错误率。
+"""
+import json
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from app.utils.trading_calendar import TradingCalendar
+
+# 被模拟的上游主机
+UPSTREAM_HOSTS = (
+    'api.fund.eastmoney.com',
+    'fund.eastmoney.com',
+    'fundgz.1234567.com.cn',
+    'fundmobapi.eastmoney.com',
+)
+
+FUND_TYPES = ('混合型', '股票型', '债券型', '指数型', '货币型')
+
+
+class FakeEastMoneyServer:
+    """在后台线程中运行的模拟上游服务器
+
+    Args:
+        fund_count: 基金数量，代码为000001起的连续编号
+        history_days: 每只基金净值历史覆盖的自然日天数
+        max_page_size: lsjz接口接受的最大页面大小，超过时截断（与真实接口一致）
+        latency: 每个请求的基础延迟（秒）
+        latency_jitter: 在基础延迟上叠加的随机延迟上限（秒）
+        error_rate: 返回503的请求比例
+        end_date: 净值历史的最后一天，默认今天
+        seed: 随机种子
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, fund_count=50, history_days=2000, max_page_size=20,
+                 latency=0.0, latency_jitter=0.0, error_rate=0.0, end_date=None, seed=0):
+        self.fund_count = fund_count
+        self.history_days = history_days
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.end_date = end_date or date.today()
+        self.seed = seed
+        self.calendar = TradingCalendar()
+        self.request_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def host_overrides(self):
+        """可直接用作UPSTREAM_HOST_OVERRIDES的配置字符串"""
+        return ','.join(f'{host}={self.url}' for host in UPSTREAM_HOSTS)
+
+    @property
+    def fund_codes(self):
+        return [f'{index:06d}' for index in range(1, self.fund_count + 1)]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-eastmoney', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def fund_name(self, code):
+        return f'模拟基金{code}'
+
+    def fund_type(self, code):
+        return FUND_TYPES[int(code) % len(FUND_TYPES)]
+
+    def is_known(self, code):
+        return code.isdigit() and 1 <= int(code) <= self.fund_count
+
+    @lru_cache(maxsize=4096)
+    def history(self, code):
+        """返回基金的净值历史（按日期倒序），每项为(日期, 单位净值, 累计净值, 日增长率)"""
+        rng = random.Random(f'{self.seed}:{code}')
+        start = self.end_date - timedelta(days=self.history_days - 1)
+        net_value = 1.0
+        rows = []
+        for day in self.calendar.trading_days(start, self.end_date):
+            change = rng.gauss(0.0003, 0.012)
+            net_value = max(0.1, net_value * (1 + change))
+            rows.append((day, round(net_value, 4), round(net_value + 0.1, 4), round(change * 100, 2)))
+        rows.reverse()
+        return rows
+
+    def _next_fault(self):
+        """记录请求，并决定本次请求的延迟和是否返回错误"""
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency + self._random.uniform(0, self.latency_jitter) if self.latency_jitter else self.latency
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.error_count += 1
+        return delay, fail
+
+    def lsjz(self, query):
+        code = query.get('fundCode', '')
+        page_index = max(1, int(query.get('pageIndex') or 1))
+        page_size = min(max(1, int(query.get('pageSize') or 20)), self.max_page_size)
+
+        rows = self.history(code) if self.is_known(code) else []
+        start_date = query.get('startDate')
+        end_date = query.get('endDate')
+        if start_date:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            rows = [row for row in rows if row[0] >= start]
+        if end_date:
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+            rows = [row for row in rows if row[0] <= end]
+
+        offset = (page_index - 1) * page_size
+        return {
+            'Data': {
+                'LSJZList': [
+                    {
+                        'FSRQ': day.isoformat(),
+                        'DWJZ': f'{net_value:.4f}',
+                        'LJJZ': f'{accumulated_value:.4f}',
+                        'SDATE': None,
+                        'ACTUALSYI': '',
+                        'NAVTYPE': '1',
+                        'JZZZL': f'{change:.2f}',
+                        'SGZT': '开放申购',
+                        'SHZT': '开放赎回',
+                        'FHFCZ': '',
+                        'FHFCBZ': '',
+                        'DTYPE': None,
+                        'FHSP': ''
+                    }
+                    for day, net_value, accumulated_value, change in rows[offset:offset + page_size]
+                ],
+                'FundType': '001',
+                'SYType': None,
+                'isNewType': False,
+                'Feature': '010,050,054'
+            },
+            'ErrCode': 0,
+            'ErrMsg': None,
+            'TotalCount': len(rows),
+            'Expansion': None,
+            'PageSize': page_size,
+            'PageIndex': page_index
+        }
+
+    def fundgz(self, code):
+        if not self.is_known(code):
+            return 'jsonpgz();'
+        day, net_value, _, _ = self.history(code)[0]
+        estimate = round(net_value * (1 + self._random.gauss(0, 0.01)), 4)
+        data = {
+            'fundcode': code,
+            'name': self.fund_name(code),
+            'jzrq': day.isoformat(),
+            'dwjz': f'{net_value:.4f}',
+            'gsz': f'{estimate:.4f}',
+            'gszzl': f'{(estimate / net_value - 1) * 100:.2f}',
+            'gztime': f'{self.end_date.isoformat()} 15:00'
+        }
+        return f'jsonpgz({json.dumps(data, ensure_ascii=False)});'
+
+    def pingzhongdata(self, code):
+        rows = self.history(code)
+        trend = [
+            {
+                'x': int(datetime(day.year, day.month, day.day).timestamp() * 1000),
+                'y': net_value,
+                'equityReturn': change,
+                'unitMoney': ''
+            }
+            for day, net_value, _, change in reversed(rows)
+        ]
+        return (
+            f'var ishb=false;var fS_name = "{self.fund_name(code)}";var fS_code = "{code}";'
+            f'var fund_sourceRate="1.50";var fund_Rate="0.15";var fund_minsg="10";'
+            f'var fS_classification = "{self.fund_type(code)}";var fS_corpManager = "模拟基金管理有限公司";'
+            f'var Data_netWorthTrend = {json.dumps(trend)};'
+        )
+
+    def fundcode_search(self):
+        funds = [
+            [code, f'MNJJ{code}', self.fund_name(code), self.fund_type(code), f'MONIJIJIN{code}']
+            for code in self.fund_codes
+        ]
+        return f'var r = {json.dumps(funds, ensure_ascii=False)};'
+
+    def mobile_info(self, code):
+        if not self.is_known(code):
+            return {'Datas': None, 'ErrCode': 0, 'ErrMsg': None}
+        return {'Datas': {'FCODE': code, 'SHORTNAME': self.fund_name(code), 'FTYPE': self.fund_type(code)},
+                'ErrCode': 0, 'ErrMsg': None}
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            delay, fail = server._next_fault()
+            if delay > 0:
+                time.sleep(delay)
+            if fail:
+                return self._send(503, 'Service Unavailable', 'text/plain')
+
+            parsed = urlparse(self.path)
+            query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+            path = parsed.path
+
+            if path == '/f10/lsjz':
+                return self._send(200, json.dumps(server.lsjz(query), ensure_ascii=False), 'application/json')
+            if path == '/js/fundcode_search.js':
+                return self._send(200, server.fundcode_search(), 'application/javascript')
+            if path.startswith('/js/') and path.endswith('.js'):
+                return self._send(200, server.fundgz(path[len('/js/'):-len('.js')]), 'application/javascript')
+            if path.startswith('/pingzhongdata/') and path.endswith('.js'):
+                code = path[len('/pingzhongdata/'):-len('.js')]
+                if not server.is_known(code):
+                    return self._send(404, 'Not Found', 'text/plain')
+                return self._send(200, server.pingzhongdata(code), 'application/javascript')
+            if path == '/FundMNewApi/FundMNFInfo':
+                return self._send(200, json.dumps(server.mobile_info(query.get('FCODE', '')), ensure_ascii=False),
+                                  'application/json')
+            return self._send(404, 'Not Found', 'text/plain')
+
+        def _send(self, status, body, content_type):
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,39 @@
+import time
+import pytest
+from app.utils.http_client import HttpClient
+from app.utils.rate_limiter import CircuitBreaker, CircuitOpenError, RateLimitExceeded, TokenBucketRateLimiter
+
+HOST = 'api.fund.eastmoney.com'
+
+def _open_local_breaker(app, reset_timeout):
+    """创建不使用Redis、已连续失败达到阈值并过了冷却时间的熔断器"""
+    app.config.update({'CIRCUIT_BREAKER_FAILURES': 2, 'CIRCUIT_BREAKER_RESET_TIMEOUT': reset_timeout})
+    breaker = CircuitBreaker()
+    breaker.init_app(app, None)
+    breaker.record_failure(HOST)
+    breaker.record_failure(HOST)
+    time.sleep(reset_timeout + 0.05)
+    return breaker
+
+def test_rate_limited_request_does_not_take_half_open_probe(app):
+    breaker = _open_local_breaker(app, reset_timeout=0.1)
+    app.config.update({'UPSTREAM_RATE_LIMIT': 0.001, 'UPSTREAM_RATE_BURST': 1, 'UPSTREAM_RATE_MAX_WAIT': 0, 'UPSTREAM_RATE_LIMITS': ''})
+    limiter = TokenBucketRateLimiter()
+    limiter.init_app(app, None)
+    limiter.acquire(HOST)
+    client = HttpClient(rate_limiter=limiter, circuit_breaker=breaker)
+
+    # 限流超时发生在熔断检查之前，半开状态的探测名额仍然保留
+    with pytest.raises(RateLimitExceeded):
+        client.get(f'http://{HOST}/f10/lsjz')
+    breaker.before_request(HOST)
+
+def test_unrecorded_local_probe_expires(app):
+    breaker = _open_local_breaker(app, reset_timeout=1)
+
+    # 探测请求没有记录结果时，其他请求在探测期限内被拒绝，期限过后可以重新探测
+    breaker.before_request(HOST)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(HOST)
+    time.sleep(1.05)
+    breaker.before_request(HOST)
@@ -0,0 +1,51 @@
+from datetime import date
+import numpy as np
+from app.models import Fund
+from app.services import chart_service
+from app.services.chart_service import lttb
+from app.services.fund_value_service import fetch_fund_value, save_fund_value
+
+def test_lttb_keeps_endpoints_and_target_count():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    selected = lttb(x, y, 100)
+    assert len(selected) == 100
+    assert selected[0] == 0 and selected[-1] == 999
+    assert (np.diff(selected) > 0).all()
+    assert list(lttb(x[:10], y[:10], 100)) == list(range(10))
+
+def test_chart_endpoint_downsamples(client, db, fake_upstream):
+    for code in fake_upstream.fund_codes:
+        db.session.add(Fund(code=code, name=fake_upstream.fund_name(code)))
+    db.session.commit()
+    fetch_fund_value()
+    history = fake_upstream.history('000001')
+
+    result = client.get('/api/funds/000001/chart?period=all&points=20').get_json()
+    assert result['total'] == len(history)
+    assert result['points'] == 20 and len(result['dates']) == 20
+    assert result['dates'][0] == history[-1][0].isoformat()
+    assert result['dates'][-1] == history[0][0].isoformat()
+
+    result = client.get('/api/funds/000001/chart?period=1w').get_json()
+    assert result['total'] == result['points'] <= 6
+
+    assert client.get('/api/funds/000001/chart?period=2w').status_code == 400
+    assert client.get('/fund/000001/values').status_code == 200
+
+def test_chart_cache_is_bounded_by_points(app, db, monkeypatch):
+    db.session.add(Fund(id=1, code='000001', name='基金1'))
+    db.session.commit()
+    for day in range(1, 29):
+        save_fund_value(1, date(2024, 2, day), 1 + day / 100, 1 + day / 100)
+    monkeypatch.setattr(chart_service, '_CACHE_MAX_POINTS', 30)
+    chart_service._cache.clear()
+    monkeypatch.setattr(chart_service, '_cache_points', 0)
+
+    for points in (10, 11, 12, 13):
+        chart_service.chart_data(1, points=points)
+    assert chart_service._cache_points <= 30
+    assert len(chart_service._cache) == 2
+    # 缓存只保存序列的版本号，不持有序列本身
+    assert all(isinstance(version, int) for version, _ in chart_service._cache.values())
+    assert chart_service.chart_data(1, points=13) is chart_service.chart_data(1, points=13)
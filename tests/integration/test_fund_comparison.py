@@ -0,0 +1,32 @@
+import numpy as np
+from app.models import Fund
+from app.services.comparison_service import correlation_matrix
+from app.services.fund_value_service import fetch_fund_value
+
+def test_compare_rolling_returns_and_correlation(client, db, fake_upstream):
+    for code in fake_upstream.fund_codes:
+        db.session.add(Fund(code=code, name=fake_upstream.fund_name(code)))
+    db.session.commit()
+    fetch_fund_value()
+
+    response = client.get('/api/funds/compare?codes=000001,000002&windows=5,20&correlation_window=60')
+    assert response.status_code == 200
+    result = response.get_json()
+
+    values = [row[2] for row in reversed(fake_upstream.history('000001'))]
+    assert result['dates'][-1] == fake_upstream.history('000001')[0][0].isoformat()
+    assert result['rolling_returns']['5']['000001'][-1] == round((values[-1] / values[-6] - 1) * 100, 2)
+    assert result['correlation']['codes'] == ['000001', '000002']
+    assert result['correlation']['matrix'][0][0] == 1.0
+
+    # 窗口过大或过多时返回400，而不是在计算中溢出
+    for query in ('windows=10000000', 'correlation_window=10000000', 'windows=' + ','.join(map(str, range(1, 20)))):
+        assert client.get(f'/api/funds/compare?codes=000001,000002&{query}').status_code == 400
+
+def test_correlation_matrix_matches_numpy():
+    values = np.random.default_rng(0).normal(size=(200, 3)).cumsum(axis=0) + 100
+    correlation, observations = correlation_matrix(values, np.ones(values.shape, dtype=bool))
+
+    returns = values[1:] / values[:-1] - 1
+    assert np.allclose(correlation, np.corrcoef(returns.T))
+    assert (observations == 199).all()
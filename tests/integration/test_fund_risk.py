@@ -0,0 +1,36 @@
+from app.models import Fund, FundRisk
+from app.services.fund_value_service import fetch_fund_value
+from app.services.risk_service import refresh_risk_metrics
+
+def test_refresh_and_read_risk_metrics(app, client, db, fake_upstream):
+    for code in fake_upstream.fund_codes:
+        db.session.add(Fund(code=code, name=fake_upstream.fund_name(code)))
+    db.session.commit()
+    fetch_fund_value()
+
+    app.config['RISK_WINDOWS'] = '1m,all'
+    assert refresh_risk_metrics() == len(fake_upstream.fund_codes)
+    assert FundRisk.query.count() == len(fake_upstream.fund_codes) * 2
+
+    # 手工计算成立以来的最大回撤
+    values = [row[2] for row in reversed(fake_upstream.history('000001'))]
+    peak, max_drawdown = values[0], 0
+    for value in values:
+        peak = max(peak, value)
+        max_drawdown = min(max_drawdown, value / peak - 1)
+
+    response = client.get('/api/funds/000001/risk')
+    assert response.status_code == 200
+    risk = response.get_json()['risk']
+    assert list(risk) == ['1m', 'all']
+    assert risk['all']['max_drawdown'] == round(max_drawdown * 100, 2)
+    assert risk['all']['volatility'] > 0
+
+    # 未保存的窗口即时计算
+    response = client.get('/api/funds/000001/risk?windows=2m')
+    assert response.get_json()['risk']['2m']['updated_at'] is None
+
+    assert client.get('/api/funds/000001/risk?windows=abc').status_code == 400
+    # 回溯过长或窗口过多时返回400，而不是在日期计算中溢出
+    assert client.get('/api/funds/000001/risk?windows=9999y').status_code == 400
+    assert client.get('/api/funds/000001/risk?windows=' + ','.join(f'{n}m' for n in range(1, 20))).status_code == 400
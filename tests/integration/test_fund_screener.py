@@ -0,0 +1,30 @@
+from datetime import date
+from app.models import Fund, FundPerformance, FundRisk
+
+def test_screener_filters_sorts_and_paginates(client, db):
+    for index, (fund_type, year_change, max_drawdown) in enumerate([
+        ('债券型', 3.5, -1.2),
+        ('债券型', 6.1, -8.0),
+        ('股票型', 20.0, -3.0),
+        ('债券型', 4.8, -2.5),
+        ('债券型', 4.8, -4.9),
+        ('债券型', None, -1.0),
+    ], start=1):
+        db.session.add(Fund(id=index, code=f'{index:06d}', name=f'基金{index}', type=fund_type))
+        db.session.add(FundPerformance(fund_id=index, latest_date=date(2024, 1, 2), year_change=year_change))
+        db.session.add(FundRisk(fund_id=index, period='1y', max_drawdown=max_drawdown))
+    db.session.commit()
+
+    # 近一年收益最高、最大回撤不超过5%的债券基金，每页2只
+    response = client.get('/api/funds/screener?type=债券型&min_max_drawdown=-5&limit=2')
+    assert response.status_code == 200
+    first_page = response.get_json()
+    assert first_page['total'] == 3
+    assert [item['code'] for item in first_page['items']] == ['000004', '000005']
+
+    response = client.get(f"/api/funds/screener?type=债券型&min_max_drawdown=-5&limit=2&cursor={first_page['next_cursor']}")
+    second_page = response.get_json()
+    assert [item['code'] for item in second_page['items']] == ['000001']
+    assert second_page['next_cursor'] is None
+
+    assert client.get('/api/funds/screener?sort=unknown').status_code == 400
@@ -47,16 +47,16 @@ def test_sync_all_from_external(client, mocker):
     mocker.patch('app.api.funds.jwt_required', return_value=lambda f: f)
     mocker.patch('app.api.funds.get_jwt_identity', return_value=1)  # 返回一个用户 ID
     
-    # 模拟requests.get返回的响应
+    # 模拟HTTP客户端返回的响应
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.text = mock_fund_list_response
     
-    # 使用mocker替换requests.get方法
-    mocker.patch('requests.get', return_value=mock_response)
+    # 使用mocker替换共享HTTP客户端的get方法
+    mocker.patch('app.extensions.http_client.get', return_value=mock_response)
     
     # 模拟Redis缓存操作
-    mocker.patch('app.api.funds.redis_client.delete')
+    mocker.patch('app.api.funds.invalidate_fund_caches')
     
     # 发送请求
     response = client.post(
@@ -80,8 +80,8 @@ def test_sync_all_from_external(client, mocker):
     assert fund.name == '华夏成长混合'
     assert fund.type == '混合型'
     
-    # 验证Redis缓存被清除
-    app.api.funds.redis_client.delete.assert_called_once()
+    # 验证基金列表、搜索和详情缓存被清除
+    app.api.funds.invalidate_fund_caches.assert_called_once_with()
 
 def test_sync_all_from_external_unauthorized(client):
     """测试未授权访问同步接口"""
@@ -90,8 +90,8 @@ def test_sync_all_from_external_unauthorized(client):
 
 def test_sync_all_from_external_api_error(client, mocker):
     """测试天天基金网API请求失败的情况"""
-    # 模拟requests.get抛出异常
-    mocker.patch('requests.get', side_effect=Exception('API连接失败'))
+    # 模拟HTTP客户端抛出异常
+    mocker.patch('app.extensions.http_client.get', side_effect=Exception('API连接失败'))
     
     # 发送请求
     response = client.post(
@@ -105,13 +105,13 @@ def test_sync_all_from_external_api_error(client, mocker):
 
 def test_sync_all_from_external_bad_response(client, mocker):
     """测试天天基金网返回错误格式数据的情况"""
-    # 模拟requests.get返回的响应
+    # 模拟HTTP客户端返回的响应
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.text = "错误的数据格式"
     
-    # 使用mocker替换requests.get方法
-    mocker.patch('requests.get', return_value=mock_response)
+    # 使用mocker替换共享HTTP客户端的get方法
+    mocker.patch('app.extensions.http_client.get', return_value=mock_response)
     
     # 发送请求
     response = client.post(
@@ -134,16 +134,16 @@ def test_sync_all_from_external_update_existing(client, mocker, db):
     db.session.add(existing_fund)
     db.session.commit()
     
-    # 模拟requests.get返回的响应
+    # 模拟HTTP客户端返回的响应
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.text = mock_fund_list_response
     
-    # 使用mocker替换requests.get方法
-    mocker.patch('requests.get', return_value=mock_response)
+    # 使用mocker替换共享HTTP客户端的get方法
+    mocker.patch('app.extensions.http_client.get', return_value=mock_response)
     
     # 模拟Redis缓存操作
-    mocker.patch('app.api.funds.redis_client.delete')
+    mocker.patch('app.api.funds.invalidate_fund_caches')
     
     # 发送请求
     response = client.post(
@@ -163,5 +163,5 @@ def test_sync_all_from_external_update_existing(client, mocker, db):
     assert updated_fund.name == '华夏成长混合'
     assert updated_fund.type == '混合型'
     
-    # 验证Redis缓存被清除
-    app.api.funds.redis_client.delete.assert_called_once() 
\ No newline at end of file
+    # 验证基金列表、搜索和详情缓存被清除
+    app.api.funds.invalidate_fund_caches.assert_called_once_with() 
\ No newline at end of file
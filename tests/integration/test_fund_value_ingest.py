@@ -0,0 +1,94 @@
+import json
+from app.models import Fund, FundValue, FundPerformance
+from app.services import fund_value_ingest, fund_value_service
+from app.services.backfill_service import run_backfill
+from app.services.fund_value_ingest import ingest_fund_values
+from app.services.fund_value_service import fetch_fund_value, calculate_fund_performance
+
+def test_fetch_fund_value_from_fake_upstream(app, db, fake_upstream):
+    for code in fake_upstream.fund_codes:
+        db.session.add(Fund(code=code, name=fake_upstream.fund_name(code)))
+    db.session.commit()
+
+    expected = sum(len(fake_upstream.history(code)) for code in fake_upstream.fund_codes)
+
+    count = fetch_fund_value()
+
+    assert count == expected
+    assert FundValue.query.count() == expected
+    # 模拟接口单页最多20条，探测后应缓存实际页面大小
+    assert fund_value_service._page_size_cache[fund_value_service.EASTMONEY_NAV_URL] == 20
+
+    latest = FundValue.query.filter_by(fund_id=1).order_by(FundValue.date.desc()).first()
+    day, net_value, accumulated_value, _ = fake_upstream.history('000001')[0]
+    assert latest.date == day
+    assert latest.net_value == net_value
+    assert latest.accumulated_value == accumulated_value
+
+def test_incremental_sync_skips_current_funds(app, db, fake_upstream):
+    for code in fake_upstream.fund_codes:
+        db.session.add(Fund(code=code, name=fake_upstream.fund_name(code)))
+    db.session.commit()
+
+    fetch_fund_value()
+    requests_after_first_sync = fake_upstream.request_count
+
+    # 所有基金都已是最新，第二次同步不应发起任何上游请求
+    assert fetch_fund_value() == 0
+    assert fake_upstream.request_count == requests_after_first_sync
+
+def test_ingest_maintains_performance_summary(app, db, fake_upstream):
+    for code in fake_upstream.fund_codes:
+        db.session.add(Fund(code=code, name=fake_upstream.fund_name(code)))
+    db.session.commit()
+
+    fetch_fund_value()
+
+    fund = Fund.query.filter_by(code='000001').first()
+    summary = db.session.get(FundPerformance, fund.id)
+    day, net_value, accumulated_value, _ = fake_upstream.history('000001')[0]
+    assert summary.latest_date == day
+    assert summary.net_value == net_value
+    assert summary.accumulated_value == accumulated_value
+    assert summary.performance == calculate_fund_performance(fund.id)
+    assert FundPerformance.query.count() == len(fake_upstream.fund_codes)
+
+def _failing_upsert(rows, batch_size=None):
+    """模拟bulk_upsert_fund_values的批次写入失败：只计入failed，不抛出异常"""
+    return {'inserted': 0, 'updated': 0, 'failed': len(rows)}
+
+def test_ingest_reports_failed_writes(app, db, fake_upstream, monkeypatch):
+    db.session.add(Fund(id=1, code='000001', name=fake_upstream.fund_name('000001')))
+    db.session.commit()
+    monkeypatch.setattr(fund_value_ingest, 'bulk_upsert_fund_values', _failing_upsert)
+
+    result = ingest_fund_values([{'fund_id': 1, 'code': '000001', 'start_date': None, 'end_date': None}])['000001']
+
+    assert result['fetched'] == len(fake_upstream.history('000001'))
+    assert result['failed'] == result['fetched']
+    assert result['saved'] == 0
+    assert result['error']
+
+def test_backfill_restart_only_clears_own_shard(app, db, fake_redis):
+    done = json.dumps({'status': 'done', 'oldest_date': '2020-01-01', 'rows': 10, 'failures': 0})
+    fake_redis.hset('backfill:full:meta', 'end_date', '2024-01-31')
+    fake_redis.hset('backfill:full:funds', mapping={1: done, 2: done, 3: done})
+
+    run_backfill('full', min_fund_id=1, max_fund_id=2, resume=False)
+
+    # 其他分片的检查点和任务的结束日期保留
+    assert fake_redis.hkeys('backfill:full:funds') == [b'3']
+    assert fake_redis.hget('backfill:full:meta', 'end_date') == b'2024-01-31'
+
+def test_backfill_keeps_checkpoint_when_write_fails(app, db, fake_upstream, fake_redis, monkeypatch):
+    db.session.add(Fund(id=1, code='000001', name=fake_upstream.fund_name('000001')))
+    db.session.commit()
+    monkeypatch.setattr(fund_value_ingest, 'bulk_upsert_fund_values', _failing_upsert)
+    end_date = fake_upstream.history('000001')[0][0].isoformat()
+
+    stats = run_backfill('broken', end_date=end_date, max_failures=2)
+
+    # 写入失败的窗口不算完成，检查点不前移，重试次数用完后放弃
+    checkpoint = json.loads(fake_redis.hget('backfill:broken:funds', 1))
+    assert checkpoint == {'status': 'failed', 'oldest_date': None, 'rows': 0, 'failures': 2}
+    assert stats['failed'] == 1 and stats['done'] == 0
@@ -0,0 +1,63 @@
+from datetime import date
+from flask_jwt_extended import create_access_token
+from app.models import Fund
+from app.services.fund_value_service import save_fund_value
+from app.services.nav_lookup import pricing_date, lookup_navs, lookup_purchase_navs
+
+def _add_values(db):
+    db.session.add(Fund(id=1, code='000001', name='基金1'))
+    db.session.commit()
+    # 2024-01-05为周五，2024-01-08为周一
+    for day, value in ((date(2024, 1, 4), 1.0), (date(2024, 1, 5), 1.1), (date(2024, 1, 8), 1.2)):
+        save_fund_value(1, day, value, value)
+
+def test_pricing_date_follows_cutoff_rule():
+    assert pricing_date(date(2024, 1, 5), before_cutoff=True) == date(2024, 1, 5)
+    assert pricing_date(date(2024, 1, 5), before_cutoff=False) == date(2024, 1, 8)
+    assert pricing_date(date(2024, 1, 6), before_cutoff=True) == date(2024, 1, 8)
+    # 未记录截止时间时与购买记录的默认值一致，按15:00前处理
+    assert pricing_date(date(2024, 1, 5), before_cutoff=None) == date(2024, 1, 5)
+
+def test_batched_as_of_and_purchase_lookup(app, db):
+    _add_values(db)
+
+    results = lookup_navs([(1, date(2024, 1, 7)), (1, date(2024, 1, 5)), (1, date(2024, 1, 1))])
+    assert [result['nav_date'] for result in results] == [date(2024, 1, 5), date(2024, 1, 5), None]
+    assert [result['is_exact_date'] for result in results] == [False, True, False]
+
+    results = lookup_purchase_navs([(1, date(2024, 1, 5), False), (1, date(2024, 1, 8), False)])
+    assert results[0]['pricing_date'] == date(2024, 1, 8)
+    assert results[0]['net_value'] == 1.2
+    # T+1日的净值尚未公布
+    assert results[1]['pending'] and results[1]['net_value'] is None
+
+def test_as_of_endpoint(app, client, db):
+    _add_values(db)
+    with app.app_context():
+        token = create_access_token(identity='1')
+
+    response = client.post('/api/fund-values/as-of', json={'queries': [
+        {'fund_code': '000001', 'date': '2024-01-06'},
+        {'fund_id': 1, 'date': '2024-01-04', 'before_cutoff': False},
+    ]}, headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    first, second = response.get_json()['results']
+    assert first['nav_date'] == '2024-01-05' and first['net_value'] == 1.1
+    assert second['pricing_date'] == '2024-01-05' and second['net_value'] == 1.1
+
+def test_as_of_endpoint_rejects_invalid_types(app, client, db):
+    _add_values(db)
+    with app.app_context():
+        token = create_access_token(identity='1')
+
+    for query in (
+        {'fund_id': [1], 'date': '2024-01-05'},
+        {'fund_id': True, 'date': '2024-01-05'},
+        {'fund_code': ['000001'], 'date': '2024-01-05'},
+        {'fund_id': 1, 'date': '2024-01-05', 'before_cutoff': 'false'},
+        {'fund_id': 1, 'date': 20240105},
+    ):
+        response = client.post('/api/fund-values/as-of', json={'queries': [query]},
+                               headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 400, query
@@ -0,0 +1,55 @@
+from datetime import date
+from app.models import Fund
+from app.services.fund_value_service import save_fund_value
+from app.services import nav_store as nav_store_module
+from app.services.nav_store import nav_store
+
+def test_nav_store_lookups_eviction_and_invalidation(app, db):
+    for fund_id in (1, 2):
+        db.session.add(Fund(id=fund_id, code=f'00000{fund_id}', name=f'基金{fund_id}'))
+    db.session.commit()
+    for day, value in ((date(2024, 1, 2), 1.0), (date(2024, 1, 3), 1.1), (date(2024, 1, 5), 1.2)):
+        save_fund_value(1, day, value, value + 0.1)
+        save_fund_value(2, day, value, value + 0.1)
+    nav_store.clear()
+
+    series = nav_store.get(1)
+    assert len(series) == 3
+    assert series.as_of(date(2024, 1, 4))['date'] == date(2024, 1, 3)
+    assert series.as_of(date(2024, 1, 1)) is None
+    assert series.latest()['accumulated_value'] == 1.3
+    assert list(series.slice(date(2024, 1, 3), date(2024, 1, 5)).net_values) == [1.1, 1.2]
+
+    # 内存上限只够一个序列时淘汰最久未使用的基金
+    app.config['NAV_STORE_MAX_BYTES'] = series.nbytes
+    nav_store.get(2)
+    assert len(nav_store) == 1 and nav_store.nbytes <= series.nbytes
+
+    # 写入新净值后下次读取到最新数据
+    save_fund_value(2, date(2024, 1, 8), 1.3, 1.4)
+    assert nav_store.get(2).latest()['date'] == date(2024, 1, 8)
+
+def test_nav_store_discards_only_loads_invalidated_meanwhile(app, db, monkeypatch):
+    db.session.add(Fund(id=1, code='000001', name='基金1'))
+    db.session.commit()
+    save_fund_value(1, date(2024, 1, 2), 1.0, 1.0)
+    nav_store.clear()
+    load = nav_store_module.load_nav_series
+
+    def load_while_writing(invalidated):
+        def loader(fund_id):
+            series = load(fund_id)
+            nav_store.invalidate(invalidated)
+            return series
+        return loader
+
+    # 加载期间其他基金写入净值，加载结果照常缓存
+    monkeypatch.setattr(nav_store_module, 'load_nav_series', load_while_writing([2]))
+    nav_store.get(1)
+    assert len(nav_store) == 1
+
+    # 加载期间同一基金写入净值，丢弃可能过时的加载结果
+    nav_store.clear()
+    monkeypatch.setattr(nav_store_module, 'load_nav_series', load_while_writing([1]))
+    nav_store.get(1)
+    assert len(nav_store) == 0
@@ -0,0 +1,75 @@
+from datetime import date
+import pytest
+from flask_jwt_extended import create_access_token
+from app.models import Fund, Purchase, User
+from app.services.fund_value_service import save_fund_value
+from app.services.portfolio_service import get_user_portfolio
+
+def _add_purchases(db):
+    db.session.add(User(id=1, username='tester'))
+    db.session.add_all([Fund(id=1, code='000001', name='基金1'), Fund(id=2, code='000002', name='基金2')])
+    db.session.commit()
+    # 2024-01-05为周五，2024-01-08为周一
+    for day, value in ((date(2024, 1, 4), 1.0), (date(2024, 1, 5), 1.25), (date(2024, 1, 8), 1.5)):
+        save_fund_value(1, day, value, value)
+    save_fund_value(2, date(2024, 1, 8), 2.0, 2.0)
+    db.session.add_all([
+        # 份额和单价都已填写
+        Purchase(user_id=1, fund_id=1, amount=1000, share=1000, price=1.0, purchase_date=date(2024, 1, 4)),
+        # 缺少份额和单价，按截止时间后规则取2024-01-08的净值
+        Purchase(user_id=1, fund_id=1, amount=1510, fee=10, purchase_date=date(2024, 1, 5), before_cutoff=False),
+        # 只填写了份额
+        Purchase(user_id=1, fund_id=2, amount=400, share=200, purchase_date=date(2024, 1, 8)),
+        # 确认日净值尚未公布
+        Purchase(user_id=1, fund_id=2, amount=300, purchase_date=date(2024, 1, 8), before_cutoff=False),
+    ])
+    db.session.commit()
+
+def test_portfolio_valuation(app, db):
+    _add_purchases(db)
+
+    portfolio = get_user_portfolio(1)
+    first, second = portfolio['holdings']
+
+    assert first['fund']['code'] == '000001'
+    assert first['shares'] == pytest.approx(2000)
+    assert first['cost'] == 2510
+    assert first['market_value'] == pytest.approx(3000)
+    assert first['profit'] == pytest.approx(490)
+
+    assert second['shares'] == pytest.approx(200)
+    assert second['pending_amount'] == 300
+    assert second['market_value'] == pytest.approx(700)
+    assert second['profit'] == pytest.approx(0)
+
+    summary = portfolio['summary']
+    assert summary['market_value'] == pytest.approx(3700)
+    assert summary['purchase_count'] == 4
+    assert first['weight'] + second['weight'] == pytest.approx(100, abs=0.02)
+
+def test_portfolio_endpoint(app, client, db):
+    _add_purchases(db)
+    with app.app_context():
+        token = create_access_token(identity='1')
+
+    response = client.get('/api/purchases/portfolio?fund_id=2', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [holding['fund']['code'] for holding in data['holdings']] == ['000002']
+    assert data['summary']['cost'] == 700
+
+def test_create_purchase_validates_before_cutoff(app, client, db):
+    _add_purchases(db)
+    with app.app_context():
+        token = create_access_token(identity='1')
+    headers = {'Authorization': f'Bearer {token}'}
+    purchase = {'fund_id': 1, 'amount': 100, 'purchase_date': '2024-01-05'}
+
+    response = client.post('/api/purchases', json={**purchase, 'before_cutoff': 'false'}, headers=headers)
+    assert response.status_code == 400
+
+    # null按15:00前处理
+    response = client.post('/api/purchases', json={**purchase, 'before_cutoff': None}, headers=headers)
+    assert response.status_code == 201
+    assert response.get_json()['purchase']['before_cutoff'] is True
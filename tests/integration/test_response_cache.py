@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from flask import jsonify, request
+from flask_jwt_extended import create_access_token
+from app import extensions
+from app.models import Fund, Note, User
+from app.services.note_service import invalidate_note_caches
+from app.utils.cache import cached_response, should_refresh_early
+from app.utils.redis_utils import bump_generations, cache_invalidate_tags
+
+def test_waiters_stop_when_lock_holder_returns_uncacheable_response(app, fake_redis):
+    app.config['CACHE_LOCK_WAIT'] = 5
+    calls = []
+
+    @app.route('/slow-missing')
+    @cached_response(ttl=60)
+    def slow_missing():
+        calls.append(1)
+        time.sleep(0.3)
+        return jsonify({'message': '不存在'}), 404
+
+    durations = []
+    def get():
+        start = time.time()
+        assert app.test_client().get('/slow-missing').status_code == 404
+        durations.append(time.time() - start)
+
+    threads = [threading.Thread(target=get) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 持锁请求的404不会写入缓存，等待的请求在锁释放后立即自行计算，而不是等满CACHE_LOCK_WAIT
+    assert len(calls) == 3
+    assert max(durations) < 2
+
+def _counting_route(app, path, ttl=60, **cache_options):
+    """注册返回调用次数的缓存视图"""
+    calls = []
+
+    @app.route(path, endpoint=path)
+    @cached_response(ttl=ttl, **cache_options)
+    def view():
+        calls.append(dict(request.args))
+        return jsonify({'calls': len(calls), 'args': request.args.to_dict(flat=False)}), 200
+
+    return calls
+
+def test_hit_miss_and_query_normalisation(app, client, fake_redis):
+    calls = _counting_route(app, '/cached')
+
+    first = client.get('/cached?page=1&per_page=10&type=')
+    # 参数顺序不同的请求命中同一缓存，直接返回缓存的字节
+    second = client.get('/cached?type=&per_page=10&page=1')
+    assert len(calls) == 1
+    assert second.status_code == 200 and second.data == first.data
+
+    # 空值与未提供的参数不同
+    client.get('/cached?page=1&per_page=10')
+    client.get('/cached?page=2&per_page=10')
+    assert len(calls) == 3
+
+def test_invalidation_by_generation_and_tags(app, client, fake_redis):
+    family_calls = _counting_route(app, '/by-family', families=lambda: 'test:family')
+    tag_calls = _counting_route(app, '/by-tag', tags=lambda: ['test:tag'])
+
+    for path in ('/by-family', '/by-tag'):
+        client.get(path)
+        client.get(path)
+    assert len(family_calls) == 1 and len(tag_calls) == 1
+
+    bump_generations('test:family')
+    assert client.get('/by-family').get_json()['calls'] == 2
+    assert cache_invalidate_tags('test:tag') == 1
+    assert client.get('/by-tag').get_json()['calls'] == 2
+
+def test_local_cache_dropped_on_broadcast_invalidation(app, client, fake_redis):
+    _counting_route(app, '/local')
+    local_cache = extensions.local_cache
+    client.get('/local')
+    deadline = time.time() + 2
+    while not local_cache.active and time.time() < deadline:
+        time.sleep(0.01)
+    assert local_cache.active
+
+    client.get('/local')
+    key = fake_redis.keys('response:*')[0].decode()
+
+    # Redis中的条目被直接删除（没有广播）时，本进程缓存仍然命中
+    fake_redis.delete(key)
+    assert client.get('/local').get_json()['calls'] == 1
+
+    # 其他进程删除缓存后广播失效，本进程随之删除本地条目
+    fake_redis.publish(app.config['CACHE_INVALIDATION_CHANNEL'], json.dumps([key]))
+    deadline = time.time() + 2
+    while local_cache.get(key) is not None and time.time() < deadline:
+        time.sleep(0.01)
+    assert local_cache.get(key) is None
+    assert client.get('/local').get_json()['calls'] == 2
+
+def test_stale_entry_served_while_refreshing(app, client, fake_redis):
+    app.config['CACHE_EARLY_EXPIRATION_BETA'] = 0
+    calls = _counting_route(app, '/stale', ttl=1, stale_ttl=30)
+
+    assert client.get('/stale').get_json()['calls'] == 1
+    time.sleep(1.1)
+
+    # 逻辑过期后立即返回旧结果，并在后台刷新
+    assert client.get('/stale').get_json()['calls'] == 1
+    deadline = time.time() + 2
+    while len(calls) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert client.get('/stale').get_json()['calls'] == 2
+
+def test_should_refresh_early():
+    assert not should_refresh_early(expires_at=100, delta=1, beta=0, now=99)
+    assert should_refresh_early(expires_at=100, delta=1, beta=0, now=100)
+    # 重新计算耗时远大于剩余有效期时几乎必然提前刷新
+    assert should_refresh_early(expires_at=100, delta=1e6, beta=1, now=99)
+    assert not should_refresh_early(expires_at=100, delta=1e-9, beta=1, now=50)
+
+def test_vary_on_user(app, client, fake_redis):
+    calls = _counting_route(app, '/mine', vary_on_user=True)
+    with app.app_context():
+        tokens = [create_access_token(identity=str(user_id)) for user_id in (1, 2)]
+
+    for token in tokens + tokens:
+        client.get('/mine', headers={'Authorization': f'Bearer {token}'})
+    client.get('/mine')
+    client.get('/mine')
+    assert len(calls) == 3
+
+def test_authorized_note_request_bypasses_cache(app, client, db, fake_redis):
+    db.session.add(User(id=1, username='tester'))
+    db.session.add(Fund(id=1, code='000001', name='基金1'))
+    db.session.add(Note(id=1, title='旧标题', content='内容', user_id=1, fund_id=1))
+    db.session.commit()
+    with app.app_context():
+        token = create_access_token(identity='1')
+
+    assert client.get('/api/notes/1').get_json()['title'] == '旧标题'
+    db.session.get(Note, 1).title = '新标题'
+    db.session.commit()
+
+    # 匿名请求读取缓存，带登录凭证的请求不读写缓存
+    assert client.get('/api/notes/1').get_json()['title'] == '旧标题'
+    assert client.get('/api/notes/1', headers={'Authorization': f'Bearer {token}'}).get_json()['title'] == '新标题'
+
+    # 笔记变化后失效笔记接口缓存
+    invalidate_note_caches(db.session.get(Fund, 1))
+    assert client.get('/api/notes/1').get_json()['title'] == '新标题'
@@ -0,0 +1,58 @@
+from datetime import date
+import numpy as np
+import pytest
+from flask_jwt_extended import create_access_token
+from app.models import Fund, Purchase, User
+from app.services.fund_value_service import save_fund_value
+from app.services.returns_engine import xirr_batch
+from app.services.returns_service import calculate_returns
+
+def _add_purchases(db):
+    db.session.add(User(id=1, username='tester'))
+    db.session.add(Fund(id=1, code='000001', name='基金1'))
+    db.session.commit()
+    for day, value in ((date(2024, 1, 2), 1.0), (date(2024, 7, 1), 2.0), (date(2025, 1, 2), 1.1)):
+        save_fund_value(1, day, value, value)
+    db.session.add_all([
+        Purchase(user_id=1, fund_id=1, amount=1000, share=1000, price=1.0, purchase_date=date(2024, 1, 2)),
+        # 高位加仓，份额按当日净值补全为500份
+        Purchase(user_id=1, fund_id=1, amount=1000, purchase_date=date(2024, 7, 1)),
+    ])
+    db.session.commit()
+
+def test_xirr_batch_solves_each_row():
+    days = [[0, 365, 0], [0, 181, 366]]
+    flows = [[-1000, 1100, 0], [-1000, -1000, 1650]]
+
+    rates = xirr_batch(days, flows)
+
+    assert rates[0] == pytest.approx(0.1)
+    years = np.array(days[1]) / 365
+    assert np.sum(np.array(flows[1]) * (1 + rates[1]) ** -years) == pytest.approx(0, abs=1e-6)
+    assert np.isnan(xirr_batch([[0, 10]], [[-100, 0]])[0])
+
+def test_time_weighted_and_money_weighted_returns(app, db):
+    _add_purchases(db)
+
+    with app.app_context():
+        result = calculate_returns(Purchase.query.all())
+
+    portfolio = result['portfolio']
+    assert portfolio['market_value'] == pytest.approx(1650)
+    # 基金净值本身上涨10%，但高位加仓使资金加权收益为负
+    assert portfolio['twr'] == pytest.approx(10)
+    assert portfolio['xirr'] < 0
+    assert result['funds'][0]['twr'] == portfolio['twr']
+    assert result['funds'][0]['holding_days'] == 366
+
+def test_returns_endpoint(app, client, db):
+    _add_purchases(db)
+    with app.app_context():
+        token = create_access_token(identity='1')
+
+    response = client.get('/api/purchases/returns', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['funds'][0]['fund']['code'] == '000001'
+    assert data['portfolio']['invested'] == 2000
@@ -7,7 +7,12 @@
     python update_fund_values.py -c 000001        # 更新指定基金的全部历史净值数据
     python update_fund_values.py -d 30            # 仅更新最近30天的净值数据
     python update_fund_values.py -s 2023-01-01 -e 2023-12-31  # 更新指定日期范围的净值数据
+    python update_fund_values.py -w 32            # 使用32个并发线程抓取
+    python update_fund_values.py -b 1000          # 每批写入1000条净值记录
     python update_fund_values.py -v               # 显示详细日志
+    python update_fund_values.py --backfill       # 可断点续传的全量历史回填，中断后重新运行即可继续
+    python update_fund_values.py --backfill --job full --fund-id-range 1-5000     # 按基金ID范围分片回填
+    python update_fund_values.py --backfill --restart                              # 清除检查点重新回填
 """
 
 import argparse
@@ -45,7 +50,14 @@ def parse_args():
     parser.add_argument('-d', '--days', type=int, help='仅获取最近几天的数据，不提供则获取全部历史数据')
     parser.add_argument('-s', '--start-date', help='开始日期 (YYYY-MM-DD)')
     parser.add_argument('-e', '--end-date', help='结束日期 (YYYY-MM-DD)')
+    parser.add_argument('-w', '--workers', type=int, help='同时抓取的基金数，不提供则使用FUND_FETCH_MAX_WORKERS配置')
+    parser.add_argument('-b', '--batch-size', type=int, help='每批写入的净值记录数，不提供则使用FUND_VALUE_BATCH_SIZE配置')
     parser.add_argument('-v', '--verbose', action='store_true', help='显示详细日志')
+    parser.add_argument('--backfill', action='store_true', help='以可断点续传的方式回填全部历史净值')
+    parser.add_argument('--job', default='default', help='回填任务名，同名任务共享检查点 (默认: default)')
+    parser.add_argument('--fund-id-range', help='回填的基金ID范围，格式为 起始ID-结束ID，用于多进程分片')
+    parser.add_argument('--window-days', type=int, help='回填时每个检查点窗口的天数，不提供则使用BACKFILL_WINDOW_DAYS配置')
+    parser.add_argument('--restart', action='store_true', help='清除回填任务已有的检查点，从头开始；指定--fund-id-range时只清除该范围内基金的检查点')
     
     return parser.parse_args()
 
@@ -64,6 +76,9 @@ def main():
     setup_logging(args.verbose)
     
     with app.app_context():
+        if args.backfill:
+            return run_backfill_command(args)
+        
         try:
             logging.info("开始更新基金净值数据...")
             
@@ -108,6 +123,14 @@ def main():
                 if not args.start_date and not args.end_date:
                     logging.info("未指定日期范围，将获取基金全部历史净值数据")
             
+            if args.workers:
+                params['max_workers'] = args.workers
+                logging.info(f"并发抓取线程数: {args.workers}")
+            
+            if args.batch_size:
+                params['batch_size'] = args.batch_size
+                logging.info(f"批量写入大小: {args.batch_size}")
+            
             # 执行更新
             count = fetch_fund_value(**params)
             
@@ -118,5 +141,39 @@ def main():
             logging.error(f"更新净值数据失败: {str(e)}")
             return 1
 
+def run_backfill_command(args):
+    """执行可断点续传的全量历史回填"""
+    from app.services.backfill_service import run_backfill
+    
+    params = {
+        'job_name': args.job,
+        'resume': not args.restart,
+        'end_date': args.end_date,
+        'window_days': args.window_days,
+        'max_workers': args.workers,
+        'batch_size': args.batch_size
+    }
+    
+    if args.fund_id_range:
+        try:
+            min_id, max_id = args.fund_id_range.split('-', 1)
+            params['min_fund_id'] = int(min_id) if min_id else None
+            params['max_fund_id'] = int(max_id) if max_id else None
+        except ValueError:
+            logging.error("基金ID范围格式无效，应为 起始ID-结束ID")
+            return 1
+    
+    try:
+        logging.info(f"开始回填任务 {args.job}，基金ID范围: {args.fund_id_range or '全部'}")
+        stats = run_backfill(**params)
+        logging.info(
+            f"回填任务 {args.job} 结束: {stats['done']}/{stats['funds']} 只基金完成, {stats['failed']} 只失败, "
+            f"写入 {stats['rows']} 条净值, {stats['rows_per_second']} 条/秒, {stats['funds_per_second']} 只基金/秒"
+        )
+        return 0
+    except Exception as e:
+        logging.error(f"回填净值数据失败: {str(e)}")
+        return 1
+
 if __name__ == '__main__':
     sys.exit(main()) 
\ No newline at end of file